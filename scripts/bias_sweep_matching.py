@@ -12,6 +12,15 @@ def _ensure_dir(p: str):
     os.makedirs(p, exist_ok=True)
 
 
+def load_sweep(path: str) -> pd.DataFrame:
+    """Table longue de compare_nearest --sweep-dists -> colonnes dist_m, <metric>_q<NN>."""
+    long = pd.read_csv(path)
+    long["col"] = long["metric"] + "_q" + (long["quantile"] * 100).round().astype(int).astype(str)
+    wide = long.pivot_table(index="d", columns="col", values="value", aggfunc="first")
+    wide.columns.name = None
+    return wide.reset_index().rename(columns={"d": "dist_m"})
+
+
 def load_quants(files: List[str]) -> pd.DataFrame:
     rows = []
     for f in files:
@@ -33,7 +42,12 @@ def main():
         "--in-dir",
         dest="in_dir",
         required=True,
-        help="répertoire contenant nearest_quants_d*.csv",
+        help="répertoire contenant nearest_quants_d*.csv (ou nearest_quants_sweep.csv)",
+    )
+    ap.add_argument(
+        "--in-sweep",
+        default=None,
+        help="table longue de compare_nearest --sweep-dists (prioritaire sur --in-dir)",
     )
     ap.add_argument(
         "--metrics", default="diff_length_m,diff_radius_min_m,diff_curv_mean_1perm"
@@ -46,12 +60,16 @@ def main():
     args = ap.parse_args()
 
     _ensure_dir(args.out_dir)
-    files = sorted(glob.glob(os.path.join(args.in_dir, "nearest_quants_d*.csv")))
-    if not files:
-        raise SystemExit(
-            "Aucun fichier nearest_quants_d*.csv trouvé; lance d’abord `make quantiles`."
-        )
-    df = load_quants(files)
+    sweep = args.in_sweep or os.path.join(args.in_dir, "nearest_quants_sweep.csv")
+    if os.path.exists(sweep):
+        df = load_sweep(sweep)
+    else:
+        files = sorted(glob.glob(os.path.join(args.in_dir, "nearest_quants_d*.csv")))
+        if not files:
+            raise SystemExit(
+                "Aucun fichier nearest_quants_d*.csv trouvé; lance d’abord `make quantiles`."
+            )
+        df = load_quants(files)
     if df.empty:
         raise SystemExit("Fichiers de quantiles vides.")
 
@@ -99,10 +117,11 @@ def main():
         out_png = os.path.join(args.out_dir, f"bias_{m}_q{int(q*100)}.png")
         fig.savefig(out_png)
         plt.close(fig)
+        rel_png = os.path.relpath(out_png, start=os.path.dirname(args.out_md)).replace("\\", "/")
         md_lines += [
             f"## {m}",
             "",
-            f"![{m}]({os.path.relpath(out_png, start=os.path.dirname(args.out_md)).replace('\\','/')})",
+            f"![{m}]({rel_png})",
             "",
         ]
 
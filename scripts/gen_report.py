@@ -9,6 +9,9 @@ from typing import List, Dict
 import yaml
 import pandas as pd
 
+from rs3_study_curvature.analysis.hist_cube import ALL, cube_path_from_config, cube_summary, load_cube
+from rs3_study_curvature.viz.cache import FigureCache, code_version, fingerprint, write_text_if_changed
+
 
 def _ensure_dir(p: str):
     if p and not os.path.exists(p):
@@ -76,6 +79,16 @@ def main():
         default=None,
         help="Chemin relatif depuis le rapport vers les figures (par ex. '../out/plots/...)'",
     )
+    parser.add_argument(
+        "--cube",
+        default=None,
+        help="Cube d'histogrammes (défaut: outputs.hist_cube ou <root>/hist_cube.parquet s'il existe)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Régénérer même si les entrées sont inchangées",
+    )
     args = parser.parse_args()
 
     with open(args.config, "r") as f:
@@ -99,6 +112,21 @@ def main():
         )
         plots_dir = None
 
+    # Entrées (stats, figures, cube), options et code inchangés → rapport conservé
+    cube_path = args.cube or str(cube_path_from_config(cfg))
+    cache = FigureCache.from_config(cfg, enabled=not args.no_cache)
+    run_name = f"report.global:{os.path.abspath(args.out)}"
+    if cache is not None:
+        run_key = fingerprint(
+            cache.files([stats_csv, cube_path] + ([plots_dir] if plots_dir else [])),
+            metrics,
+            [args.title, args.docs_rel, args.out],
+            code_version(__name__, "rs3_study_curvature.analysis.hist_cube"),
+        )
+        if cache.run_outputs(run_name, run_key):
+            print(f"✅ Rapport à jour (entrées inchangées) → {args.out}")
+            return
+
     df = pd.read_csv(stats_csv)
 
     out_path = args.out
@@ -163,6 +191,15 @@ def main():
     lines.append(df_print.to_markdown(index=False))
     lines.append("")
 
+    # Quantiles approchés depuis le cube pré-agrégé (pas de relecture des segments)
+    if os.path.exists(cube_path):
+        summary = cube_summary(load_cube(cube_path))
+        summary = summary[summary["class"] == ALL].drop(columns="class")
+        lines.append("## Quantiles des distributions (cube d'histogrammes)")
+        lines.append("")
+        lines.append(summary.to_markdown(index=False, floatfmt=".4g"))
+        lines.append("")
+
     lines.append("## Distributions graphiques")
     lines.append("")
 
@@ -189,6 +226,8 @@ def main():
         p_hist = f"{m}__hist_kde.png"
         p_box = f"{m}__box.png"
         p_vio = f"{m}__violin.png"
+        if not os.path.exists(os.path.join(base_dir, p_hist)):
+            p_hist = f"{m}__hist_cube.png"
 
         any_fig = False
         if os.path.exists(os.path.join(base_dir, p_hist)):
@@ -204,8 +243,10 @@ def main():
             lines.append("*Aucune figure trouvée pour cette métrique.*")
         lines.append("")
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+    write_text_if_changed(out_path, "\n".join(lines))
+    if cache is not None:
+        cache.record_run(run_name, run_key, [out_path])
+        cache.save()
 
     print(f"✅ Rapport Markdown généré → {out_path}")
 
@@ -9,7 +9,7 @@ import pandas as pd
 import numpy as np
 
 from rs3_study_curvature.io import load_pair, ensure_numeric_columns, dropna_both
-from rs3_study_curvature.analysis.utils import summarize_metric, results_to_df
+from rs3_study_curvature.analysis.utils import bootstrap_metrics, summarize_metrics, results_to_df
 
 
 def _ensure_dir(p: str):
@@ -71,7 +71,13 @@ def main():
     osm = ensure_numeric_columns(osm, metrics)
     bd = ensure_numeric_columns(bd, metrics)
 
-    results = []
+    # Bootstrap (optionnel) : IC des tailles d'effet, stratifié par classe si demandé
+    boot_cfg = cfg.get("bootstrap") or {}
+    class_col = cfg.get("class_column")
+    strat_col = class_col if boot_cfg.get("stratify_by_class") and class_col in osm.columns and class_col in bd.columns else None
+    strata = {}
+
+    samples = {}
     for m in metrics:
         # Resolve/derive metric columns gracefully (supports radius_m from curvature)
         s_osm = resolve_metric_series(osm, m)
@@ -85,13 +91,18 @@ def main():
             continue
 
         a, b = dropna_both(s_osm, s_bd)
+        idx_a, idx_b = a.index, b.index
         a = a.to_numpy()
         b = b.to_numpy()
         if len(a) < 2 or len(b) < 2:
             print(f"[WARN] Trop peu de données pour {m} (OSM={len(a)}, BD={len(b)}).")
             continue
-        res = summarize_metric(m, a, b)
-        results.append(res)
+        samples[m] = (a, b)
+        if strat_col:
+            strata[m] = (osm.loc[idx_a, strat_col].to_numpy(), bd.loc[idx_b, strat_col].to_numpy())
+
+    # Un seul appel pour toutes les métriques (tri unique par échantillon)
+    results = summarize_metrics(samples)
 
     if not results:
         print("Aucun résultat : vérifie les colonnes/chemins.")
@@ -107,6 +118,23 @@ def main():
     with pd.option_context("display.max_columns", None, "display.width", 140):
         print(df)
 
+    if boot_cfg.get("enabled", False):
+        t0 = time.time()
+        boot = bootstrap_metrics(
+            samples,
+            results,
+            strata=strata or None,
+            n_boot=int(boot_cfg.get("n_boot", 2000)),
+            alpha=float(boot_cfg.get("alpha", 0.05)),
+            seed=cfg.get("random_seed"),
+            max_workers=boot_cfg.get("workers"),
+        )
+        out_boot = os.path.join(out_stats, f"global_bootstrap_{ts}.csv")
+        boot.to_csv(out_boot, index=False)
+        print(f"✅ IC bootstrap ({time.time() - t0:.1f}s) → {out_boot}")
+        with pd.option_context("display.width", 140):
+            print(boot)
+
 
 if __name__ == "__main__":
     main()
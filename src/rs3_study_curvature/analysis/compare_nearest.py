@@ -7,12 +7,17 @@ Additions vs previous version:
 - Robust handling of geopandas suffixes (_left/_right) for metrics & class
 - Optional --drop-inf to ignore +/-inf in radius before computing diffs
 - Clear diagnostics and safe fallbacks
+- Optional --bidirectional / --mutual-only: BD→OSM pass and mutual pairs from
+  the same run, with per-direction coverage
+- Optional --geom-match: full segment geometries from the ETL *_geom.parquet
+  sidecars, STRtree dwithin candidates scored by Hausdorff/overlap
+- Array join: KD-tree on BD centroids, bulk query of OSM centroids, columns
+  gathered by index (suffixes _left/_right kept for downstream tools)
 """
 
 from __future__ import annotations
 
 import argparse
-import json
 import sys
 import warnings
 from pathlib import Path
@@ -20,76 +25,262 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point, LineString
-from unicodedata import normalize as u_normalize
+import shapely
+from scipy.spatial import cKDTree
+
+from rs3_study_curvature.analysis.sketch import sketches_to_json, update_sketches
+from rs3_study_curvature.data.classes import DEFAULT_BDTOPO_TO_OSM, ClassHarmonizer, load_class_map
+
+try:
+    import pyogrio
+except Exception:  # pragma: no cover
+    pyogrio = None
 
 # -----------------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------------
 
 
-def _strip_accents(s: str) -> str:
-    return "".join(c for c in u_normalize("NFKD", s) if ord(c) < 128)
-
+def _class_harmonizers(class_map: Path | None) -> tuple[ClassHarmonizer, ClassHarmonizer]:
+    """OSM: normalisation seule ; BD TOPO: défaut BD→OSM surchargé par --class-map."""
+    mp = dict(DEFAULT_BDTOPO_TO_OSM)
+    mp.update(load_class_map(class_map))
+    return ClassHarmonizer(), ClassHarmonizer(mp)
 
-def _norm_class(val: str | float | int | None) -> str | None:
-    if val is None or (isinstance(val, float) and not np.isfinite(val)):
-        return None
-    s = str(val).strip().lower()
-    s = _strip_accents(s)
-    for bad in ["/", "\\", ",", ";"]:
-        s = s.replace(bad, " ")
-    s = " ".join(s.split())
-    return s or None
 
-
-def _load_mapping(path: Path | None) -> dict[str, str]:
-    if not path:
-        return {}
-    try:
-        if path.suffix.lower() in {".yml", ".yaml"}:
-            import yaml  # lazy
-
-            data = yaml.safe_load(Path(path).read_text()) or {}
-        else:
-            data = json.loads(Path(path).read_text())
-        # normalize keys/values
-        return {_norm_class(k): _norm_class(v) for k, v in data.items() if k is not None}
-    except Exception as e:  # pragma: no cover (logging only)
-        warnings.warn(f"[WARN] Échec lecture mapping {path}: {e} — mapping ignoré.")
-        return {}
-
-
-def _default_bdtopo_to_osm_map() -> dict[str, str]:
-    # Clefs BD TOPO (nature) → valeurs OSM highway (normalisées)
-    return {
-        "autoroute": "motorway",
-        "bretelle": "motorway_link",
-        "bretelle d autoroute": "motorway_link",
-        "route a 2 chaussees": "trunk",
-        "route principale": "primary",
-        "route secondaire": "secondary",
-        "route tertiaire": "tertiary",
-        "route communale": "unclassified",
-        "chemin": "track",
-        "piste": "track",
-        "piste cyclable": "cycleway",
-        "rond point": "junction",
-        "aire de service": "service",
-        "voie de desserte": "service",
-    }
-
-
-def _apply_mapping(series: pd.Series, mapping: dict[str, str]) -> pd.Series:
-    return series.map(lambda v: mapping.get(v, v) if v is not None else None)
-
-
-def _build_points(df: pd.DataFrame, crs: str = "EPSG:2154") -> gpd.GeoDataFrame:
+def _centroids(df: pd.DataFrame) -> np.ndarray:
     # Expect x_centroid / y_centroid added by compute_curvature.py
     if not {"x_centroid", "y_centroid"}.issubset(df.columns):
         raise RuntimeError("Colonnes manquantes x_centroid / y_centroid — régénérez les sorties.")
-    geom = [Point(x, y) for x, y in zip(df["x_centroid"].to_numpy(), df["y_centroid"].to_numpy())]
-    return gpd.GeoDataFrame(df.copy(), geometry=geom, crs=crs)
+    return np.column_stack(
+        [
+            pd.to_numeric(df["x_centroid"], errors="coerce").to_numpy(dtype=float),
+            pd.to_numeric(df["y_centroid"], errors="coerce").to_numpy(dtype=float),
+        ]
+    )
+
+
+def _build_tree(xy: np.ndarray) -> tuple[cKDTree | None, np.ndarray]:
+    """KD-tree over finite centroids; returns (tree, positions of indexed rows)."""
+    pos = np.flatnonzero(np.isfinite(xy).all(axis=1))
+    if pos.size == 0:
+        return None, pos
+    return cKDTree(xy[pos]), pos
+
+
+def _query_nearest(tree: cKDTree | None, pos: np.ndarray, xy: np.ndarray, max_dist: float | None) -> tuple[np.ndarray, np.ndarray]:
+    """Nearest indexed row for every query point (bulk KD-tree query).
+
+    Returns (idx, dist): idx is the row position in the indexed table (-1 when
+    nothing lies within max_dist), dist is NaN for unmatched rows.
+    """
+    idx = np.full(len(xy), -1, dtype=np.int64)
+    dist = np.full(len(xy), np.nan)
+    ok = np.isfinite(xy).all(axis=1)
+    if tree is None or not ok.any():
+        return idx, dist
+    # cKDTree bound is strict; nudge it so max_dist is inclusive like sjoin_nearest
+    bound = np.nextafter(max_dist, np.inf) if max_dist is not None else np.inf
+    d, j = tree.query(xy[ok], k=1, distance_upper_bound=bound, workers=-1)
+    hit = np.isfinite(d)
+    rows = np.flatnonzero(ok)[hit]
+    idx[rows] = pos[j[hit]]
+    dist[rows] = d[hit]
+    return idx, dist
+
+
+def _class_groups(codes: np.ndarray) -> list[np.ndarray]:
+    """Row positions per class code (codes < 0 = no class are dropped)."""
+    order = np.argsort(codes, kind="stable")
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    return [g for g in np.split(order, bounds) if g.size and codes[g[0]] >= 0]
+
+
+def _build_class_trees(xy: np.ndarray, codes: np.ndarray) -> dict[int, tuple[cKDTree | None, np.ndarray]]:
+    """One KD-tree per class code; positions refer to rows of the full table."""
+    trees: dict[int, tuple[cKDTree | None, np.ndarray]] = {}
+    for grp in _class_groups(codes):
+        tree, pos = _build_tree(xy[grp])
+        trees[int(codes[grp[0]])] = (tree, grp[pos])
+    return trees
+
+
+def _query_nearest_by_class(
+    trees: dict[int, tuple[cKDTree | None, np.ndarray]],
+    xy: np.ndarray,
+    codes: np.ndarray,
+    max_dist: float | None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Like _query_nearest, but each class partition only searches its own index."""
+    idx = np.full(len(xy), -1, dtype=np.int64)
+    dist = np.full(len(xy), np.nan)
+    for grp in _class_groups(codes):
+        tree, pos = trees.get(int(codes[grp[0]]), (None, None))
+        if tree is None:
+            continue
+        idx[grp], dist[grp] = _query_nearest(tree, pos, xy[grp], max_dist)
+    return idx, dist
+
+
+def _mutual_mask(idx_ab: np.ndarray, idx_ba: np.ndarray) -> np.ndarray:
+    """True where row i of A points to j in B and j points back to i."""
+    ok = idx_ab >= 0
+    mutual = np.zeros(len(idx_ab), dtype=bool)
+    mutual[ok] = idx_ba[idx_ab[ok]] == np.flatnonzero(ok)
+    return mutual
+
+
+def _coverage(idx_ob: np.ndarray, idx_bo: np.ndarray, mutual: np.ndarray, max_dist: float | None) -> pd.DataFrame:
+    """Coverage of each direction (OSM→BD, BD→OSM) and of the mutual pairs."""
+    n_mutual = int(mutual.sum())
+    rows = []
+    for direction, idx in [("osm->bd", idx_ob), ("bd->osm", idx_bo)]:
+        n = len(idx)
+        n_matched = int((idx >= 0).sum())
+        rows.append(
+            {
+                "direction": direction,
+                "max_dist": max_dist,
+                "n_source": n,
+                "n_matched": n_matched,
+                "pct_matched": 100.0 * n_matched / n if n else np.nan,
+                "n_mutual": n_mutual,
+                "pct_mutual": 100.0 * n_mutual / n if n else np.nan,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def _read_geom_sidecar(path: Path, n_rows: int) -> np.ndarray:
+    """Geometries of the *_geom.parquet sidecar written by the ETL (row-aligned with segments)."""
+    if not path.exists():
+        raise SystemExit(f"Sidecar géométrique introuvable: {path} — relancez l'ETL (outputs.geometry_sidecar).")
+    geoms = gpd.read_parquet(path).geometry.to_numpy()
+    if len(geoms) != n_rows:
+        raise SystemExit(f"Sidecar {path.name}: {len(geoms):,} géométries pour {n_rows:,} segments — sorties désalignées.")
+    return geoms
+
+
+def _sample_points(geoms: np.ndarray, n_samples: int = 5) -> np.ndarray:
+    """(n, n_samples) points evenly spaced along each line (ends included)."""
+    fr = np.linspace(0.0, 1.0, n_samples)
+    return shapely.line_interpolate_point(geoms[:, None], fr[None, :], normalized=True)
+
+
+def _overlap_ratio(pts: np.ndarray, b: np.ndarray, tol: float) -> np.ndarray:
+    """Share of the sampled points pts[k] lying within tol of b[k]."""
+    return (shapely.distance(pts, b[:, None]) <= tol).mean(axis=1)
+
+
+def _best_per_source(src: np.ndarray, other: np.ndarray, overlap: np.ndarray, haus: np.ndarray, n_src: int) -> tuple[np.ndarray, np.ndarray]:
+    """Best candidate per source row: highest overlap, then smallest Hausdorff.
+
+    Returns (idx into other side or -1, position of the chosen pair or -1).
+    """
+    idx = np.full(n_src, -1, dtype=np.int64)
+    pair = np.full(n_src, -1, dtype=np.int64)
+    if src.size == 0:
+        return idx, pair
+    order = np.lexsort((haus, -overlap, src))
+    first = order[np.r_[True, src[order][1:] != src[order][:-1]]]
+    idx[src[first]] = other[first]
+    pair[src[first]] = first
+    return idx, pair
+
+
+def _geom_match(
+    geoms_osm: np.ndarray,
+    geoms_bd: np.ndarray,
+    max_dist: float,
+    min_overlap: float,
+    codes_osm: np.ndarray | None = None,
+    codes_bd: np.ndarray | None = None,
+    chunk_size: int = 50_000,
+) -> dict[str, np.ndarray]:
+    """Segment-to-segment matching on full geometries.
+
+    One STRtree bulk query (predicate="dwithin") yields every candidate pair;
+    pairs are scored with vectorized Hausdorff distance and a symmetric overlap
+    ratio (min of both sampled coverages), so a short stub no longer wins over
+    the way it only touches. Both directions are picked from the same pairs.
+    """
+    tree = shapely.STRtree(geoms_bd)
+    parts: list[tuple[np.ndarray, ...]] = []
+    n_candidates = 0
+    # Bulk query + scoring by blocks of OSM rows: memory stays bounded by the
+    # block's candidate pairs, only pairs passing min_overlap are kept.
+    for start in range(0, len(geoms_osm), chunk_size):
+        i, j = tree.query(geoms_osm[start : start + chunk_size], predicate="dwithin", distance=max_dist)
+        i = i + start
+        if codes_osm is not None and codes_bd is not None:
+            keep = (codes_osm[i] >= 0) & (codes_osm[i] == codes_bd[j])
+            i, j = i[keep], j[keep]
+        n_candidates += len(i)
+        a, b = geoms_osm[i], geoms_bd[j]
+        # sample each candidate segment once, pairs gather the points
+        ui, inv_i = np.unique(i, return_inverse=True)
+        uj, inv_j = np.unique(j, return_inverse=True)
+        pts_a, pts_b = _sample_points(geoms_osm[ui])[inv_i], _sample_points(geoms_bd[uj])[inv_j]
+        overlap = np.minimum(_overlap_ratio(pts_a, b, max_dist), _overlap_ratio(pts_b, a, max_dist))
+        ok = overlap >= min_overlap
+        haus = shapely.hausdorff_distance(a[ok], b[ok])
+        dist = shapely.distance(a[ok], b[ok])
+        parts.append((i[ok], j[ok], overlap[ok], haus, dist))
+    i, j, overlap, haus, dist = (np.concatenate(c) for c in zip(*parts)) if parts else (np.empty(0, dtype=np.int64),) * 2 + (np.empty(0),) * 3
+
+    idx_ob, pair_ob = _best_per_source(i, j, overlap, haus, len(geoms_osm))
+    idx_bo, _ = _best_per_source(j, i, overlap, haus, len(geoms_bd))
+    hit = pair_ob >= 0
+    out = {"idx_ob": idx_ob, "idx_bo": idx_bo}
+    for name, values in [("dist", dist), ("hausdorff", haus), ("overlap", overlap)]:
+        col = np.full(len(geoms_osm), np.nan)
+        col[hit] = values[pair_ob[hit]]
+        out[name] = col
+    out["n_candidates"] = np.array(n_candidates)
+    return out
+
+
+def _take(df: pd.DataFrame, col: str, idx: np.ndarray) -> np.ndarray:
+    """Gather df[col] by row position; -1 positions become missing."""
+    return pd.api.extensions.take(df[col].to_numpy(), idx, allow_fill=True)
+
+
+def _build_joined(
+    df_osm: pd.DataFrame,
+    df_bd: pd.DataFrame,
+    idx: np.ndarray,
+    dist: np.ndarray,
+    cols: list[str],
+) -> pd.DataFrame:
+    """Materialize only `cols` from both sides, suffixed _left (OSM) / _right (BD)."""
+    data: dict[str, np.ndarray] = {}
+    for c in cols:
+        if c in df_osm.columns:
+            data[f"{c}_left"] = df_osm[c].to_numpy()
+        if c in df_bd.columns:
+            data[f"{c}_right"] = _take(df_bd, c, idx)
+    data["_dist_m"] = dist
+    return pd.DataFrame(data)
+
+
+def _connector_lines(xy: np.ndarray) -> np.ndarray:
+    """LineStrings (x_left, y_left) → (x_right, y_right); None where a side is missing."""
+    lines = np.full(len(xy), None, dtype=object)
+    valid = np.isfinite(xy).all(axis=1)
+    if valid.any():
+        lines[valid] = shapely.linestrings(xy[valid].reshape(-1, 2, 2))
+    return lines
+
+
+def _write_geo(gdf: gpd.GeoDataFrame, path: Path, driver: str) -> None:
+    """Write through pyogrio's Arrow path when available (no per-feature Python loop)."""
+    if pyogrio is not None:
+        try:
+            pyogrio.write_dataframe(gdf, path, driver=driver, use_arrow=True)
+            return
+        except Exception as e:  # pragma: no cover (old GDAL / pyogrio without Arrow)
+            warnings.warn(f"[WARN] Écriture Arrow pyogrio impossible ({e}); repli sur to_file.")
+    gdf.to_file(path, driver=driver)
 
 
 def _resolve_col(joined: pd.DataFrame, base: str, prefer_left: bool = True) -> tuple[str | None, str | None]:
@@ -109,6 +300,49 @@ def _resolve_col(joined: pd.DataFrame, base: str, prefer_left: bool = True) -> t
     return left, right
 
 
+def _parse_quantiles(text: str | None) -> list[float]:
+    """'0.10,0.50,0.90' -> sorted unique levels in [0, 1]."""
+    if text:
+        try:
+            q_levels = sorted({float(q.strip()) for q in text.split(",") if q.strip() != ""})
+        except ValueError:
+            raise ValueError(f"Valeurs de --quantiles invalides: {text!r}")
+    else:
+        q_levels = [0.10, 0.25, 0.50, 0.75, 0.90]
+    # keep only in (0,1)
+    q_levels = [q for q in q_levels if 0.0 <= q <= 1.0]
+    if not q_levels:
+        raise ValueError("Aucun quantile valide fourni (attendu valeurs entre 0 et 1).")
+    return q_levels
+
+
+def _sweep_quantiles(diffs: pd.DataFrame, dist: np.ndarray, dists: list[float], q_levels: list[float]) -> pd.DataFrame:
+    """Quantiles of the diffs for every distance threshold, from one join at max(dists).
+
+    The nearest neighbour within d is the nearest within max(dists) whenever its
+    distance is <= d, so each threshold is a mask on the stored distances.
+    Returns a long table: d, metric, quantile, value, count, n_matched.
+    """
+    rows = []
+    for d in dists:
+        within = diffs[np.isfinite(dist) & (dist <= d)]
+        qdf = within.quantile(q_levels)
+        counts = within.count()
+        for m in diffs.columns:
+            for q in q_levels:
+                rows.append(
+                    {
+                        "d": d,
+                        "metric": m,
+                        "quantile": q,
+                        "value": qdf.loc[q, m],
+                        "count": int(counts[m]),
+                        "n_matched": len(within),
+                    }
+                )
+    return pd.DataFrame(rows, columns=["d", "metric", "quantile", "value", "count", "n_matched"])
+
+
 def _describe(df: pd.DataFrame) -> pd.DataFrame:
     cols = [c for c in df.columns if c.startswith("diff_")]
     if not cols:
@@ -133,12 +367,12 @@ def main(argv=None):
         "--max-dist",
         type=float,
         default=30.0,
-        help="Distance max (m) pour sjoin_nearest",
+        help="Distance max (m) entre centroïdes appariés",
     )
     p.add_argument(
         "--match-class",
         action="store_true",
-        help="Contraindre l'appariement à la même classe normalisée",
+        help="Contraindre l'appariement à la même classe normalisée (recherche par classe)",
     )
     p.add_argument("--class-col-osm", type=str, default="class")
     p.add_argument("--class-col-bd", type=str, default="class")
@@ -149,6 +383,36 @@ def main(argv=None):
         help="YAML/JSON mapping BD→OSM (prioritaire)",
     )
 
+    p.add_argument(
+        "--geom-match",
+        action="store_true",
+        help="Appariement géométrie↔géométrie (STRtree dwithin + score Hausdorff/recouvrement) via les sidecars *_geom.parquet",
+    )
+    p.add_argument("--osm-geom-name", type=str, default=None, help="Sidecar géométrique OSM (défaut: <osm-name>_geom.parquet)")
+    p.add_argument("--bd-geom-name", type=str, default=None, help="Sidecar géométrique BD (défaut: <bd-name>_geom.parquet)")
+    p.add_argument(
+        "--min-overlap",
+        type=float,
+        default=0.5,
+        help="Recouvrement symétrique minimal (0-1) pour retenir une paire en --geom-match",
+    )
+    p.add_argument(
+        "--bidirectional",
+        action="store_true",
+        help="Apparie aussi BD→OSM (index construits une fois), marque les paires mutuelles (_mutual) et écrit la couverture",
+    )
+    p.add_argument(
+        "--mutual-only",
+        action="store_true",
+        help="Ne conserve que les paires plus proches voisins mutuelles (implique --bidirectional)",
+    )
+    p.add_argument(
+        "--out-coverage",
+        type=Path,
+        default=None,
+        help="Chemin CSV de couverture par direction (si --bidirectional)",
+    )
+
     p.add_argument(
         "--drop-inf",
         action="store_true",
@@ -214,6 +478,24 @@ def main(argv=None):
         default="0.10,0.25,0.50,0.75,0.90",
         help="Liste de quantiles (0-1) séparés par des virgules, ex: '0.10,0.50,0.90'. Par défaut: 0.10,0.25,0.50,0.75,0.90",
     )
+    p.add_argument(
+        "--sweep-dists",
+        type=str,
+        default="",
+        help="Mode balayage: distances (m) séparées par des virgules, ex: '10,20,30,50'. Une seule jointure à la distance max, quantiles dérivés pour chaque seuil",
+    )
+    p.add_argument(
+        "--out-sweep",
+        type=Path,
+        default=None,
+        help="CSV long (d, metric, quantile, value, count, n_matched) du mode --sweep-dists",
+    )
+    p.add_argument(
+        "--out-sketch",
+        type=Path,
+        default=None,
+        help="Sketches de quantiles des diffs (JSON, global + par classe) fusionnables entre tuiles (cf. analysis.sketch)",
+    )
     p.add_argument(
         "--keep-cols",
         type=str,
@@ -225,19 +507,28 @@ def main(argv=None):
     # Parse metrics list and extra columns
     metrics = [m.strip() for m in args.metrics.split(",") if m.strip()]
     extra_keep = [c.strip() for c in args.keep_cols.split(",") if c.strip()]
+    if args.mutual_only:
+        args.bidirectional = True
+    sweep_dists = sorted({float(d.strip()) for d in args.sweep_dists.split(",") if d.strip()})
+    if sweep_dists and args.geom_match:
+        # candidates and overlap tolerance depend on max_dist: thresholds cannot be derived afterwards
+        p.error("--sweep-dists n'est pas compatible avec --geom-match")
+    if sweep_dists:
+        # One query at the largest distance; smaller thresholds are derived from _dist_m
+        args.max_dist = sweep_dists[-1]
 
     in_dir = args.in_dir
     df_osm = pd.read_parquet(in_dir / args.osm_name)
     df_bd = pd.read_parquet(in_dir / args.bd_name)
 
-    # Build GeoDataFrames with points first (we also keep class columns in plain df)
-    g_osm = _build_points(df_osm, crs="EPSG:2154")
-    g_bd = _build_points(df_bd, crs="EPSG:2154")
+    # Centroid arrays only: the join never needs shapely geometries
+    xy_osm = _centroids(df_osm)
+    xy_bd = _centroids(df_bd)
 
     # Prepare class normalization + mapping
     if args.match_class:
-        osm_cls_col = args.class_col_osm if args.class_col_osm in g_osm.columns else None
-        bd_cls_col = args.class_col_bd if args.class_col_bd in g_bd.columns else None
+        osm_cls_col = args.class_col_osm if args.class_col_osm in df_osm.columns else None
+        bd_cls_col = args.class_col_bd if args.class_col_bd in df_bd.columns else None
         if osm_cls_col is None or bd_cls_col is None:
             print(
                 "[WARN] match_class demandé mais colonnes de classe manquantes — aucune contrainte appliquée.",
@@ -245,44 +536,37 @@ def main(argv=None):
             )
             args.match_class = False
         else:
-            g_osm["_class_norm"] = g_osm[osm_cls_col].map(_norm_class)
-            g_bd["_class_norm"] = g_bd[bd_cls_col].map(_norm_class)
-            mp = _default_bdtopo_to_osm_map()
-            user_mp = _load_mapping(args.class_map)
-            if user_mp:
-                mp.update(user_mp)
-            g_bd["_class_norm"] = _apply_mapping(g_bd["_class_norm"], mp)
+            # Categoricals: labels normalized once per distinct value
+            h_osm, h_bd = _class_harmonizers(args.class_map)
+            df_osm["_class_norm"] = h_osm.map(df_osm[osm_cls_col])
+            df_bd["_class_norm"] = h_bd.map(df_bd[bd_cls_col])
 
     # --- Diagnostics de classes (facultatif) ---
     if args.diag_classes:
-        # Construire un mapping complet (défaut + utilisateur)
-        mp_all = _default_bdtopo_to_osm_map()
-        user_mp = _load_mapping(args.class_map)
-        if user_mp:
-            mp_all.update(user_mp)
+        # Harmonisation complète (défaut + utilisateur) côté BD TOPO
+        h_osm_diag, h_bd_diag = _class_harmonizers(args.class_map)
 
         def _mk_counts(
-            gdf: gpd.GeoDataFrame,
+            gdf: pd.DataFrame,
             raw_col: str | None,
-            mapping: dict[str, str],
+            harmonizer: ClassHarmonizer,
             label: str,
         ) -> pd.DataFrame:
             if raw_col is None or raw_col not in gdf.columns:
                 return pd.DataFrame(columns=["source", "class", "count_raw", "count_norm"])  # empty
-            sr_raw = gdf[raw_col].map(_norm_class)
-            sr_norm = _apply_mapping(sr_raw, mapping) if mapping else sr_raw
-            vc_raw = sr_raw.value_counts(dropna=True)
-            vc_norm = sr_norm.value_counts(dropna=True)
+            hc = harmonizer.harmonize(gdf[raw_col])
+            vc_raw = hc.raw.astype(object).value_counts(dropna=True).rename_axis(None)
+            vc_norm = hc.mapped.astype(object).value_counts(dropna=True).rename_axis(None)
             dfc = pd.DataFrame({"count_raw": vc_raw, "count_norm": vc_norm}).fillna(0).astype(int).reset_index().rename(columns={"index": "class"})
             dfc.insert(0, "source", label)
             return dfc
 
         # Colonnes de classe choisies (même si match_class est False)
-        osm_cls_raw = args.class_col_osm if args.class_col_osm in g_osm.columns else None
-        bd_cls_raw = args.class_col_bd if args.class_col_bd in g_bd.columns else None
+        osm_cls_raw = args.class_col_osm if args.class_col_osm in df_osm.columns else None
+        bd_cls_raw = args.class_col_bd if args.class_col_bd in df_bd.columns else None
 
-        cs_osm = _mk_counts(g_osm, osm_cls_raw, {}, "osm")
-        cs_bd = _mk_counts(g_bd, bd_cls_raw, mp_all, "bdtopo")
+        cs_osm = _mk_counts(df_osm, osm_cls_raw, h_osm_diag, "osm")
+        cs_bd = _mk_counts(df_bd, bd_cls_raw, h_bd_diag, "bdtopo")
         class_stats = pd.concat([cs_osm, cs_bd], ignore_index=True, sort=False)
 
         if not class_stats.empty:
@@ -303,44 +587,80 @@ def main(argv=None):
         else:
             print("[INFO] Aucune statistique de classes disponible (colonnes introuvables).")
 
-    # Spatial join
-    # Ensure both sides have active geometry named 'geometry' with same CRS;
-    # copy right geometry to a separate column so we can export later.
-    # (Avoids recursion issues in GeoPandas when the right geometry column is renamed.)
-    if g_osm.crs != g_bd.crs:
-        try:
-            g_bd = g_bd.to_crs(g_osm.crs)
-        except Exception as e:
-            warnings.warn(f"[WARN] Reprojection BD→OSM CRS a échoué ({e}); tentative de jonction telle quelle.")
-
-    g_bd_r = g_bd.copy()
-    g_bd_r["geometry_right"] = g_bd_r.geometry  # keep an explicit copy for export
-    # keep active geometry as 'geometry' for the spatial join
-    right_cols = [c for c in g_bd_r.columns if c != "geometry_right"] + ["geometry_right"]
-
-    joined = gpd.sjoin_nearest(
-        g_osm,
-        g_bd_r[right_cols],
-        how="left",
-        max_distance=args.max_dist,
-        distance_col="_dist_m",
-    )
+    # Nearest join: KD-tree on BD centroids, all OSM centroids queried at once.
+    # With --match-class, one index per normalized class and the search runs
+    # per class partition, so the nearest same-class segment is always found.
+    codes_osm = codes_bd = None
+    if args.match_class:
+        codes, uniques = pd.factorize(pd.concat([df_osm["_class_norm"], df_bd["_class_norm"]], ignore_index=True))
+        codes_osm, codes_bd = codes[: len(df_osm)], codes[len(df_osm) :]
+
+    geo_match = None
+    if args.geom_match:
+        geoms_osm = _read_geom_sidecar(in_dir / (args.osm_geom_name or f"{Path(args.osm_name).stem}_geom.parquet"), len(df_osm))
+        geoms_bd = _read_geom_sidecar(in_dir / (args.bd_geom_name or f"{Path(args.bd_name).stem}_geom.parquet"), len(df_bd))
+        geo_match = _geom_match(geoms_osm, geoms_bd, args.max_dist, args.min_overlap, codes_osm, codes_bd)
+        idx, dist, idx_bo = geo_match["idx_ob"], geo_match["dist"], geo_match["idx_bo"]
+        print(f"[INFO] Appariement géométrique: {int(geo_match['n_candidates']):,} paires candidates (dwithin {args.max_dist} m)")
+    elif args.match_class:
+        trees = _build_class_trees(xy_bd, codes_bd)
+        idx, dist = _query_nearest_by_class(trees, xy_osm, codes_osm, args.max_dist)
+        print(f"[INFO] Contrainte de classe: {len(trees)} index BD par classe ({len(uniques)} classes normalisées)")
+        if args.bidirectional:
+            idx_bo, _ = _query_nearest_by_class(_build_class_trees(xy_osm, codes_osm), xy_bd, codes_bd, args.max_dist)
+    else:
+        tree, tree_pos = _build_tree(xy_bd)
+        idx, dist = _query_nearest(tree, tree_pos, xy_osm, args.max_dist)
+        if args.bidirectional:
+            idx_bo, _ = _query_nearest(*_build_tree(xy_osm), xy_bd, args.max_dist)
+
+    # Reverse direction + mutual pairs (a mutual pair within max_dist stays mutual
+    # for any smaller threshold, so --sweep-dists remains exact)
+    mutual = None
+    if args.bidirectional:
+        mutual = _mutual_mask(idx, idx_bo)
+        coverage = _coverage(idx, idx_bo, mutual, args.max_dist)
+        print("[INFO] Couverture par direction:")
+        print(coverage.to_string(index=False))
+        out_coverage = args.out_coverage or (in_dir / "compare__nearest_coverage.csv")
+        coverage.to_csv(out_coverage, index=False)
+        print(f"Écrit (couverture): {out_coverage}")
+
+    # Materialize only the columns needed by the requested outputs
+    join_cols = list(metrics)
+    if args.match_class:
+        join_cols.append("_class_norm")
+    if args.out_matches or args.export_geo:
+        join_cols += ["road_id", "class", "name"]
+    if args.out_matches:
+        for c in extra_keep:
+            base = c[: -len("_left")] if c.endswith("_left") else (c[: -len("_right")] if c.endswith("_right") else c)
+            if base not in join_cols:
+                join_cols.append(base)
+    if args.export_geo:
+        join_cols += ["x_centroid", "y_centroid"]
+    joined = _build_joined(df_osm, df_bd, idx, dist, list(dict.fromkeys(join_cols)))
+    if mutual is not None:
+        joined["_mutual"] = mutual
+    if geo_match is not None:
+        joined["_hausdorff_m"] = geo_match["hausdorff"]
+        joined["_overlap"] = geo_match["overlap"]
 
     # Diagnostics
-    n_total = len(g_osm)
-    n_matched = int(joined["_dist_m"].notna().sum()) if "_dist_m" in joined.columns else len(joined)
+    n_total = len(df_osm)
+    n_matched = int((idx >= 0).sum())
     print(f"[INFO] Appariements trouvés: {n_matched:,} / {n_total:,} (max_dist={args.max_dist} m)")
 
-    # Class constraint (after join: cols suffixed with _left/_right)
+    # Class-constrained runs only report same-class pairs
     if args.match_class:
-        lcls, rcls = _resolve_col(joined, "_class_norm")
-        if lcls and rcls:
-            before = len(joined)
-            joined = joined[joined[lcls].notna() & joined[rcls].notna() & (joined[lcls] == joined[rcls])]
-            after = len(joined)
-            print(f"[INFO] Contrainte de classe: {after:,} / {before:,} appariements conservés")
-        else:
-            warnings.warn("[WARN] Colonnes de classes normalisées manquantes après sjoin — contrainte ignorée.")
+        before = len(joined)
+        joined = joined[idx >= 0].reset_index(drop=True)
+        print(f"[INFO] Contrainte de classe: {len(joined):,} / {before:,} appariements conservés")
+
+    if args.mutual_only:
+        before = len(joined)
+        joined = joined[joined["_mutual"].to_numpy()].reset_index(drop=True)
+        print(f"[INFO] Paires mutuelles: {len(joined):,} / {before:,} appariements conservés")
 
     # Compute diffs
     out_cols: list[str] = []
@@ -364,6 +684,15 @@ def main(argv=None):
         print(f"\nÉcrit: {out_path}")
         return
 
+    # Sweep mode: combined long quantile table for every threshold, then stop
+    if sweep_dists:
+        sweep = _sweep_quantiles(joined[out_cols], joined["_dist_m"].to_numpy(dtype=float), sweep_dists, _parse_quantiles(args.quantiles))
+        out_sweep = args.out_sweep or (in_dir / "nearest_quants_sweep.csv")
+        sweep.to_csv(out_sweep, index=False)
+        print(sweep[sweep["quantile"].round(6) == 0.5].to_string(index=False))
+        print(f"Écrit (balayage distances): {out_sweep}")
+        return
+
     # Summary describe
     summary = joined[out_cols].describe()
     out_summary = args.out_summary or (in_dir / "compare__nearest_diffs.csv")
@@ -373,18 +702,7 @@ def main(argv=None):
 
     # Optional quantiles export
     try:
-        # Parse and validate quantile levels
-        if args.quantiles:
-            try:
-                q_levels = sorted({float(q.strip()) for q in args.quantiles.split(",") if q.strip() != ""})
-            except ValueError:
-                raise ValueError(f"Valeurs de --quantiles invalides: {args.quantiles!r}")
-        else:
-            q_levels = [0.10, 0.25, 0.50, 0.75, 0.90]
-        # keep only in (0,1)
-        q_levels = [q for q in q_levels if 0.0 <= q <= 1.0]
-        if not q_levels:
-            raise ValueError("Aucun quantile valide fourni (attendu valeurs entre 0 et 1).")
+        q_levels = _parse_quantiles(args.quantiles)
         qdf = joined[out_cols].quantile(q_levels)
         # Label index as q0.10, q0.50, etc. to be consistent with plotting tools
         qdf.index = [f"q{q:0.2f}" for q in q_levels]
@@ -398,6 +716,13 @@ def main(argv=None):
     except Exception as e:
         warnings.warn(f"[WARN] Export des quantiles impossible: {e}")
 
+    # Optional mergeable sketches (per-tile runs combined later without the rows)
+    if args.out_sketch:
+        cls_col = next((c for c in ("_class_norm_left", "_class_norm") if c in joined.columns), None)
+        sketches = update_sketches({}, joined, out_cols, by=cls_col)
+        sketches_to_json(sketches, args.out_sketch)
+        print(f"Écrit (sketches): {args.out_sketch}")
+
     # Optional matches export
     if args.out_matches:
         keep = [
@@ -410,6 +735,9 @@ def main(argv=None):
                 "name_left",
                 "name_right",
                 "_dist_m",
+                "_hausdorff_m",
+                "_overlap",
+                "_mutual",
             ]
             if c in joined.columns
         ]
@@ -451,37 +779,13 @@ def main(argv=None):
 
     # Optional Geo export of matches as LineStrings between OSM and BD centroids
     if args.export_geo:
-        geom_left = joined["geometry"] if "geometry" in joined.columns else None
-        geom_right = joined["geometry_right"] if "geometry_right" in joined.columns else None
-        # Fallback: rebuild right geometry from centroid columns if needed
-        if geom_right is None and {"x_centroid_right", "y_centroid_right"}.issubset(joined.columns):
-            try:
-                geom_right = gpd.GeoSeries(
-                    [Point(x, y) if pd.notna(x) and pd.notna(y) else None for x, y in zip(joined["x_centroid_right"], joined["y_centroid_right"])],
-                    crs="EPSG:2154",
-                )
-                joined["geometry_right"] = geom_right
-            except Exception:
-                pass
-        if geom_left is None or ("geometry_right" not in joined.columns):
-            warnings.warn("[WARN] Impossible de créer les segments géométriques (geometry/geometry_right manquants).")
+        xy_cols = ["x_centroid_left", "y_centroid_left", "x_centroid_right", "y_centroid_right"]
+        if not set(xy_cols).issubset(joined.columns):
+            warnings.warn("[WARN] Impossible de créer les segments géométriques (colonnes de centroïdes manquantes).")
         else:
-            # Build LineStrings for rows with both geometries present
-            lines = []
-            for gl, gr in zip(geom_left, joined["geometry_right"]):
-                if gl is not None and gr is not None and pd.notna(gl) and pd.notna(gr):
-                    try:
-                        lines.append(LineString([gl, gr]))
-                    except Exception:
-                        lines.append(None)
-                else:
-                    lines.append(None)
-            gexp = gpd.GeoDataFrame(
-                joined.copy(),
-                geometry=lines,
-                crs="EPSG:2154",
-            )
-            # Keep a compact set of columns
+            # Connector lines from the centroid coordinates in one array call
+            lines = _connector_lines(joined[xy_cols].to_numpy(dtype=float))
+            # Keep a compact set of columns (no copy of the whole joined frame)
             keep = [
                 c
                 for c in [
@@ -496,20 +800,18 @@ def main(argv=None):
                     "diff_radius_min_m",
                     "diff_curv_mean_1perm",
                 ]
-                if c in gexp.columns
+                if c in joined.columns
             ]
-            keep = keep + ["geometry"]
-            gexp = gexp[keep]
+            gexp = gpd.GeoDataFrame(joined[keep], geometry=lines, crs="EPSG:2154")
             # Pick driver from extension
             out_path = Path(args.export_geo)
             ext = out_path.suffix.lower()
             driver = "GPKG" if ext == ".gpkg" else ("GeoJSON" if ext in {".geojson", ".json"} else None)
-            if driver:
-                gexp.to_file(out_path, driver=driver)
-            else:
+            if driver is None:
                 # default to GPKG if unknown
-                gexp.to_file(out_path.with_suffix(".gpkg"), driver="GPKG")
+                driver = "GPKG"
                 out_path = out_path.with_suffix(".gpkg")
+            _write_geo(gexp, out_path, driver)
             print(f"Écrit (segments géo): {out_path}")
 
 
@@ -5,6 +5,8 @@ Résumé global OSM vs BD TOPO :
 - statistiques agrégées
 - histogrammes (clippés au quantile q)
 - gestion des infinis optionnelle pour radius_min_m
+- --stream : lecture par lots + sketches de quantiles (mémoire bornée)
+- --cube : histogrammes lus dans le cube pré-agrégé (analysis.hist_cube)
 """
 
 from __future__ import annotations
@@ -14,6 +16,11 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from rs3_study_curvature.analysis.hist_cube import load_cube, plot_cube_hist
+from rs3_study_curvature.analysis.sketch import ALL, update_sketches
+
+HIST_COLS = ["length_m", "radius_min_m", "curv_mean_1perm"]
+
 
 def _read_parquet(path: Path) -> pd.DataFrame:
     # On lit comme Pandas (non-Geo) car les Parquet générés ne portent pas toujours les meta GeoPandas
@@ -53,7 +60,7 @@ def write_hists(osm: pd.DataFrame, bd: pd.DataFrame, out_dir: Path, q: float, dr
         upper = ss.quantile(q)
         return ss.clip(upper=upper)
 
-    for col in ["length_m", "radius_min_m", "curv_mean_1perm"]:
+    for col in HIST_COLS:
         plt.figure()
         _clip_series(osm[col], q, drop_inf).dropna().hist(bins=60, alpha=0.5, label="OSM")
         _clip_series(bd[col], q, drop_inf).dropna().hist(bins=60, alpha=0.5, label="BDTOPO")
@@ -65,6 +72,74 @@ def write_hists(osm: pd.DataFrame, bd: pd.DataFrame, out_dir: Path, q: float, dr
         plt.close()
 
 
+def quick_summary_stream(path: Path, name: str, drop_inf: bool, batch_size: int = 262_144) -> tuple[dict, dict]:
+    """Comme quick_summary, en une passe par lots : sommes exactes, quantiles par sketch."""
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    cols = [c for c in HIST_COLS if c in pf.schema_arrow.names]
+    sketches: dict = {}
+    len_sum = 0.0
+    for batch in pf.iter_batches(batch_size=batch_size, columns=cols):
+        df = batch.to_pandas()
+        len_sum += float(df["length_m"].sum())
+        if drop_inf:
+            df["radius_min_m"] = df["radius_min_m"].replace([np.inf, -np.inf], np.nan)
+        update_sketches(sketches, df, cols)
+    sk = {c: sketches[c][ALL] for c in sketches}
+    rmin, length = sk["radius_min_m"], sk["length_m"]
+    p10, p50, p90 = rmin.quantile([0.10, 0.50, 0.90]) if rmin.n else (np.nan,) * 3
+    out = {
+        "source": name,
+        "n_segments": int(pf.metadata.num_rows),
+        "len_m_mean": len_sum / length.n if length.n else np.nan,
+        "len_m_median": float(length.quantile(0.5)),
+        "len_m_sum_km": _fmt_km(len_sum),
+        "rmin_p10": float(p10),
+        "rmin_p50": float(p50),
+        "rmin_p90": float(p90),
+        "curv_mean_med": float(sk["curv_mean_1perm"].quantile(0.5)),
+    }
+    return out, sk
+
+
+def write_hists_stream(paths: dict[str, Path], sketches: dict[str, dict], out_dir: Path, q: float, drop_inf: bool = False, batch_size: int = 262_144) -> None:
+    """Histogrammes accumulés lot par lot sur des bornes communes (clip au quantile q du sketch).
+
+    Comme ``write_hists`` : les infinis ne sont écartés qu'avec ``drop_inf``,
+    sinon +inf est ramené au quantile q (dernière classe).
+    """
+    import pyarrow.parquet as pq
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for col in HIST_COLS:
+        sks = {lbl: sketches[lbl][col] for lbl in paths if col in sketches[lbl] and sketches[lbl][col].n}
+        if not sks:
+            continue
+        lo = min(sk.min for sk in sks.values())
+        hi = max(sk.quantile(q) for sk in sks.values())
+        if not (np.isfinite([lo, hi]).all() and hi > lo):
+            print(f"[WARN] {col}: bornes non finies (utiliser --drop-inf) — histogramme ignoré")
+            continue
+        edges = np.linspace(lo, hi, 61)
+        plt.figure()
+        for lbl, sk in sks.items():
+            upper = sk.quantile(q)
+            counts = np.zeros(60)
+            for batch in pq.ParquetFile(paths[lbl]).iter_batches(batch_size=batch_size, columns=[col]):
+                v = batch.column(0).to_numpy(zero_copy_only=False).astype(float)
+                v = v[np.isfinite(v)] if drop_inf else v[~np.isnan(v)]
+                v = np.clip(v, None, upper)
+                counts += np.histogram(v, bins=edges)[0]
+            plt.stairs(counts, edges, fill=True, alpha=0.5, label="OSM" if lbl == "osm" else "BDTOPO")
+        plt.title(col)
+        plt.legend()
+        plt.tight_layout()
+        png = out_dir / f"compare__hist_{col}.png"
+        plt.savefig(png, dpi=150)
+        plt.close()
+
+
 def main():
     ap = argparse.ArgumentParser(description="Résumé rapide OSM vs BDTOPO (tables Parquet non-geo)")
     ap.add_argument("--in-dir", type=Path, default=Path("ref/roadinfo"), help="Dossier des sorties")
@@ -77,6 +152,17 @@ def main():
         help="Quantile de clipping pour les histogrammes",
     )
     ap.add_argument("--drop-inf", action="store_true", help="Ignorer ±inf pour radius_min_m")
+    ap.add_argument(
+        "--stream",
+        action="store_true",
+        help="Lecture par lots : quantiles par sketch fusionnable, sans charger les tables en mémoire",
+    )
+    ap.add_argument(
+        "--cube",
+        type=Path,
+        default=None,
+        help="Cube d'histogrammes (hist_cube.parquet) : figures depuis le cube, sans relire les segments",
+    )
     ap.add_argument(
         "--out-summary",
         default="compare__summary_segments.csv",
@@ -87,20 +173,35 @@ def main():
     in_dir = args.in_dir
     out_summary = in_dir / args.out_summary
 
-    seg_osm = _read_parquet(in_dir / args.osm_name)
-    seg_bd = _read_parquet(in_dir / args.bd_name)
-
-    summary = pd.DataFrame(
-        [
-            quick_summary(seg_osm, "osm", args.drop_inf),
-            quick_summary(seg_bd, "bdtopo", args.drop_inf),
-        ]
-    )
+    if args.stream:
+        paths = {"osm": in_dir / args.osm_name, "bdtopo": in_dir / args.bd_name}
+        rows, sketches = [], {}
+        for lbl, path in paths.items():
+            row, sketches[lbl] = quick_summary_stream(path, lbl, args.drop_inf)
+            rows.append(row)
+        summary = pd.DataFrame(rows)
+    else:
+        seg_osm = _read_parquet(in_dir / args.osm_name)
+        seg_bd = _read_parquet(in_dir / args.bd_name)
+        summary = pd.DataFrame(
+            [
+                quick_summary(seg_osm, "osm", args.drop_inf),
+                quick_summary(seg_bd, "bdtopo", args.drop_inf),
+            ]
+        )
     print(summary)
     summary.to_csv(out_summary, index=False)
     print("\nÉcrit:", out_summary)
 
-    write_hists(seg_osm, seg_bd, in_dir, q=args.q, drop_inf=args.drop_inf)
+    if args.cube is not None:
+        cube = load_cube(args.cube)
+        for col in HIST_COLS:
+            if col in set(cube["metric"]):
+                plot_cube_hist(cube, col, in_dir / f"compare__hist_{col}.png", labels={"osm": "OSM", "bdtopo": "BDTOPO"})
+    elif args.stream:
+        write_hists_stream(paths, sketches, in_dir, q=args.q, drop_inf=args.drop_inf)
+    else:
+        write_hists(seg_osm, seg_bd, in_dir, q=args.q, drop_inf=args.drop_inf)
     print("PNG écrits dans:", in_dir)
 
 
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cube d'histogrammes pré-agrégés : comptes par (source × classe × métrique × bin).
+
+Construit une fois après l'ETL (lecture des segments Parquet par lots), écrit
+un petit Parquet long ``source, class, metric, bin, lo, hi, count``. Les bins
+sont fixes (log-espacés pour rayons, courbures et longueurs) : deux cubes se
+somment directement (tuiles, runs). Les figures de distribution et les tables
+de quantiles des rapports se calculent ensuite depuis le cube, sans relire
+les segments.
+
+Usage :
+  python -m rs3_study_curvature.analysis.hist_cube build --config configs/config.yaml
+  python -m rs3_study_curvature.analysis.hist_cube plot --cube out/hist_cube.parquet --out-dir out/plots/cube
+
+Conventions : le bin 0 reçoit les valeurs < première borne (dont <= 0 et
+-inf), le dernier bin les valeurs >= dernière borne (dont +inf) ; les NaN
+sont ignorés.
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from rs3_study_curvature.data.classes import ClassHarmonizer
+
+try:
+    import pyarrow.parquet as pq
+except Exception:  # pragma: no cover
+    pq = None
+
+ALL = "__all__"
+CUBE_COLUMNS = ["source", "class", "metric", "bin", "lo", "hi", "count"]
+DEFAULT_METRICS = ["length_m", "radius_min_m", "radius_p85_m", "curv_mean_1perm"]
+
+# Bornes fixes (20 bins par décade)
+RADIUS_EDGES = np.logspace(0.0, 5.0, 101)  # 1 m … 100 km
+CURVATURE_EDGES = np.logspace(-6.0, 0.0, 121)  # 1e-6 … 1 1/m
+LENGTH_EDGES = np.logspace(-1.0, 5.0, 121)  # 0.1 m … 100 km
+GENERIC_EDGES = np.logspace(-6.0, 6.0, 241)
+
+
+def metric_edges(metric: str) -> np.ndarray:
+    m = metric.lower()
+    if "radius" in m:
+        return RADIUS_EDGES
+    if "curv" in m or "kappa" in m:
+        return CURVATURE_EDGES
+    if "length" in m:
+        return LENGTH_EDGES
+    return GENERIC_EDGES
+
+
+def _bin_bounds(edges: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    lo = np.concatenate([[-np.inf], edges])
+    hi = np.concatenate([edges, [np.inf]])
+    return lo, hi
+
+
+def bin_index(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Indice de bin 0..len(edges) (sous-/dépassement inclus)."""
+    return np.searchsorted(edges, values, side="right")
+
+
+# -----------------------------------------------------------------------------
+# Construction
+# -----------------------------------------------------------------------------
+
+
+def _batches(path: Path, columns: Sequence[str], batch_size: int) -> Iterable[pd.DataFrame]:
+    if pq is None:  # pragma: no cover
+        yield pd.read_parquet(path, columns=list(columns))
+        return
+    pf = pq.ParquetFile(path)
+    present = [c for c in columns if c in pf.schema_arrow.names]
+    for b in pf.iter_batches(batch_size=batch_size, columns=present):
+        yield b.to_pandas()
+
+
+def build_cube(
+    sources: Dict[str, Path],
+    metrics: Sequence[str] = DEFAULT_METRICS,
+    class_col: str | None = "class",
+    harmonizers: Dict[str, ClassHarmonizer] | None = None,
+    batch_size: int = 262_144,
+) -> pd.DataFrame:
+    """Cube long (CUBE_COLUMNS) ; une passe par lots sur chaque fichier source."""
+    rows: List[pd.DataFrame] = []
+    for source, path in sources.items():
+        h = (harmonizers or {}).get(source) or ClassHarmonizer(sep="_")
+        acc: Dict[str, pd.Series] = {}
+        for df in _batches(Path(path), list(metrics) + ([class_col] if class_col else []), batch_size):
+            if class_col and class_col in df.columns:
+                cls = h.map(df[class_col]).astype(object).fillna("NA").to_numpy()
+            else:
+                cls = np.full(len(df), ALL, dtype=object)
+            for m in metrics:
+                if m not in df.columns:
+                    continue
+                v = pd.to_numeric(df[m], errors="coerce").to_numpy(dtype=float)
+                ok = ~np.isnan(v)
+                b = bin_index(v[ok], metric_edges(m))
+                counts = pd.DataFrame({"class": cls[ok], "bin": b}).value_counts()
+                acc[m] = counts if m not in acc else acc[m].add(counts, fill_value=0)
+        for m, counts in acc.items():
+            lo, hi = _bin_bounds(metric_edges(m))
+            part = counts.rename("count").reset_index()
+            part.insert(0, "source", source)
+            part.insert(2, "metric", m)
+            part["lo"] = lo[part["bin"].to_numpy()]
+            part["hi"] = hi[part["bin"].to_numpy()]
+            part["count"] = part["count"].astype(np.int64)
+            rows.append(part[CUBE_COLUMNS])
+    if not rows:
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+    return pd.concat(rows, ignore_index=True).sort_values(["source", "metric", "class", "bin"], kind="stable").reset_index(drop=True)
+
+
+def merge_cubes(cubes: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """Somme de cubes (mêmes bins fixes), ex. une par tuile."""
+    cat = pd.concat(list(cubes), ignore_index=True)
+    out = cat.groupby(["source", "class", "metric", "bin", "lo", "hi"], as_index=False, sort=True)["count"].sum()
+    return out[CUBE_COLUMNS]
+
+
+def write_cube(cube: pd.DataFrame, path: Path) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    cube.to_parquet(path, index=False)
+
+
+def load_cube(path: Path) -> pd.DataFrame:
+    return pd.read_parquet(path)
+
+
+# -----------------------------------------------------------------------------
+# Lecture
+# -----------------------------------------------------------------------------
+
+
+def cube_hist(cube: pd.DataFrame, metric: str, source: str, cls: str | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """(bornes, comptes) du bin complet 0..len(edges) pour une source (et une classe)."""
+    edges = metric_edges(metric)
+    sel = cube[(cube["metric"] == metric) & (cube["source"] == source)]
+    if cls is not None:
+        sel = sel[sel["class"] == cls]
+    counts = np.bincount(sel["bin"].to_numpy(dtype=np.int64), weights=sel["count"].to_numpy(dtype=float), minlength=len(edges) + 1)
+    return edges, counts
+
+
+def cube_quantiles(edges: np.ndarray, counts: np.ndarray, qs: Sequence[float]) -> np.ndarray:
+    """Quantiles approchés (interpolation log dans le bin) ; erreur < largeur d'un bin."""
+    n = counts.sum()
+    if n <= 0:
+        return np.full(len(qs), np.nan)
+    lo, hi = _bin_bounds(edges)
+    cum = np.cumsum(counts)
+    out = []
+    for q in qs:
+        target = q * n
+        i = int(np.searchsorted(cum, target, side="left"))
+        i = min(i, len(counts) - 1)
+        if not np.isfinite(lo[i]) or not np.isfinite(hi[i]):
+            out.append(edges[0] if i == 0 else edges[-1])
+            continue
+        prev = cum[i - 1] if i > 0 else 0.0
+        frac = (target - prev) / counts[i] if counts[i] else 0.0
+        out.append(float(np.exp(np.log(lo[i]) + frac * (np.log(hi[i]) - np.log(lo[i])))))
+    return np.asarray(out, dtype=float)
+
+
+def cube_summary(cube: pd.DataFrame, qs: Sequence[float] = (0.10, 0.50, 0.90)) -> pd.DataFrame:
+    """Table source × classe × métrique : n + quantiles approchés (global = ALL)."""
+    rows = []
+    for (source, metric), sel in cube.groupby(["source", "metric"], sort=True):
+        classes = [None] + sorted(sel["class"].unique().tolist()) if sel["class"].nunique() > 1 else [None]
+        for cls in classes:
+            edges, counts = cube_hist(sel, metric, source, cls)
+            row = {"source": source, "class": ALL if cls is None else cls, "metric": metric, "n": int(counts.sum())}
+            row.update({f"q{q:0.2f}": v for q, v in zip(qs, cube_quantiles(edges, counts, qs))})
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def plot_cube_hist(cube: pd.DataFrame, metric: str, out_path: Path, cls: str | None = None, labels: Dict[str, str] | None = None, xlabel: str | None = None, dpi: int = 140) -> None:
+    """Densité par décade de chaque source (axe x logarithmique)."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(9, 6), dpi=dpi)
+    for source in sorted(cube["source"].unique()):
+        edges, counts = cube_hist(cube, metric, source, cls)
+        n = counts.sum()
+        if n <= 0:
+            continue
+        inner = counts[1:-1]
+        dens = inner / (n * np.diff(np.log10(edges)))
+        ax.stairs(dens, edges, fill=True, alpha=0.5, label=f"{(labels or {}).get(source, source)} (n={int(n):,})")
+    ax.set_xscale("log")
+    ax.set_xlabel(xlabel or metric)
+    ax.set_ylabel("Densité par décade")
+    ax.set_title(f"Distribution — {metric}" + (f" — {cls}" if cls else ""))
+    ax.legend()
+    fig.tight_layout()
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(out_path)
+    plt.close(fig)
+
+
+def plot_cube(cube: pd.DataFrame, out_dir: Path, by_class: bool = True, labels: Dict[str, str] | None = None) -> List[Path]:
+    """Toutes les figures du cube (global + par classe commune aux sources)."""
+    out_dir = Path(out_dir)
+    written: List[Path] = []
+    source_labels = {"osm": "OSM", "bdtopo": "BD TOPO"}
+    for metric in sorted(cube["metric"].unique()):
+        png = out_dir / f"{metric}__hist_cube.png"
+        plot_cube_hist(cube, metric, png, labels=source_labels, xlabel=(labels or {}).get(metric))
+        written.append(png)
+        if not by_class:
+            continue
+        sel = cube[cube["metric"] == metric]
+        per_source = [set(g["class"]) for _, g in sel.groupby("source")]
+        common = sorted(set.intersection(*per_source) - {ALL, "NA"}) if per_source else []
+        for cls in common:
+            png = out_dir / cls / f"{metric}__hist_cube.png"
+            plot_cube_hist(sel, metric, png, cls=cls, labels=source_labels, xlabel=(labels or {}).get(metric))
+            written.append(png)
+    return written
+
+
+# -----------------------------------------------------------------------------
+# CLI
+# -----------------------------------------------------------------------------
+
+
+def cube_path_from_config(cfg: dict) -> Path:
+    outputs = cfg.get("outputs", {}) or {}
+    return Path(outputs.get("hist_cube") or Path(outputs.get("root") or "out") / "hist_cube.parquet")
+
+
+def build_from_config(cfg: dict, out: Path | None = None) -> Path:
+    metrics = [m["name"] if isinstance(m, dict) else m for m in cfg.get("metrics", [])]
+    metrics = list(dict.fromkeys(metrics + DEFAULT_METRICS))
+    sources = {"osm": Path(cfg["inputs"]["osm"]), "bdtopo": Path(cfg["inputs"]["bdtopo"])}
+    harmonizers = {s: ClassHarmonizer.from_config(cfg, s, sep="_") for s in sources}
+    cube = build_cube(sources, metrics, class_col=cfg.get("class_column", "class"), harmonizers=harmonizers)
+    out = out or cube_path_from_config(cfg)
+    write_cube(cube, out)
+    print(f"✅ Cube d'histogrammes ({len(cube):,} cellules non vides) → {out}")
+    return out
+
+
+def main(argv=None):
+    import yaml
+
+    ap = argparse.ArgumentParser(description="Cube d'histogrammes pré-agrégés (source × classe × métrique × bin)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="Construire le cube depuis les segments (config inputs.*)")
+    b.add_argument("--config", required=True)
+    b.add_argument("--out", type=Path, default=None, help="Parquet de sortie (défaut: outputs.hist_cube ou <root>/hist_cube.parquet)")
+    m = sub.add_parser("merge", help="Sommer des cubes (tuiles)")
+    m.add_argument("--inputs", nargs="+", type=Path, required=True)
+    m.add_argument("--out", type=Path, required=True)
+    p = sub.add_parser("plot", help="Figures + résumé de quantiles depuis le cube")
+    p.add_argument("--cube", type=Path, required=True)
+    p.add_argument("--out-dir", type=Path, required=True)
+    p.add_argument("--no-by-class", action="store_true")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        with open(args.config, "r", encoding="utf-8") as f:
+            cfg = yaml.safe_load(f) or {}
+        build_from_config(cfg, args.out)
+    elif args.cmd == "merge":
+        cube = merge_cubes(load_cube(p) for p in args.inputs)
+        write_cube(cube, args.out)
+        print(f"✅ Cube fusionné → {args.out}")
+    else:
+        cube = load_cube(args.cube)
+        written = plot_cube(cube, args.out_dir, by_class=not args.no_by_class)
+        summary = cube_summary(cube)
+        summary.to_csv(args.out_dir / "hist_cube_summary.csv", index=False)
+        print(f"✅ {len(written)} figure(s) + résumé → {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ Entrées possibles (plusieurs fichiers):
  - nearest_quants_d30.csv
  - nearest_quants_d50.csv
 (Le script extrait automatiquement d=20/30/50 depuis le nom de fichier.)
+ - nearest_quants_sweep.csv (compare_nearest --sweep-dists, colonne 'd' incluse)
 
 Formats CSV acceptés:
  1) Long:
@@ -105,9 +106,9 @@ def tidy_from_csv(path: Path) -> pd.DataFrame:
     """
     df = pd.read_csv(path)
 
-    # Si format "long" déjà conforme
+    # Si format "long" déjà conforme (colonne 'd' conservée si présente, ex: --sweep-dists)
     if {"metric", "quantile", "value"}.issubset(df.columns):
-        out = df[["metric", "quantile", "value"]].copy()
+        out = df[["metric", "quantile", "value"] + (["d"] if "d" in df.columns else [])].copy()
         out["quantile"] = out["quantile"].astype(float)
         return out
 
@@ -180,17 +181,19 @@ def main():
 
     for f in args.in_files:
         path = Path(f)
-        d = extract_d_from_name(path)
-        if d is None:
-            print(f"[WARN] distance introuvable dans le nom: {path.name} — ignoré.")
-            continue
         try:
             df_long = tidy_from_csv(path)
         except Exception as e:
             print(f"[WARN] {path}: {e} — ignoré.")
             continue
 
-        df_long["d"] = d
+        # Table de balayage (compare_nearest --sweep-dists): distances déjà en colonne
+        if "d" not in df_long.columns:
+            d = extract_d_from_name(path)
+            if d is None:
+                print(f"[WARN] distance introuvable dans le nom: {path.name} — ignoré.")
+                continue
+            df_long["d"] = d
         all_long.append(df_long)
 
     if not all_long:
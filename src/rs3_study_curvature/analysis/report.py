@@ -5,6 +5,8 @@ import os
 from typing import Optional
 import pandas as pd
 
+from rs3_study_curvature.viz.cache import write_text_if_changed
+
 
 def _generate_report(*, kpis: Optional[str] = None, plots_dir: Optional[str] = None, docs_rel: Optional[str] = None, out: str) -> None:
     """Core generator used by both argparse CLI and Typer wrapper.
@@ -54,10 +56,9 @@ def _generate_report(*, kpis: Optional[str] = None, plots_dir: Optional[str] = N
             "",
         ]
 
-    os.makedirs(os.path.dirname(out), exist_ok=True)
-    with open(out, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
-    print(f"✅ Rapport courbure → {out}")
+    # Contenu identique → fichier non réécrit (mtime stable, mkdocs ne reconstruit pas)
+    changed = write_text_if_changed(out, "\n".join(lines))
+    print(f"✅ Rapport courbure → {out}" + ("" if changed else " (inchangé)"))
 
 
 def main():
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sketches de quantiles fusionnables (type KLL) pour les statistiques par tuile.
+
+Un ``QuantileSketch`` résume une colonne avec une erreur de rang bornée
+(~1.7/k en relatif pour k=200) et une mémoire en O(k log(n/k)). Deux sketches
+construits sur des tuiles/lots différents se fusionnent (``merge``) sans perte
+supplémentaire notable : les quantiles globaux et par classe se calculent donc
+sans jamais matérialiser toutes les lignes.
+
+Usage CLI (quantiles sur des sorties ETL tuilées, lues par lots) :
+  python -m rs3_study_curvature.analysis.sketch \
+      --inputs out/tiles/*/roadinfo_segments_osm.parquet \
+      --cols radius_min_m curv_mean_1perm --by class \
+      --quantiles 0.10,0.50,0.90 --out out/quantiles_osm.csv
+
+Les sketches sérialisés (JSON, cf. ``compare_nearest --out-sketch``) peuvent
+être fusionnés avec ``--merge-json a.json b.json ...``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except Exception:  # pragma: no cover
+    pq = None
+
+_C = 2.0 / 3.0  # décroissance géométrique des capacités (KLL)
+_MIN_CAP = 2
+
+
+class QuantileSketch:
+    """Sketch KLL vectorisé (numpy), fusionnable et sérialisable.
+
+    Les valeurs NaN sont ignorées ; les ±inf sont conservées (le rang reste
+    défini). min/max sont exacts, ``quantile(0)``/``quantile(1)`` aussi.
+    Tant qu'aucun compactage n'a eu lieu, les quantiles sont exacts
+    (convention ``inverted_cdf``).
+    """
+
+    def __init__(self, k: int = 200, seed: int | None = None):
+        if k < 8:
+            raise ValueError("k doit être >= 8")
+        self.k = int(k)
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._levels: list[np.ndarray] = [np.empty(0, dtype=float)]
+        self._rng = np.random.default_rng(seed)
+
+    # ------------------------------------------------------------------ build
+    def _capacity(self, h: int) -> int:
+        depth = len(self._levels) - 1 - h
+        return max(_MIN_CAP, int(np.ceil(self.k * _C**depth)))
+
+    def _size(self) -> int:
+        return int(sum(lv.size for lv in self._levels))
+
+    def _compress(self) -> None:
+        # Compacte chaque niveau plein : tri, un élément sur deux (décalage
+        # aléatoire) promu au niveau supérieur avec un poids doublé.
+        h = 0
+        while h < len(self._levels):
+            lv = self._levels[h]
+            if lv.size >= self._capacity(h):
+                if h + 1 == len(self._levels):
+                    self._levels.append(np.empty(0, dtype=float))
+                lv = np.sort(lv, kind="stable")
+                keep = lv[-1:] if lv.size % 2 else lv[:0]
+                even = lv[: lv.size - keep.size]
+                promoted = even[int(self._rng.integers(2)) :: 2]
+                self._levels[h] = keep.copy()
+                self._levels[h + 1] = np.concatenate([self._levels[h + 1], promoted])
+            h += 1
+
+    def update(self, values: Iterable[float] | np.ndarray) -> "QuantileSketch":
+        x = np.asarray(values, dtype=float).ravel()
+        x = x[~np.isnan(x)]
+        if x.size == 0:
+            return self
+        self.n += int(x.size)
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+        self._levels[0] = np.concatenate([self._levels[0], x])
+        self._compress()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.k != self.k:
+            raise ValueError(f"Sketches incompatibles (k={self.k} vs k={other.k})")
+        if other.n == 0:
+            return self
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0, dtype=float))
+        for h, lv in enumerate(other._levels):
+            self._levels[h] = np.concatenate([self._levels[h], lv])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    # ------------------------------------------------------------------ query
+    def _weighted(self) -> tuple[np.ndarray, np.ndarray]:
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(lv.size, 2.0**h) for h, lv in enumerate(self._levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q: float | Sequence[float]) -> float | np.ndarray:
+        qs = np.atleast_1d(np.asarray(q, dtype=float))
+        if self.n == 0:
+            out = np.full(qs.shape, np.nan)
+        else:
+            items, cw = self._weighted()
+            # Poids total des items = n (à l'arrondi des compactages près)
+            pos = np.searchsorted(cw, qs * cw[-1], side="left")
+            out = items[np.clip(pos, 0, items.size - 1)]
+            out = np.where(qs <= 0.0, self.min, np.where(qs >= 1.0, self.max, out))
+        return float(out[0]) if np.ndim(q) == 0 else out
+
+    def rank(self, x: float) -> float:
+        """Fraction estimée des valeurs <= x."""
+        if self.n == 0:
+            return float("nan")
+        items, cw = self._weighted()
+        i = np.searchsorted(items, x, side="right")
+        return float(cw[i - 1] / cw[-1]) if i > 0 else 0.0
+
+    # ------------------------------------------------------------------ io
+    def to_dict(self) -> dict:
+        return {
+            "k": self.k,
+            "n": self.n,
+            "min": self.min if self.n else None,
+            "max": self.max if self.n else None,
+            "levels": [lv.tolist() for lv in self._levels],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict, seed: int | None = None) -> "QuantileSketch":
+        sk = cls(k=int(d["k"]), seed=seed)
+        sk.n = int(d["n"])
+        if sk.n:
+            sk.min, sk.max = float(d["min"]), float(d["max"])
+        sk._levels = [np.asarray(lv, dtype=float) for lv in d["levels"]] or [np.empty(0, dtype=float)]
+        return sk
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __repr__(self) -> str:
+        return f"QuantileSketch(k={self.k}, n={self.n}, retained={self._size()})"
+
+
+# -----------------------------------------------------------------------------
+# Sketches groupés (colonne × classe)
+# -----------------------------------------------------------------------------
+
+ALL = "__all__"
+
+Sketches = Dict[str, Dict[str, QuantileSketch]]
+
+
+def update_sketches(
+    sketches: Sketches,
+    df: pd.DataFrame,
+    cols: Sequence[str],
+    by: str | None = None,
+    k: int = 200,
+    seed: int | None = None,
+) -> Sketches:
+    """Ajoute un lot ``df`` à ``sketches[col][groupe]`` (groupe ``ALL`` = global).
+
+    Le partitionnement par classe se fait une fois par lot (codes + tri).
+    """
+    groups: list[tuple[str, np.ndarray | None]] = [(ALL, None)]
+    if by is not None and by in df.columns:
+        codes, uniques = pd.factorize(df[by].astype("string").fillna("NA"), sort=False)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        groups += [(str(u), order[bounds[i] : bounds[i + 1]]) for i, u in enumerate(uniques)]
+    for col in cols:
+        if col not in df.columns:
+            continue
+        vals = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+        per_col = sketches.setdefault(col, {})
+        for g, rows in groups:
+            sk = per_col.get(g)
+            if sk is None:
+                sk = per_col[g] = QuantileSketch(k=k, seed=seed)
+            sk.update(vals if rows is None else vals[rows])
+    return sketches
+
+
+def merge_sketches(a: Sketches, b: Sketches) -> Sketches:
+    for col, per_col in b.items():
+        dst = a.setdefault(col, {})
+        for g, sk in per_col.items():
+            if g in dst:
+                dst[g].merge(sk)
+            else:
+                dst[g] = sk
+    return a
+
+
+def sketch_parquet(
+    paths: Iterable[Path],
+    cols: Sequence[str],
+    by: str | None = None,
+    k: int = 200,
+    batch_size: int = 262_144,
+    seed: int | None = None,
+    drop_inf: bool = False,
+) -> Sketches:
+    """Sketches de ``cols`` sur une suite de Parquet, lus par lots (mémoire bornée)."""
+    sketches: Sketches = {}
+    read_cols = list(dict.fromkeys(list(cols) + ([by] if by else [])))
+    for path in paths:
+        if pq is not None:
+            pf = pq.ParquetFile(path)
+            present = [c for c in read_cols if c in pf.schema_arrow.names]
+            batches = (b.to_pandas() for b in pf.iter_batches(batch_size=batch_size, columns=present))
+        else:  # pragma: no cover
+            batches = iter([pd.read_parquet(path)])
+        for df in batches:
+            if drop_inf:
+                num = [c for c in cols if c in df.columns]
+                df[num] = df[num].replace([np.inf, -np.inf], np.nan)
+            update_sketches(sketches, df, cols, by=by, k=k, seed=seed)
+    return sketches
+
+
+def sketches_to_json(sketches: Sketches, path: Path) -> None:
+    payload = {col: {g: sk.to_dict() for g, sk in per_col.items()} for col, per_col in sketches.items()}
+    Path(path).write_text(json.dumps(payload), encoding="utf-8")
+
+
+def sketches_from_json(path: Path) -> Sketches:
+    payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    return {col: {g: QuantileSketch.from_dict(d) for g, d in per_col.items()} for col, per_col in payload.items()}
+
+
+def sketches_to_frame(sketches: Sketches, q_levels: Sequence[float]) -> pd.DataFrame:
+    """Table longue : metric, group, quantile, value, count."""
+    rows = []
+    for col, per_col in sketches.items():
+        for g, sk in per_col.items():
+            for q, v in zip(q_levels, sk.quantile(list(q_levels))):
+                rows.append({"metric": col, "group": g, "quantile": float(q), "value": float(v), "count": sk.n})
+    return pd.DataFrame(rows, columns=["metric", "group", "quantile", "value", "count"])
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Quantiles globaux/par classe via sketches fusionnables (lecture par lots)")
+    ap.add_argument("--inputs", nargs="*", type=Path, default=[], help="Fichiers Parquet (ex: une sortie ETL par tuile)")
+    ap.add_argument("--merge-json", nargs="*", type=Path, default=[], help="Sketches sérialisés à fusionner (JSON)")
+    ap.add_argument("--cols", nargs="+", default=["radius_min_m", "curv_mean_1perm", "length_m"])
+    ap.add_argument("--by", default=None, help="Colonne de groupement (ex: class)")
+    ap.add_argument("--quantiles", default="0.10,0.25,0.50,0.75,0.90")
+    ap.add_argument("--k", type=int, default=200, help="Taille du sketch (erreur de rang ~1.7/k)")
+    ap.add_argument("--batch-size", type=int, default=262_144)
+    ap.add_argument("--drop-inf", action="store_true", help="Ignorer ±inf")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--out", type=Path, default=Path("quantiles_sketch.csv"))
+    ap.add_argument("--out-json", type=Path, default=None, help="Sketches fusionnés (JSON) pour une fusion ultérieure")
+    args = ap.parse_args(argv)
+
+    if not args.inputs and not args.merge_json:
+        ap.error("--inputs ou --merge-json requis")
+    q_levels = sorted({float(q) for q in args.quantiles.split(",") if q.strip()})
+
+    sketches = sketch_parquet(args.inputs, args.cols, by=args.by, k=args.k, batch_size=args.batch_size, seed=args.seed, drop_inf=args.drop_inf)
+    for path in args.merge_json:
+        merge_sketches(sketches, sketches_from_json(path))
+
+    table = sketches_to_frame(sketches, q_levels)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(args.out, index=False)
+    print(table[table["group"] == ALL].to_string(index=False))
+    print(f"Écrit: {args.out}")
+    if args.out_json:
+        sketches_to_json(sketches, args.out_json)
+        print(f"Écrit (sketches): {args.out_json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,15 @@ import time
 import yaml
 import pandas as pd
 import numpy as np
-from rs3_study_curvature.io_utils import load_pair, ensure_numeric_columns
-from rs3_study_curvature.plot_utils import plot_hist_kde, plot_box_violin
+from typing import Dict, List, Tuple
+
+from rs3_study_curvature.io import load_pair, ensure_numeric_columns
+from rs3_study_curvature.viz.utils import plot_hist_kde, plot_box_violin
+from rs3_study_curvature.data.classes import ClassHarmonizer
+from rs3_study_curvature.analysis.utils import summarize_metric, results_to_df
+
+# classe -> métrique -> (valeurs OSM, valeurs BD TOPO), sans NaN
+ClassGroups = Dict[str, Dict[str, Tuple[np.ndarray, np.ndarray]]]
 
 
 def _ensure_dir(p: str):
@@ -63,6 +70,62 @@ def resolve_metric_series(df: pd.DataFrame, metric: str) -> pd.Series | None:
     return None
 
 
+def _partition(codes: np.ndarray, n_classes: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Tri stable par code de classe : (ordre des lignes, bornes de chaque classe)."""
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(n_classes + 1))
+    return order, bounds
+
+
+def prepare_groups(
+    osm: pd.DataFrame,
+    bd: pd.DataFrame,
+    cls_osm: pd.Series,
+    cls_bd: pd.Series,
+    metric_names: List[str],
+) -> ClassGroups:
+    """Partitionne les deux tables par classe en une passe et extrait toutes les métriques.
+
+    ``cls_osm``/``cls_bd`` sont des Categoricals alignés sur les tables. Chaque
+    métrique est résolue une seule fois sur la table entière, réordonnée par
+    classe puis découpée en vues par bornes (pas de filtre par classe).
+    """
+    classes = sorted(set(cls_osm.cat.categories).intersection(cls_bd.cat.categories))
+    cats = pd.Index(classes, dtype=object)
+    codes_osm = cls_osm.cat.set_categories(cats).cat.codes.to_numpy()
+    codes_bd = cls_bd.cat.set_categories(cats).cat.codes.to_numpy()
+    # les lignes hors classes communes (code -1) tombent avant la première borne
+    order_osm, bounds_osm = _partition(codes_osm, len(cats))
+    order_bd, bounds_bd = _partition(codes_bd, len(cats))
+
+    groups: ClassGroups = {str(c): {} for c in classes}
+    for m in metric_names:
+        s_osm = resolve_metric_series(osm, m)
+        s_bd = resolve_metric_series(bd, m)
+        if s_osm is None or s_bd is None:
+            print(f"[SKIP] '{m}' absent (ou non dérivable) d’un côté.")
+            continue
+        v_osm = s_osm.to_numpy(dtype=float)[order_osm]
+        v_bd = s_bd.to_numpy(dtype=float)[order_bd]
+        for i, c in enumerate(classes):
+            a = v_osm[bounds_osm[i] : bounds_osm[i + 1]]
+            b = v_bd[bounds_bd[i] : bounds_bd[i + 1]]
+            groups[str(c)][m] = (a[~np.isnan(a)], b[~np.isnan(b)])
+    return groups
+
+
+def summarize_groups(groups: ClassGroups) -> pd.DataFrame:
+    """Statistiques/tests par classe et métrique (tri unique par échantillon)."""
+    frames = []
+    for c, per_metric in groups.items():
+        results = [summarize_metric(m, a, b) for m, (a, b) in per_metric.items() if len(a) > 1 and len(b) > 1]
+        if results:
+            df = results_to_df(results)
+            df.insert(0, "class", c)
+            frames.append(df)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
 def main():
     ap = argparse.ArgumentParser(description="OSM vs BD TOPO — Distributions par classe")
     ap.add_argument("--config", required=True)
@@ -88,29 +151,33 @@ def main():
     class_col = _resolve_class_col(osm, bd, cfg, args.class_col)
     print(f"[by-class] Utilisation de la colonne de classe: {class_col}")
 
-    osm = ensure_numeric_columns(osm, metric_names + [class_col])
-    bd = ensure_numeric_columns(bd, metric_names + [class_col])
+    # Seules les métriques sont converties : la colonne de classe reste textuelle
+    osm = ensure_numeric_columns(osm, metric_names)
+    bd = ensure_numeric_columns(bd, metric_names)
 
-    classes = sorted(list(set(pd.Series(osm[class_col]).dropna().unique()).intersection(set(pd.Series(bd[class_col]).dropna().unique()))))
+    # Classes harmonisées (catégorielles), partition unique des deux tables
+    cls_osm = ClassHarmonizer.from_config(cfg, "osm", sep="_").map(osm[class_col])
+    cls_bd = ClassHarmonizer.from_config(cfg, "bdtopo", sep="_").map(bd[class_col])
+    groups = prepare_groups(osm, bd, cls_osm, cls_bd, metric_names)
+    print(f"[by-class] {len(groups)} classe(s) commune(s): {list(groups)[:10]}{'...' if len(groups) > 10 else ''}")
 
     ts = time.strftime("%Y%m%d_%H%M%S")
     out_root = cfg["outputs"]["plots_dir"]
     out_dir_root = os.path.join(out_root, f"by_class_{ts}")
     _ensure_dir(out_dir_root)
 
-    for c in classes:
-        osm_c = osm[osm[class_col] == c]
-        bd_c = bd[bd[class_col] == c]
+    summary = summarize_groups(groups)
+    if not summary.empty:
+        out_csv = os.path.join(out_dir_root, "by_class_stats.csv")
+        summary.to_csv(out_csv, index=False)
+        print(f"[by-class] Statistiques par classe → {out_csv}")
+
+    for c, per_metric in groups.items():
         out_dir = os.path.join(out_dir_root, c)
         _ensure_dir(out_dir)
-        for m in metric_names:
-            s_osm = resolve_metric_series(osm_c, m)
-            s_bd = resolve_metric_series(bd_c, m)
-            if s_osm is None or s_bd is None:
-                print(f"[SKIP {c}] '{m}' absent (ou non dérivable) d’un côté.")
-                continue
-            tmp_osm = pd.DataFrame({m: pd.to_numeric(s_osm, errors="coerce")})
-            tmp_bd = pd.DataFrame({m: pd.to_numeric(s_bd, errors="coerce")})
+        for m, (a, b) in per_metric.items():
+            tmp_osm = pd.DataFrame({m: a})
+            tmp_bd = pd.DataFrame({m: b})
             # Histogrammes + KDE
             out_hist = os.path.join(out_dir, f"{m}__hist_kde.png")
             plot_hist_kde(
@@ -18,6 +18,9 @@ class TestResult:
     std_osm: float
     std_bd: float
     diff_mean: float
+    median_osm: float
+    median_bd: float
+    diff_median: float
     # Tests
     t_welch: float
     p_t_welch: float
@@ -40,62 +43,262 @@ def _cohens_d(x: np.ndarray, y: np.ndarray) -> float:
     return (np.mean(x) - np.mean(y)) / np.sqrt(pooled)
 
 
+def _quantile_sorted(xs: np.ndarray, q: float) -> float:
+    # Quantile (interpolation linéaire, comme np.quantile) sur un tableau déjà trié
+    n = len(xs)
+    if n == 0:
+        return np.nan
+    pos = q * (n - 1)
+    lo = int(np.floor(pos))
+    hi = min(lo + 1, n - 1)
+    return float(xs[lo] + (pos - lo) * (xs[hi] - xs[lo]))
+
+
+def _run_lengths(xs: np.ndarray) -> np.ndarray:
+    # longueurs des séries d'ex-aequo d'un tableau trié
+    return np.diff(np.r_[0, np.flatnonzero(np.diff(xs)) + 1, len(xs)])
+
+
+def _rank_stats(xs: np.ndarray, ys: np.ndarray) -> Dict[str, float]:
+    """KS, Mann-Whitney U (+ p asymptotiques) et delta de Cliff depuis deux échantillons triés.
+
+    Un seul tri par échantillon (fait par l'appelant), puis deux recherches
+    dichotomiques croisées : #(y <= x) pour chaque x et #(x <= y) pour chaque y
+    suffisent aux trois statistiques.
+    """
+    nx, ny = len(xs), len(ys)
+    if nx == 0 or ny == 0:
+        return {"ks_stat": np.nan, "p_ks": np.nan, "mw_stat": np.nan, "p_mw": np.nan, "cliffs_delta": np.nan}
+    y_le_x = np.searchsorted(ys, xs, side="right")
+    x_le_y = np.searchsorted(xs, ys, side="right")
+    nxy = float(nx) * float(ny)
+
+    # KS : écart max des répartitions empiriques, évalué aux points des deux échantillons
+    rx, ry = _run_lengths(xs), _run_lengths(ys)
+    x_le_x = np.repeat(np.cumsum(rx), rx)
+    y_le_y = np.repeat(np.cumsum(ry), ry)
+    ks = float(max(np.max(np.abs(x_le_x / nx - y_le_x / ny)), np.max(np.abs(x_le_y / nx - y_le_y / ny))))
+    m, n = max(nx, ny), min(nx, ny)
+    p_ks = float(np.clip(stats.kstwo.sf(ks, np.round(m * n / (m + n))), 0.0, 1.0))
+
+    # Mann-Whitney : U1 = #(x > y) + 0.5 #(x == y), avec #(x > y) = nx ny - sum #(x <= y)
+    u1 = 0.5 * (nxy - float(x_le_y.sum()) + float(y_le_x.sum()))
+    # p asymptotique (correction des ex-aequo et de continuité, comme scipy) ;
+    # les ex-aequo globaux viennent de la fusion des deux séries triées (timsort, linéaire)
+    ntot = nx + ny
+    runs = _run_lengths(np.sort(np.concatenate([xs, ys]), kind="stable")).astype(float)
+    tie_term = float((runs**3 - runs).sum())
+    sd = np.sqrt(nxy / 12.0 * ((ntot + 1) - tie_term / (ntot * (ntot - 1)))) if ntot > 1 else 0.0
+    u = max(u1, nxy - u1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (u - nxy / 2.0 - 0.5) / sd
+    p_mw = float(np.clip(2.0 * stats.norm.sf(z), 0.0, 1.0))
+
+    # Cliff : (#(x > y) - #(x < y)) / (nx ny) = (2 U1 - nx ny) / (nx ny)
+    cliffs = (2.0 * u1 - nxy) / nxy
+    return {"ks_stat": ks, "p_ks": p_ks, "mw_stat": u1, "p_mw": p_mw, "cliffs_delta": cliffs}
+
+
 def _cliffs_delta(x: np.ndarray, y: np.ndarray) -> float:
-    # Mesure non-paramétrique d'effet (entre -1 et 1)
-    # Implémentation O((n+m) log (n+m)) via tri et comptage.
-    x_sorted = np.sort(x)
-    y_sorted = np.sort(y)
-    i = j = more = less = 0
-    nx, ny = len(x_sorted), len(y_sorted)
-    while i < nx and j < ny:
-        if x_sorted[i] > y_sorted[j]:
-            more += nx - i
-            j += 1
-        elif x_sorted[i] < y_sorted[j]:
-            less += ny - j
-            i += 1
-        else:
-            # égalité : avancer les deux
-            i += 1
-            j += 1
-    denom = nx * ny
-    return (more - less) / denom if denom else np.nan
+    # Mesure non-paramétrique d'effet (entre -1 et 1), ex-aequo comptés exactement
+    return _rank_stats(np.sort(x), np.sort(y))["cliffs_delta"]
 
 
 def run_all_tests(a: np.ndarray, b: np.ndarray) -> Tuple[float, float, float, float, float, float]:
-    # Welch t-test (variances potentiellement inégales)
-    t_welch, p_t = stats.ttest_ind(a, b, equal_var=False, nan_policy="omit")
-    # KS test (distributions)
-    ks_stat, p_ks = stats.ks_2samp(a, b, method="asymp")
-    # Mann-Whitney (différence de rangs)
-    mw_stat, p_mw = stats.mannwhitneyu(a, b, alternative="two-sided", method="asymptotic")
-    return t_welch, p_t, ks_stat, p_ks, mw_stat, p_mw
+    # Welch t-test (variances potentiellement inégales) sur les moments
+    a = a[~np.isnan(a)]
+    b = b[~np.isnan(b)]
+    t_welch, p_t = stats.ttest_ind_from_stats(np.mean(a), np.std(a, ddof=1), len(a), np.mean(b), np.std(b, ddof=1), len(b), equal_var=False)
+    # KS + Mann-Whitney sur les échantillons triés une seule fois
+    r = _rank_stats(np.sort(a), np.sort(b))
+    return t_welch, p_t, r["ks_stat"], r["p_ks"], r["mw_stat"], r["p_mw"]
 
 
 def summarize_metric(metric: str, a: np.ndarray, b: np.ndarray) -> TestResult:
-    a = a[~np.isnan(a)]
-    b = b[~np.isnan(b)]
-    t_welch, p_t, ks_stat, p_ks, mw_stat, p_mw = run_all_tests(a, b)
+    a = np.sort(a[~np.isnan(a)])
+    b = np.sort(b[~np.isnan(b)])
+    na, nb = len(a), len(b)
+    mean_a = float(np.mean(a)) if na else np.nan
+    mean_b = float(np.mean(b)) if nb else np.nan
+    std_a = float(np.std(a, ddof=1)) if na > 1 else np.nan
+    std_b = float(np.std(b, ddof=1)) if nb > 1 else np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_welch, p_t = stats.ttest_ind_from_stats(mean_a, std_a, na, mean_b, std_b, nb, equal_var=False)
+    r = _rank_stats(a, b)
+    med_a, med_b = _quantile_sorted(a, 0.5), _quantile_sorted(b, 0.5)
     return TestResult(
         metric=metric,
-        n_osm=len(a),
-        n_bd=len(b),
-        mean_osm=float(np.mean(a)) if len(a) else np.nan,
-        mean_bd=float(np.mean(b)) if len(b) else np.nan,
-        std_osm=float(np.std(a, ddof=1)) if len(a) > 1 else np.nan,
-        std_bd=float(np.std(b, ddof=1)) if len(b) > 1 else np.nan,
-        diff_mean=float(np.mean(a) - np.mean(b)) if len(a) and len(b) else np.nan,
+        n_osm=na,
+        n_bd=nb,
+        mean_osm=mean_a,
+        mean_bd=mean_b,
+        std_osm=std_a,
+        std_bd=std_b,
+        diff_mean=float(mean_a - mean_b) if na and nb else np.nan,
+        median_osm=med_a,
+        median_bd=med_b,
+        diff_median=med_a - med_b,
         t_welch=float(t_welch) if np.isfinite(t_welch) else np.nan,
         p_t_welch=float(p_t) if np.isfinite(p_t) else np.nan,
-        ks_stat=float(ks_stat),
-        p_ks=float(p_ks),
-        mw_stat=float(mw_stat),
-        p_mw=float(p_mw),
-        cohens_d=float(_cohens_d(a, b)),
-        cliffs_delta=float(_cliffs_delta(a, b)),
+        ks_stat=r["ks_stat"],
+        p_ks=r["p_ks"],
+        mw_stat=r["mw_stat"],
+        p_mw=r["p_mw"],
+        cohens_d=float(_cohens_d(a, b)) if na and nb else np.nan,
+        cliffs_delta=r["cliffs_delta"],
+    )
+
+
+def summarize_metrics(samples: Dict[str, Tuple[np.ndarray, np.ndarray]], max_workers: int | None = None) -> List[TestResult]:
+    """Toutes les métriques d'un run en un appel (tri/rangs partagés par métrique).
+
+    Les tris et recherches NumPy relâchent le GIL : les métriques sont traitées
+    en parallèle sur un pool de threads, l'ordre d'entrée est conservé.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        futs = [ex.submit(summarize_metric, m, a, b) for m, (a, b) in samples.items()]
+        return [f.result() for f in futs]
+
+
+# -----------------------------------------------------------------------------
+# Bootstrap (intervalles de confiance)
+# -----------------------------------------------------------------------------
+
+BOOT_STATS = ("diff_mean", "diff_median", "cohens_d", "cliffs_delta")
+
+# Données partagées par les workers (initialisées une fois par processus)
+_BOOT: Dict[str, Any] = {}
+
+
+def _boot_init(xs: np.ndarray, ys: np.ndarray, groups_x: List[np.ndarray], groups_y: List[np.ndarray]) -> None:
+    _BOOT.update(
+        xs=xs,
+        ys=ys,
+        groups_x=groups_x,
+        groups_y=groups_y,
+        lt=np.searchsorted(ys, xs, side="left"),
+        le=np.searchsorted(ys, xs, side="right"),
     )
 
 
+def _boot_counts(rng: np.random.Generator, groups: List[np.ndarray], n: int, reps: int) -> np.ndarray:
+    # Matrice d'indices (reps × n) tirés avec remise dans chaque strate, puis
+    # comptes de sélection par ligne via un seul bincount décalé
+    if len(groups) == 1:
+        idx = rng.integers(0, n, size=(reps, n))
+    else:
+        idx = np.concatenate([g[rng.integers(0, len(g), size=(reps, len(g)))] for g in groups], axis=1)
+    idx += (np.arange(reps) * n)[:, None]
+    return np.bincount(idx.ravel(), minlength=reps * n).reshape(reps, n).astype(np.float64)
+
+
+def _weighted_median(values: np.ndarray, counts: np.ndarray, n: int) -> np.ndarray:
+    # médiane (interpolation linéaire) de chaque ré-échantillon trié, via les comptes cumulés
+    cum = np.cumsum(counts, axis=1)
+    lo = (cum <= (n - 1) // 2).sum(axis=1)
+    hi = (cum <= n // 2).sum(axis=1)
+    return 0.5 * (values[lo] + values[hi])
+
+
+def _boot_chunk(seed: np.random.SeedSequence, reps: int) -> np.ndarray:
+    """Statistiques BOOT_STATS pour ``reps`` ré-échantillons (tableau reps × 4)."""
+    xs, ys = _BOOT["xs"], _BOOT["ys"]
+    nx, ny = len(xs), len(ys)
+    rng = np.random.default_rng(seed)
+    wx = _boot_counts(rng, _BOOT["groups_x"], nx, reps)
+    wy = _boot_counts(rng, _BOOT["groups_y"], ny, reps)
+
+    mx, my = wx @ xs / nx, wy @ ys / ny
+    vx = (wx @ (xs * xs) - nx * mx * mx) / (nx - 1)
+    vy = (wy @ (ys * ys) - ny * my * my) / (ny - 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pooled = ((nx - 1) * vx + (ny - 1) * vy) / (nx + ny - 2)
+        d = np.where(pooled > 0, (mx - my) / np.sqrt(pooled), np.nan)
+
+    # Cliff : sum_i wx_i (#(y < x_i) - #(y > x_i)) avec les comptes cumulés de y
+    cy = np.concatenate([np.zeros((reps, 1)), np.cumsum(wy, axis=1)], axis=1)
+    cliff = np.einsum("ij,ij->i", wx, cy[:, _BOOT["lt"]] + cy[:, _BOOT["le"]] - ny) / (float(nx) * ny)
+
+    med = _weighted_median(xs, wx, nx) - _weighted_median(ys, wy, ny)
+    return np.column_stack([mx - my, med, d, cliff])
+
+
+def _strata_groups(order: np.ndarray, strata: np.ndarray | None) -> List[np.ndarray]:
+    # positions (dans l'échantillon trié) de chaque strate
+    if strata is None:
+        return [np.arange(len(order))]
+    codes, _ = pd.factorize(np.asarray(strata)[order], use_na_sentinel=False)
+    pos = np.argsort(codes, kind="stable")
+    return np.split(pos, np.flatnonzero(np.diff(codes[pos])) + 1)
+
+
+def bootstrap_ci(
+    a: np.ndarray,
+    b: np.ndarray,
+    n_boot: int = 2000,
+    alpha: float = 0.05,
+    seed: int | None = None,
+    strata_a: np.ndarray | None = None,
+    strata_b: np.ndarray | None = None,
+    max_workers: int | None = None,
+    max_cells: int = 4_000_000,
+) -> Dict[str, Tuple[float, float]]:
+    """IC bootstrap percentiles de diff_mean, diff_median, cohens_d et cliffs_delta.
+
+    Les ré-échantillons sont traités par blocs (matrice d'indices ``reps × n``,
+    au plus ``max_cells`` cellules) sur un pool de processus ; chaque bloc a sa
+    graine dérivée de ``seed`` (SeedSequence.spawn), le résultat ne dépend donc
+    pas du nombre de workers. ``strata_a``/``strata_b`` (ex: classe de route)
+    rééchantillonnent à l'intérieur de chaque strate.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    keep_a, keep_b = ~np.isnan(a), ~np.isnan(b)
+    a, b = a[keep_a], b[keep_b]
+    if len(a) < 2 or len(b) < 2 or n_boot <= 0:
+        return {k: (np.nan, np.nan) for k in BOOT_STATS}
+    oa, ob = np.argsort(a, kind="stable"), np.argsort(b, kind="stable")
+    init = (
+        a[oa],
+        b[ob],
+        _strata_groups(oa, None if strata_a is None else np.asarray(strata_a)[keep_a]),
+        _strata_groups(ob, None if strata_b is None else np.asarray(strata_b)[keep_b]),
+    )
+
+    reps = int(max(1, min(n_boot, max_cells // (len(a) + len(b)))))
+    sizes = [min(reps, n_boot - i) for i in range(0, n_boot, reps)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if max_workers == 1 or len(sizes) == 1:
+        _boot_init(*init)
+        parts = [_boot_chunk(sd, r) for sd, r in zip(seeds, sizes)]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_boot_init, initargs=init) as ex:
+            parts = list(ex.map(_boot_chunk, seeds, sizes))
+    boot = np.concatenate(parts, axis=0)
+    lo, hi = np.nanquantile(boot, [alpha / 2.0, 1.0 - alpha / 2.0], axis=0)
+    return {k: (float(lo[i]), float(hi[i])) for i, k in enumerate(BOOT_STATS)}
+
+
+def bootstrap_metrics(
+    samples: Dict[str, Tuple[np.ndarray, np.ndarray]],
+    results: List[TestResult],
+    strata: Dict[str, Tuple[np.ndarray, np.ndarray]] | None = None,
+    **kwargs: Any,
+) -> pd.DataFrame:
+    """Table longue metric, stat, estimate, ci_low, ci_high (estimations issues de ``results``)."""
+    by_metric = {r.metric: r for r in results}
+    rows: List[Dict[str, Any]] = []
+    for m, (a, b) in samples.items():
+        sa, sb = (strata or {}).get(m, (None, None))
+        ci = bootstrap_ci(a, b, strata_a=sa, strata_b=sb, **kwargs)
+        for k in BOOT_STATS:
+            rows.append({"metric": m, "stat": k, "estimate": getattr(by_metric[m], k), "ci_low": ci[k][0], "ci_high": ci[k][1]})
+    return pd.DataFrame(rows, columns=["metric", "stat", "estimate", "ci_low", "ci_high"])
+
+
 def results_to_df(results: List[TestResult]) -> pd.DataFrame:
     rows: List[Dict[str, Any]] = []
     for r in results:
@@ -109,6 +312,9 @@ def results_to_df(results: List[TestResult]) -> pd.DataFrame:
         "std_osm",
         "std_bd",
         "diff_mean",
+        "median_osm",
+        "median_bd",
+        "diff_median",
         "t_welch",
         "p_t_welch",
         "ks_stat",
@@ -1,5 +1,6 @@
 import typer
 from pathlib import Path
+from typing import List, Optional
 from rs3_study_curvature.etl.compute_curvature import build_from_config
 
 app = typer.Typer()
@@ -9,3 +10,38 @@ app = typer.Typer()
 def from_config(config: Path):
     """Construit les courbures/profils depuis un YAML."""
     build_from_config(config)
+
+
+@app.command()
+def alignment(profile: Path, out: Path, workers: Optional[int] = typer.Option(None, help="processus (défaut: tous les cœurs)")):
+    """Éléments droite/arc/clothoïde (road_id, s0, s1, type, k0, k1) depuis un profil κ(s)."""
+    from rs3_study_curvature.geometry.alignment import main as _main
+
+    _main(["--profile", str(profile), "--out", str(out)] + (["--workers", str(workers)] if workers else []))
+
+
+@app.command()
+def street_index(
+    sources: List[Path],
+    layer: Optional[str] = typer.Option(None, help="couche (GeoPackage multi-couches)"),
+    query: Optional[str] = typer.Option(None, help="recherche + suggestions"),
+):
+    """Construit (ou met à jour) l'index des noms de voies à côté de chaque source."""
+    from rs3_study_curvature.data.street_index import main as _main
+
+    _main([str(s) for s in sources] + (["--layer", layer] if layer else []) + (["--query", query] if query else []))
+
+
+@app.command()
+def tiles(
+    segments: Path,
+    out: Path,
+    min_zoom: int = typer.Option(8, help="zoom minimal"),
+    max_zoom: int = typer.Option(14, help="zoom maximal"),
+    geometry: Optional[Path] = typer.Option(None, help="sidecar géométrique (défaut: <stem>_geom.parquet)"),
+    workers: Optional[int] = typer.Option(None, help="processus (défaut: tous les cœurs)"),
+):
+    """Pyramide de tuiles vectorielles (.pmtiles ou .mbtiles) des segments et de leurs rayons/courbures."""
+    from rs3_study_curvature.viz.tiles import main as _main
+
+    _main(["--segments", str(segments), "--out", str(out), "--min-zoom", str(min_zoom), "--max-zoom", str(max_zoom)] + (["--geometry", str(geometry)] if geometry else []) + (["--workers", str(workers)] if workers else []))
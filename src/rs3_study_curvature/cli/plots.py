@@ -1,5 +1,8 @@
 import typer
 from pathlib import Path
+import yaml
+
+from rs3_study_curvature.analysis.hist_cube import build_from_config, cube_path_from_config, load_cube, plot_cube
 from rs3_study_curvature.viz.plots import dist_plots, class_plots, kappa_profiles
 
 app = typer.Typer()
@@ -18,3 +21,15 @@ def by_class(config: Path):
 @app.command()
 def profiles(config: Path):
     kappa_profiles(config)
+
+
+@app.command()
+def cube(config: Path, rebuild: bool = False):
+    """Figures de distribution depuis le cube d'histogrammes (construit s'il manque)."""
+    cfg = yaml.safe_load(config.read_text(encoding="utf-8")) or {}
+    path = cube_path_from_config(cfg)
+    if rebuild or not path.exists():
+        build_from_config(cfg, path)
+    out_dir = Path((cfg.get("outputs", {}) or {}).get("plots_dir") or "out/plots") / "cube"
+    written = plot_cube(load_cube(path), out_dir)
+    typer.echo(f"{len(written)} figure(s) → {out_dir}")
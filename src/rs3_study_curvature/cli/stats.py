@@ -1,5 +1,8 @@
 import typer
 from pathlib import Path
+import yaml
+
+from rs3_study_curvature.analysis.hist_cube import build_from_config
 from rs3_study_curvature.analysis.stats import run_stats_by_class, run_global_stats
 
 app = typer.Typer()
@@ -13,3 +16,9 @@ def global_(config: Path):
 @app.command()
 def by_class(config: Path):
     run_stats_by_class(config)
+
+
+@app.command()
+def hist_cube(config: Path):
+    """Cube d'histogrammes pré-agrégé (à lancer une fois après l'ETL)."""
+    build_from_config(yaml.safe_load(config.read_text(encoding="utf-8")) or {})
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Harmonisation des classes de route OSM / BD TOPO.
+
+Un seul moteur pour tous les scripts : les tables de correspondance
+(``configs/class_map.yml``, mapping inline de la config, défaut BD TOPO → OSM)
+et les groupes (``configs/class_groups.yml``) sont normalisés une fois au
+chargement. Sur une colonne, seules les valeurs distinctes sont normalisées
+(factorize puis reprojection des codes) : le coût est en O(classes distinctes)
+et non en O(lignes). Les résultats sont des ``pd.Categorical``.
+"""
+from __future__ import annotations
+
+import json
+import re
+import unicodedata
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping
+
+import numpy as np
+import pandas as pd
+
+# Clefs BD TOPO (nature) → valeurs OSM highway
+DEFAULT_BDTOPO_TO_OSM: Dict[str, str] = {
+    "autoroute": "motorway",
+    "bretelle": "motorway_link",
+    "bretelle d autoroute": "motorway_link",
+    "route a 2 chaussees": "trunk",
+    "route principale": "primary",
+    "route secondaire": "secondary",
+    "route tertiaire": "tertiary",
+    "route communale": "unclassified",
+    "chemin": "track",
+    "piste": "track",
+    "piste cyclable": "cycleway",
+    "rond point": "junction",
+    "aire de service": "service",
+    "voie de desserte": "service",
+}
+
+_SEPARATORS = {" ": re.compile(r"[\s/\\,;\-]+"), "_": re.compile(r"[\s/\\,;\-_]+")}
+
+
+def normalize_label(val: Any, sep: str = " ") -> str | None:
+    """Minuscules, sans accents, séparateurs (espaces, / \\ , ; -) fusionnés en ``sep``.
+
+    ``sep=" "`` donne « route a 2 chaussees », ``sep="_"`` la variante
+    snake_case « route_a_2_chaussees » (les ``_`` sont alors fusionnés aussi).
+    Retourne None pour les valeurs manquantes ou vides.
+    """
+    if val is None or (isinstance(val, float) and not np.isfinite(val)) or val is pd.NA:
+        return None
+    s = unicodedata.normalize("NFKD", str(val)).encode("ascii", "ignore").decode("ascii")
+    pattern = _SEPARATORS.get(sep) or re.compile(r"[\s/\\,;\-]+")
+    s = pattern.sub(sep, s.strip().lower()).strip(sep + " ")
+    return s or None
+
+
+def load_class_map(path: str | Path | None) -> Dict[str, str]:
+    """Lit un mapping plat (YAML ou JSON) ; {} si absent ou illisible."""
+    if not path or not Path(path).exists():
+        return {}
+    path = Path(path)
+    try:
+        if path.suffix.lower() in {".yml", ".yaml"}:
+            import yaml  # lazy
+
+            data = yaml.safe_load(path.read_text(encoding="utf-8")) or {}
+        else:
+            data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        warnings.warn(f"[WARN] Échec lecture mapping {path}: {e} — mapping ignoré.")
+        return {}
+    return {str(k): str(v) for k, v in data.items() if k is not None and v is not None}
+
+
+def load_class_groups(path: str | Path | None) -> Dict[str, List[str]]:
+    """Lit ``class_groups.yml`` (groupe → liste de classes) ; {} si absent."""
+    if not path or not Path(path).exists():
+        return {}
+    import yaml  # lazy
+
+    try:
+        data = yaml.safe_load(Path(path).read_text(encoding="utf-8")) or {}
+    except Exception as e:
+        warnings.warn(f"[WARN] Échec lecture groupes {path}: {e} — groupes ignorés.")
+        return {}
+    return {str(g): [str(c) for c in (members or [])] for g, members in data.items()}
+
+
+@dataclass
+class HarmonizedClasses:
+    raw: pd.Series  # libellé brut normalisé
+    mapped: pd.Series  # classe harmonisée (après mapping)
+    group: pd.Series  # groupe gros-grain (fast/main/local/nonmotor), NaN si inconnu
+
+    def to_frame(self, prefix: str = "class") -> pd.DataFrame:
+        return pd.DataFrame({f"{prefix}_raw": self.raw, f"{prefix}_norm": self.mapped, f"{prefix}_group": self.group})
+
+
+def _categorical(codes: np.ndarray, values: List[str | None], index: pd.Index, name: str) -> pd.Series:
+    # Reprojette des codes (par valeur distincte d'entrée) vers des catégories dédoublonnées
+    sub_codes, cats = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+    sub_codes = np.append(sub_codes, -1)  # code -1 d'entrée → manquant
+    cat = pd.Categorical.from_codes(sub_codes[codes], categories=pd.Index(cats, dtype=object))
+    return pd.Series(cat, index=index, name=name)
+
+
+class ClassHarmonizer:
+    """Normalisation + mapping + groupes, compilés une fois.
+
+    ``mapping`` : libellé → classe (clefs/valeurs normalisées au chargement).
+    ``groups`` : groupe → classes. ``sep`` : séparateur de normalisation.
+    """
+
+    def __init__(self, mapping: Mapping[str, str] | None = None, groups: Mapping[str, Iterable[str]] | None = None, sep: str = " "):
+        self.sep = sep
+        self.mapping: Dict[str, str] = {}
+        for k, v in (mapping or {}).items():
+            nk, nv = normalize_label(k, sep), normalize_label(v, sep)
+            if nk is not None and nv is not None:
+                self.mapping[nk] = nv
+        self.groups: Dict[str, str] = {}
+        for g, members in (groups or {}).items():
+            for c in members:
+                nc = normalize_label(c, sep)
+                if nc is not None:
+                    self.groups.setdefault(nc, str(g))
+
+    @classmethod
+    def from_config(cls, cfg: Mapping[str, Any], source: str | None = None, sep: str = " ") -> "ClassHarmonizer":
+        """Mapping fichier (``class_mapping_file``, défaut ``configs/class_map.yml``),
+        surchargé par ``class_mapping.<source>`` inline ; groupes ``class_groups_file``."""
+        mapping_path = cfg.get("class_mapping_file")
+        if mapping_path is None and isinstance(cfg.get("class_mapping"), str):
+            mapping_path = cfg["class_mapping"]  # clé historique pointant vers un fichier
+        if mapping_path is None and Path("configs/class_map.yml").exists():
+            mapping_path = "configs/class_map.yml"
+        mapping: Dict[str, str] = dict(load_class_map(mapping_path))
+        inline = cfg.get("class_mapping")
+        if source and isinstance(inline, dict) and isinstance(inline.get(source), dict):
+            mapping.update(inline[source])
+        groups = load_class_groups(cfg.get("class_groups_file"))
+        return cls(mapping, groups, sep=sep)
+
+    def harmonize(self, values: pd.Series | Iterable[Any]) -> HarmonizedClasses:
+        sr = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+        codes, uniques = pd.factorize(sr, use_na_sentinel=True)
+        raw = [normalize_label(u, self.sep) for u in uniques]
+        mapped = [self.mapping.get(r, r) if r is not None else None for r in raw]
+        group = [self.groups.get(m) if m is not None else None for m in mapped]
+        return HarmonizedClasses(
+            raw=_categorical(codes, raw, sr.index, "class_raw"),
+            mapped=_categorical(codes, mapped, sr.index, "class_norm"),
+            group=_categorical(codes, group, sr.index, "class_group"),
+        )
+
+    def normalize(self, values: pd.Series | Iterable[Any]) -> pd.Series:
+        return self.harmonize(values).raw
+
+    def map(self, values: pd.Series | Iterable[Any]) -> pd.Series:
+        return self.harmonize(values).mapped
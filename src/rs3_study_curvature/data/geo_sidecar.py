@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""Sidecar GeoParquet trié et indexé pour les couches vecteur sans index spatial.
+
+Un GeoJSON régional n'a pas d'index spatial : chaque lecture bbox le parse en
+entier (les GPKG ont leur R-tree et sont lus directement, sauf
+``RS3_GEOM_SIDECAR=all``). Au premier usage, la couche est réécrite à côté de la source
+(``<source>.sidecar.parquet``) :
+
+- entités triées selon la courbe de Hilbert du centre de leur bbox ;
+- colonne ``bbox`` (struct ``xmin, ymin, xmax, ymax``, « covering » GeoParquet
+  1.1) et row groups courts : les statistiques min/max de chaque row group
+  forment un index spatial grossier ;
+- géométries en WKB, métadonnées ``geo`` standard (lisible par
+  ``geopandas.read_parquet``) ;
+- taille + mtime de la source dans les métadonnées (``rs3:source``) : un
+  sidecar périmé est reconstruit.
+
+Les lectures suivantes poussent le filtre bbox au scan pyarrow et ne décodent
+que les row groups qui recoupent la fenêtre.
+"""
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from rs3_study_curvature.data.segments import bbox_to_crs, spatial_order
+
+SIDECAR_SUFFIX = ".sidecar.parquet"
+SOURCE_KEY = b"rs3:source"
+SIDECAR_VERSION = 1
+DEFAULT_ROW_GROUP_SIZE = 2048
+BBOX_FIELDS = ("xmin", "ymin", "xmax", "ymax")
+# Formats déjà indexés spatialement (R-tree GPKG, index FlatGeobuf) : lecture directe
+NATIVE_INDEX_SUFFIXES = (".gpkg", ".fgb")
+
+
+def sidecar_path(source: str | os.PathLike) -> Path:
+    return Path(str(source) + SIDECAR_SUFFIX)
+
+
+def _source_stat(source: str | os.PathLike) -> dict:
+    st = os.stat(source)
+    return {"version": SIDECAR_VERSION, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _attributes_table(df: pd.DataFrame) -> pa.Table:
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # GeoJSON : colonnes hétérogènes (listes, dicts, nombres/texte) → texte
+        df = df.copy()
+        for c in df.columns:
+            if df[c].dtype == object:
+                df[c] = df[c].map(lambda v: None if v is None else str(v))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def write_sidecar(gdf: gpd.GeoDataFrame, path: str | os.PathLike, source_stat: Optional[dict] = None, row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> None:
+    """Écrit ``gdf`` trié (Hilbert) avec sa colonne ``bbox`` ; écriture atomique."""
+    gdf = gdf[gdf.geometry.notna()]
+    geoms = gdf.geometry.values
+    b = shapely.bounds(np.asarray(geoms, dtype=object))
+    order = spatial_order(0.5 * (b[:, 0] + b[:, 2]), 0.5 * (b[:, 1] + b[:, 3]), "hilbert") if len(gdf) else np.arange(0)
+    b = b[order]
+    attrs = _attributes_table(pd.DataFrame(gdf.drop(columns=gdf.geometry.name)).iloc[order])
+    table = attrs.append_column("geometry", pa.array(shapely.to_wkb(np.asarray(geoms, dtype=object)[order]), pa.binary()))
+    table = table.append_column("bbox", pa.StructArray.from_arrays([pa.array(b[:, i]) for i in range(4)], list(BBOX_FIELDS)))
+    geo = {
+        "version": "1.1.0",
+        "primary_column": "geometry",
+        "columns": {
+            "geometry": {
+                "encoding": "WKB",
+                "geometry_types": [],
+                "crs": gdf.crs.to_json_dict() if gdf.crs is not None else None,
+                "bbox": [float(np.nanmin(b[:, 0])), float(np.nanmin(b[:, 1])), float(np.nanmax(b[:, 2])), float(np.nanmax(b[:, 3]))] if len(b) else [],
+                "covering": {"bbox": {f: ["bbox", f] for f in BBOX_FIELDS}},
+            }
+        },
+    }
+    meta = {b"geo": json.dumps(geo).encode(), SOURCE_KEY: json.dumps(source_stat or {}).encode()}
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **meta})
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    pq.write_table(table, tmp, row_group_size=row_group_size)
+    os.replace(tmp, path)
+
+
+def sidecar_is_fresh(source: str | os.PathLike, path: Optional[str | os.PathLike] = None) -> bool:
+    path = sidecar_path(source) if path is None else Path(path)
+    try:
+        md = pq.read_schema(path).metadata or {}
+        return json.loads(md[SOURCE_KEY]) == _source_stat(source)
+    except Exception:
+        return False
+
+
+def read_sidecar_bbox(path: str | os.PathLike, bbox_native: Optional[Tuple[float, float, float, float]] = None) -> gpd.GeoDataFrame:
+    """Entités dont la bbox recoupe ``bbox_native`` (CRS de la couche) ; row groups élagués au scan."""
+    dataset = ds.dataset(str(path), format="parquet")
+    expr = None
+    if bbox_native is not None:
+        xmin, ymin, xmax, ymax = bbox_native
+        expr = (
+            (ds.field("bbox", "xmax") >= xmin)
+            & (ds.field("bbox", "xmin") <= xmax)
+            & (ds.field("bbox", "ymax") >= ymin)
+            & (ds.field("bbox", "ymin") <= ymax)
+        )
+    cols = [c for c in dataset.schema.names if c != "bbox"]
+    table = dataset.to_table(columns=cols, filter=expr)
+    df = table.drop_columns(["geometry"]).to_pandas()
+    geom = shapely.from_wkb(table.column("geometry").to_numpy(zero_copy_only=False))
+    return gpd.GeoDataFrame(df, geometry=geom, crs=sidecar_crs(path))
+
+
+def sidecar_crs(path: str | os.PathLike):
+    """CRS (pyproj) enregistré dans les métadonnées ``geo`` du sidecar, None si absent."""
+    from pyproj import CRS
+
+    geo = json.loads((pq.read_schema(path).metadata or {})[b"geo"])
+    crs = geo["columns"]["geometry"].get("crs")
+    return CRS.from_json_dict(crs) if crs else None
+
+
+def read_geom_indexed(
+    source: str | os.PathLike,
+    bbox4326: Optional[Tuple[float, float, float, float]] = None,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> Optional[gpd.GeoDataFrame]:
+    """Lecture bbox (WGS84) via le sidecar de ``source``, dans le CRS natif de la couche.
+
+    Le sidecar est construit (ou reconstruit s'il est périmé) à la première
+    lecture. Retourne None si le sidecar est désactivé (``RS3_GEOM_SIDECAR=0``),
+    si la source est un Parquet ou un format déjà indexé (GPKG, FlatGeobuf ;
+    ``RS3_GEOM_SIDECAR=all`` pour forcer) ou si la lecture complète échoue :
+    l'appelant lit alors la source directement. Un dossier non inscriptible
+    n'empêche pas la lecture (filtre bbox en mémoire sur la couche complète).
+    """
+    mode = os.environ.get("RS3_GEOM_SIDECAR", "1")
+    if mode in ("0", "false", "False"):
+        return None
+    suffix = Path(source).suffix.lower()
+    if suffix == ".parquet" or (suffix in NATIVE_INDEX_SUFFIXES and mode != "all") or not os.path.exists(source):
+        return None
+
+    def _native(crs):
+        if bbox4326 is None or crs is None:
+            return bbox4326
+        return bbox_to_crs(bbox4326, crs)
+
+    path = sidecar_path(source)
+    if sidecar_is_fresh(source, path):
+        return read_sidecar_bbox(path, _native(sidecar_crs(path)))
+    try:
+        full = gpd.read_file(source)
+    except Exception as e:
+        print(f"[geom] sidecar non construit pour {source} ({e})")
+        return None
+    try:
+        write_sidecar(full, path, _source_stat(source), row_group_size=row_group_size)
+        print(f"[geom] sidecar écrit: {path} ({len(full):,} entités)")
+        return read_sidecar_bbox(path, _native(full.crs))
+    except OSError as e:
+        print(f"[geom] sidecar non enregistré ({path}): {e}")
+    bbox_native = _native(full.crs)
+    if bbox_native is None:
+        return full
+    b = shapely.bounds(np.asarray(full.geometry.values, dtype=object))
+    xmin, ymin, xmax, ymax = bbox_native
+    return full[(b[:, 2] >= xmin) & (b[:, 0] <= xmax) & (b[:, 3] >= ymin) & (b[:, 1] <= ymax)]
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""Lecture/écriture des tables « segments » (Parquet sans géométrie).
+
+Le CRS des colonnes ``x_centroid``/``y_centroid`` est enregistré par l'ETL
+dans les métadonnées du fichier (clef ``rs3:crs``). Pour les fichiers plus
+anciens, il est lu dans le sidecar géométrique GeoParquet
+(``<stem>_geom.parquet``, métadonnées ``geo``).
+
+Les lectures par bbox passent par un ``pyarrow.dataset`` avec des filtres sur
+les centroïdes : les row groups dont les statistiques min/max sont hors de la
+bbox ne sont pas lus.
+
+Mode trié (``spatial_sort: hilbert|zorder``) : segments ordonnés selon une
+courbe de remplissage sur la grille des centroïdes, row groups de taille
+bornée (localité spatiale), bbox de chaque row group dans les métadonnées
+(``rs3:row_group_bbox``). Le profil suit le même ordre (par ``road_id``) et
+reçoit les bbox de ses row groups : les lectures bbox n'ouvrent que
+quelques row groups, y compris sur la table profil sans coordonnées.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+try:
+    from pyproj import CRS, Transformer  # type: ignore
+
+    HAS_PYPROJ = True
+except Exception:  # pragma: no cover
+    HAS_PYPROJ = False
+
+CRS_KEY = b"rs3:crs"
+SORT_KEY = b"rs3:sort"
+RG_BBOX_KEY = b"rs3:row_group_bbox"
+XY_COLUMNS = ("x_centroid", "y_centroid")
+SPATIAL_SORTS = ("hilbert", "zorder")
+DEFAULT_ROW_GROUP_SIZE = 16_384
+
+
+# -----------------------------------------------------------------------------
+# Courbes de remplissage
+# -----------------------------------------------------------------------------
+
+
+def _grid(x: np.ndarray, y: np.ndarray, order: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Centroïdes → grille entière 2^order × 2^order (NaN en fin de courbe)
+    n = (1 << order) - 1
+    ok = np.isfinite(x) & np.isfinite(y)
+    if not ok.any():
+        return np.full(x.shape, n, dtype=np.uint64), np.full(y.shape, n, dtype=np.uint64)
+    x0, x1, y0, y1 = x[ok].min(), x[ok].max(), y[ok].min(), y[ok].max()
+    span = max(x1 - x0, y1 - y0) or 1.0
+    gx = np.where(ok, np.clip((x - x0) / span * n, 0, n), n).astype(np.uint64)
+    gy = np.where(ok, np.clip((y - y0) / span * n, 0, n), n).astype(np.uint64)
+    return gx, gy
+
+
+def zorder_key(x: np.ndarray, y: np.ndarray, order: int = 16) -> np.ndarray:
+    """Clef de Morton (bits de x et y entrelacés)."""
+    gx, gy = _grid(np.asarray(x, float), np.asarray(y, float), order)
+    key = np.zeros(gx.shape, dtype=np.uint64)
+    for i in range(order):
+        b = np.uint64(i)
+        key |= ((gx >> b) & np.uint64(1)) << np.uint64(2 * i)
+        key |= ((gy >> b) & np.uint64(1)) << np.uint64(2 * i + 1)
+    return key
+
+
+def hilbert_key(x: np.ndarray, y: np.ndarray, order: int = 16) -> np.ndarray:
+    """Indice de Hilbert (vectorisé) : voisins sur la courbe ⇒ voisins dans le plan."""
+    gx, gy = _grid(np.asarray(x, float), np.asarray(y, float), order)
+    gx, gy = gx.astype(np.int64), gy.astype(np.int64)
+    d = np.zeros(gx.shape, dtype=np.int64)
+    s = 1 << (order - 1)
+    while s > 0:
+        rx = (gx & s) > 0
+        ry = (gy & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # rotation du quadrant
+        flip = ~ry & rx
+        gx = np.where(flip, s - 1 - gx, gx)
+        gy = np.where(flip, s - 1 - gy, gy)
+        swap = ~ry
+        gx, gy = np.where(swap, gy, gx), np.where(swap, gx, gy)
+        s >>= 1
+    return d.astype(np.uint64)
+
+
+def spatial_order(x: np.ndarray, y: np.ndarray, method: str = "hilbert") -> np.ndarray:
+    """Permutation (tri stable) des lignes selon la courbe demandée."""
+    if method not in SPATIAL_SORTS:
+        raise ValueError(f"Tri spatial inconnu: {method} (attendu: {', '.join(SPATIAL_SORTS)})")
+    key = hilbert_key(x, y) if method == "hilbert" else zorder_key(x, y)
+    return np.argsort(key, kind="stable")
+
+
+def _row_group_bboxes(x: np.ndarray, y: np.ndarray, bounds: np.ndarray) -> List[List[float] | None]:
+    out: List[List[float] | None] = []
+    for i0, i1 in zip(bounds[:-1], bounds[1:]):
+        xs, ys = x[i0:i1], y[i0:i1]
+        ok = np.isfinite(xs) & np.isfinite(ys)
+        out.append([float(xs[ok].min()), float(ys[ok].min()), float(xs[ok].max()), float(ys[ok].max())] if ok.any() else None)
+    return out
+
+
+def _write_table(df: pd.DataFrame, path: str | Path, meta: dict, row_group_size: Optional[int]) -> None:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **meta})
+    pq.write_table(table, path, row_group_size=row_group_size)
+
+
+# -----------------------------------------------------------------------------
+# Écriture
+# -----------------------------------------------------------------------------
+
+
+def write_segments(
+    df: pd.DataFrame,
+    path: str | Path,
+    crs: str,
+    spatial_sort: Optional[str] = None,
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> np.ndarray:
+    """Écrit la table segments avec son CRS (``rs3:crs``) dans les métadonnées Parquet.
+
+    Avec ``spatial_sort`` (hilbert|zorder), les lignes sont triées et les bbox
+    des row groups enregistrées. Renvoie la permutation appliquée (identité
+    sinon) pour aligner le sidecar géométrique et le profil.
+    """
+    meta = {CRS_KEY: str(crs).encode()}
+    order = np.arange(len(df))
+    if spatial_sort and spatial_sort != "none" and len(df):
+        x = pd.to_numeric(df["x_centroid"], errors="coerce").to_numpy(float)
+        y = pd.to_numeric(df["y_centroid"], errors="coerce").to_numpy(float)
+        order = spatial_order(x, y, spatial_sort)
+        df = df.iloc[order]
+        bounds = np.arange(0, len(df) + row_group_size, row_group_size).clip(max=len(df))
+        bounds = np.unique(bounds)
+        meta[SORT_KEY] = spatial_sort.encode()
+        meta[RG_BBOX_KEY] = json.dumps(_row_group_bboxes(x[order], y[order], bounds)).encode()
+        _write_table(df, path, meta, row_group_size)
+    else:
+        _write_table(df, path, meta, None)
+    return order
+
+
+def write_profile(
+    prof: pd.DataFrame,
+    path: str | Path,
+    segments: Optional[pd.DataFrame] = None,
+    crs: Optional[str] = None,
+    row_group_size: int = 8 * DEFAULT_ROW_GROUP_SIZE,
+) -> None:
+    """Écrit le profil dans l'ordre des ``segments`` (déjà triés) avec la bbox
+    des centroïdes couverts par chaque row group. Sans ``segments`` : écriture simple."""
+    if segments is None or "road_id" not in prof.columns or not len(prof):
+        prof.to_parquet(path, index=False)
+        return
+    rank = pd.Series(np.arange(len(segments)), index=pd.Index(segments["road_id"].astype(str))).groupby(level=0).first()
+    seg_rank = rank.reindex(prof["road_id"].astype(str)).to_numpy(dtype=float)
+    seg_rank = np.where(np.isnan(seg_rank), len(segments), seg_rank).astype(np.int64)
+    order = np.argsort(seg_rank, kind="stable")  # ordre interne des échantillons conservé
+    prof = prof.iloc[order]
+    seg_rank = seg_rank[order]
+    # bornes de row groups alignées sur les changements de road_id quand c'est possible
+    bounds = np.unique(np.arange(0, len(prof) + row_group_size, row_group_size).clip(max=len(prof)))
+    starts = np.flatnonzero(np.r_[True, seg_rank[1:] != seg_rank[:-1]])
+    bounds = np.unique(np.r_[0, starts[np.searchsorted(starts, bounds[1:-1], side="left").clip(max=len(starts) - 1)], len(prof)])
+    x = np.r_[pd.to_numeric(segments["x_centroid"], errors="coerce").to_numpy(float), np.nan][seg_rank]
+    y = np.r_[pd.to_numeric(segments["y_centroid"], errors="coerce").to_numpy(float), np.nan][seg_rank]
+    meta = {RG_BBOX_KEY: json.dumps(_row_group_bboxes(x, y, bounds)).encode()}
+    if crs:
+        meta[CRS_KEY] = str(crs).encode()
+    table = pa.Table.from_pandas(prof, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **meta})
+    with pq.ParquetWriter(path, table.schema) as writer:
+        for i0, i1 in zip(bounds[:-1], bounds[1:]):
+            writer.write_table(table.slice(int(i0), int(i1 - i0)), row_group_size=int(i1 - i0))
+
+
+# -----------------------------------------------------------------------------
+# Lecture
+# -----------------------------------------------------------------------------
+
+
+def row_groups_in_bbox(path: str | Path, bbox_native: Tuple[float, float, float, float]) -> Optional[List[int]]:
+    """Row groups dont la bbox (métadonnées) intersecte ``bbox_native`` ; None si non renseigné."""
+    md = pq.read_schema(path).metadata or {}
+    if RG_BBOX_KEY not in md:
+        return None
+    xmin, ymin, xmax, ymax = bbox_native
+    return [
+        i
+        for i, b in enumerate(json.loads(md[RG_BBOX_KEY]))
+        if b is not None and b[0] <= xmax and b[2] >= xmin and b[1] <= ymax and b[3] >= ymin
+    ]
+
+
+def read_profile_bbox(
+    path: str | Path,
+    bbox_native: Tuple[float, float, float, float],
+    road_ids: Optional[Iterable[str]] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """Échantillons de profil des row groups intersectant la bbox, restreints à ``road_ids``."""
+    groups = row_groups_in_bbox(path, bbox_native)
+    pf = pq.ParquetFile(path)
+    cols = None if columns is None else list(dict.fromkeys([*columns, "road_id"]))
+    if groups is None:
+        table = pf.read(columns=cols)
+    elif not groups:
+        table = pf.schema_arrow.empty_table() if cols is None else pf.schema_arrow.empty_table().select(cols)
+    else:
+        table = pf.read_row_groups(groups, columns=cols)
+    df = table.to_pandas()
+    if road_ids is not None:
+        df = df[df["road_id"].astype(str).isin(set(map(str, road_ids)))]
+    return df
+
+
+def _sidecar_crs(path: Path) -> Optional[str]:
+    geom_path = path.with_name(f"{path.stem}_geom.parquet")
+    if not geom_path.exists():
+        return None
+    geo = (pq.read_schema(geom_path).metadata or {}).get(b"geo")
+    if not geo:
+        return None
+    meta = json.loads(geo)
+    crs = (meta.get("columns", {}).get(meta.get("primary_column", "geometry")) or {}).get("crs")
+    if crs is None:
+        return None
+    if not HAS_PYPROJ:
+        return None
+    c = CRS.from_json_dict(crs) if isinstance(crs, dict) else CRS.from_user_input(crs)
+    epsg = c.to_epsg()
+    return f"EPSG:{epsg}" if epsg else c.to_string()
+
+
+def segments_crs(path: str | Path) -> Optional[str]:
+    """CRS des centroïdes d'après les métadonnées (fichier puis sidecar) ; None si inconnu."""
+    path = Path(path)
+    md = pq.read_schema(path).metadata or {}
+    if CRS_KEY in md:
+        return md[CRS_KEY].decode()
+    return _sidecar_crs(path)
+
+
+def bbox_to_crs(bbox4326: Tuple[float, float, float, float], crs: str | int) -> Tuple[float, float, float, float]:
+    """Bbox WGS84 → bbox englobante dans ``crs`` (bords densifiés)."""
+    if not HAS_PYPROJ:
+        return bbox4326
+    tx = Transformer.from_crs(4326, crs, always_xy=True)
+    return tuple(tx.transform_bounds(*bbox4326, densify_pts=21))  # type: ignore[return-value]
+
+
+def _isin(dataset, column: str, values: Sequence) -> ds.Expression:
+    """``column ∈ values``, ensemble typé d'après le schéma (string, large_string, dictionnaire)."""
+    t = dataset.schema.field(column).type
+    if pa.types.is_dictionary(t):
+        t = t.value_type
+    return ds.field(column).isin(pa.array(values, type=t))
+
+
+def read_segments_bbox(
+    path: str | Path,
+    bbox_native: Optional[Tuple[float, float, float, float]] = None,
+    columns: Optional[Sequence[str]] = None,
+    classes: Optional[Iterable[str]] = None,
+    names: Optional[Iterable[str]] = None,
+) -> pd.DataFrame:
+    """Lit les segments dont le centroïde est dans ``bbox_native`` (CRS du fichier).
+
+    Filtres poussés au scan (row groups élagués par leurs statistiques) ;
+    ``classes`` filtre la colonne ``class`` de la même façon, ``names`` la
+    colonne ``name`` (noms exacts, p. ex. issus de l'index des voies).
+    """
+    dataset = ds.dataset(str(path), format="parquet")
+    fields = dataset.schema.names
+    cols = [c for c in (columns or fields) if c in fields]
+    for c in XY_COLUMNS:
+        if c not in fields:
+            raise ValueError(f"Colonnes x_centroid/y_centroid manquantes dans {path}")
+        if c not in cols:
+            cols.append(c)
+    classes = list(classes) if classes is not None and "class" in fields else None
+    names = list(names) if names is not None and "name" in fields else None
+    if (classes is not None and not classes) or (names is not None and not names):
+        # aucune valeur admise (p. ex. rue sans correspondance) : sélection vide
+        return dataset.schema.empty_table().select(cols).to_pandas()
+    expr = None
+    if bbox_native is not None:
+        xmin, ymin, xmax, ymax = bbox_native
+        x, y = ds.field("x_centroid"), ds.field("y_centroid")
+        expr = (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
+    if classes is not None:
+        cls_expr = _isin(dataset, "class", classes)
+        expr = cls_expr if expr is None else expr & cls_expr
+    if names is not None:
+        name_expr = _isin(dataset, "name", names)
+        expr = name_expr if expr is None else expr & name_expr
+    return dataset.to_table(columns=cols, filter=expr).to_pandas()
@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""Index persistant des noms de voies (recherche exacte/partielle + suggestions).
+
+Un index est construit une fois par fichier source (segments Parquet, couche
+IGN/OSM GeoPackage/GeoJSON) et enregistré à côté de lui, dans
+``<source>.street_index/`` :
+
+- ``names.parquet`` : une ligne par nom distinct — ``name`` (brut), ``fold``
+  (sans accents, casse ni ponctuation), ``norm`` (``fold`` sans types de voie),
+  ``ids`` (numéros de ligne du Parquet / FID de la couche) ;
+- ``trigrams.parquet`` : index inversé trigramme → noms (listes triées).
+
+Les métadonnées (``rs3:street_index``) gardent la taille et le mtime de la
+source : un index périmé est reconstruit à la volée. La normalisation n'est
+donc faite qu'une fois par nom distinct ; une recherche « contient » croise
+les listes de trigrammes de la requête puis vérifie quelques candidats, et les
+suggestions (similarité de trigrammes, comme ``pg_trgm``) couvrent tous les noms
+de la source sans comparaison deux à deux.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import pyogrio  # type: ignore
+
+    HAS_PYOGRIO = True
+except Exception:  # pragma: no cover
+    HAS_PYOGRIO = False
+
+INDEX_KEY = b"rs3:street_index"
+INDEX_VERSION = 1
+INDEX_SUFFIX = ".street_index"
+
+# Colonnes de nom (OSM + IGN/BDTopo) : sous-chaînes recherchées en minuscules
+NAME_COL_HINTS = ("name", "nom", "voie", "libel", "label", "topo")
+
+# Types de voie ignorés par la normalisation « norm »
+FR_VOIE_TOKENS = frozenset({
+    "rue", "av", "ave", "avenue", "bd", "bld", "boulevard", "chemin", "chem", "che",
+    "route", "rt", "impasse", "imp", "allee", "all", "place", "pl", "quai", "qa",
+    "cours", "crs", "sentier", "sente", "voie", "square", "sq", "rocade", "roc",
+    "faubourg", "fg", "chaussee", "ch", "cd", "rd", "vc",
+})
+
+_PUNCT = re.compile(r"[\W_]+", flags=re.U)
+
+
+def fold_text(s) -> str:
+    """Sans accents, casse ni ponctuation ; espaces simples."""
+    if s is None:
+        return ""
+    s = unicodedata.normalize("NFKD", str(s)).encode("ascii", "ignore").decode("ascii").casefold()
+    return " ".join(_PUNCT.sub(" ", s).split())
+
+
+def normalize_street_name(s) -> str:
+    """``fold_text`` sans les types de voie (« Rue de l'Église » → « de l eglise »)."""
+    return " ".join(t for t in fold_text(s).split() if t not in FR_VOIE_TOKENS)
+
+
+def _trigrams(folded: str) -> set:
+    # Trigrammes par mot, bordés comme pg_trgm ("  m", " mo", ..., "ot ")
+    out = set()
+    for w in folded.split():
+        p = f"  {w} "
+        out.update(p[i:i + 3] for i in range(len(p) - 2))
+    return out
+
+
+def _inner_trigrams(folded: str) -> set:
+    # Trigrammes présents dans tout texte contenant ``folded`` (intérieurs aux mots)
+    out = set()
+    for w in folded.split():
+        out.update(w[i:i + 3] for i in range(len(w) - 2))
+    return out
+
+
+def guess_name_columns(columns: Iterable[str], text_columns: Optional[Iterable[str]] = None) -> List[str]:
+    """Colonnes de nom probables, restreintes à ``text_columns`` si fourni.
+
+    Le filtre de type écarte les champs numériques dont le nom contient un
+    indice (``nombre_de_voies`` contient « nom »).
+    """
+    text = None if text_columns is None else set(text_columns)
+    cols = [c for c in columns if any(h in str(c).lower() for h in NAME_COL_HINTS) and (text is None or c in text)]
+    preferred = [c for c in ("name", "nom_voie", "nom", "libelle") if c in cols]
+    return list(dict.fromkeys(preferred + cols))
+
+
+def text_columns(df: pd.DataFrame) -> List[str]:
+    """Colonnes texte (objet ou chaîne) d'un DataFrame."""
+    return [c for c in df.columns if pd.api.types.is_string_dtype(df[c].dtype)]
+
+
+class StreetIndex:
+    """Noms distincts → identifiants, plus index inversé des trigrammes."""
+
+    def __init__(
+        self,
+        names: np.ndarray,
+        id_offsets: np.ndarray,
+        ids: np.ndarray,
+        columns: Sequence[str] = (),
+        fold: Optional[np.ndarray] = None,
+        norm: Optional[np.ndarray] = None,
+        tri_keys: Optional[np.ndarray] = None,
+        tri_offsets: Optional[np.ndarray] = None,
+        tri_postings: Optional[np.ndarray] = None,
+        tri_count: Optional[np.ndarray] = None,
+    ):
+        self.names = np.asarray(names, dtype=object)
+        self.id_offsets = np.asarray(id_offsets, dtype=np.int64)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.columns = list(columns)
+        self.fold = np.asarray([fold_text(n) for n in self.names], dtype=object) if fold is None else np.asarray(fold, dtype=object)
+        self.norm = np.asarray([normalize_street_name(f) for f in self.fold], dtype=object) if norm is None else np.asarray(norm, dtype=object)
+        if tri_keys is None:
+            tri_keys, tri_offsets, tri_postings, tri_count = self._build_trigrams(self.fold)
+        self.tri_keys = np.asarray(tri_keys, dtype=str)
+        self.tri_offsets = np.asarray(tri_offsets, dtype=np.int64)
+        self.tri_postings = np.asarray(tri_postings, dtype=np.int32)
+        self.tri_count = np.asarray(tri_count, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def _build_trigrams(fold: np.ndarray):
+        tris: List[str] = []
+        owner: List[int] = []
+        count = np.zeros(len(fold), dtype=np.int32)
+        for i, f in enumerate(fold):
+            t = _trigrams(f)
+            count[i] = len(t)
+            tris.extend(t)
+            owner.extend([i] * len(t))
+        if not tris:
+            return np.empty(0, dtype=str), np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32), count
+        codes, keys = pd.factorize(np.asarray(tris, dtype=object), sort=True)
+        owner_a = np.asarray(owner, dtype=np.int32)
+        order = np.lexsort((owner_a, codes))
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(keys)))])
+        return np.asarray(keys, dtype=str), offsets, owner_a[order], count
+
+    # --- construction -----------------------------------------------------
+    @classmethod
+    def from_pairs(cls, names: Sequence, ids: Sequence[int], columns: Sequence[str] = ()) -> "StreetIndex":
+        """Couples (nom, identifiant) → index (noms vides ignorés)."""
+        s = pd.Series(names, dtype=object)
+        ids_a = np.asarray(ids, dtype=np.int64)
+        keep = s.notna().to_numpy() & (s.astype(str).str.strip() != "").to_numpy()
+        codes, uniq = pd.factorize(s[keep].astype(str), sort=True)
+        ids_a = ids_a[keep]
+        order = np.lexsort((ids_a, codes))
+        codes, ids_a = codes[order], ids_a[order]
+        # doublons (même identifiant sous plusieurs colonnes de nom)
+        first = np.ones(len(codes), dtype=bool)
+        first[1:] = (codes[1:] != codes[:-1]) | (ids_a[1:] != ids_a[:-1])
+        codes, ids_a = codes[first], ids_a[first]
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(uniq)))])
+        return cls(np.asarray(uniq, dtype=object), offsets, ids_a, columns=columns)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: Optional[Sequence[str]] = None, ids: Optional[Sequence[int]] = None) -> "StreetIndex":
+        """Index en mémoire sur les colonnes de nom d'un DataFrame (ids = positions)."""
+        cols = [c for c in (columns or guess_name_columns(df.columns, text_columns(df))) if c in df.columns]
+        ids_a = np.arange(len(df)) if ids is None else np.asarray(ids)
+        if not cols:
+            return cls.from_pairs([], [], columns=[])
+        names = np.concatenate([df[c].map(_as_name).to_numpy(dtype=object) for c in cols])
+        return cls.from_pairs(names, np.tile(ids_a, len(cols)), columns=cols)
+
+    @classmethod
+    def from_source(cls, path: str | os.PathLike, columns: Optional[Sequence[str]] = None, layer: Optional[str] = None) -> "StreetIndex":
+        """Lit uniquement les colonnes de nom de la source (sans géométrie).
+
+        Parquet : identifiants = numéros de ligne ; couche vecteur : FID.
+        """
+        path = str(path)
+        if path.endswith(".parquet"):
+            schema = pq.read_schema(path)
+            text = [f.name for f in schema if pa.types.is_string(f.type) or pa.types.is_large_string(f.type)]
+            cols = [c for c in (columns or guess_name_columns(schema.names, text)) if c in schema.names]
+            df = pq.read_table(path, columns=cols).to_pandas() if cols else pd.DataFrame(index=range(pq.ParquetFile(path).metadata.num_rows))
+            return cls.from_frame(df, cols)
+        if HAS_PYOGRIO:
+            info = pyogrio.read_info(path, layer=layer)  # type: ignore[attr-defined]
+            fields = [str(f) for f in info["fields"]]
+            text = [f for f, t in zip(fields, info["dtypes"]) if t == "object"]
+            cols = [c for c in (columns or guess_name_columns(fields, text)) if c in fields]
+            df = pyogrio.read_dataframe(path, layer=layer, columns=cols, read_geometry=False, fid_as_index=True)  # type: ignore[attr-defined]
+            return cls.from_frame(df, cols, ids=df.index.to_numpy())
+        import geopandas as gpd
+
+        df = gpd.read_file(path, layer=layer, ignore_geometry=True)
+        cols = [c for c in (columns or guess_name_columns(df.columns, text_columns(df))) if c in df.columns]
+        return cls.from_frame(df, cols)
+
+    # --- persistance ------------------------------------------------------
+    def save(self, directory: str | os.PathLike, source: Optional[dict] = None) -> None:
+        d = Path(directory)
+        d.mkdir(parents=True, exist_ok=True)
+        ids_list = pa.ListArray.from_arrays(pa.array(self.id_offsets, pa.int32()), pa.array(self.ids, pa.int64()))
+        names_t = pa.table({
+            "name": pa.array(self.names.tolist(), pa.string()),
+            "fold": pa.array(self.fold.tolist(), pa.string()),
+            "norm": pa.array(self.norm.tolist(), pa.string()),
+            "n_trigrams": pa.array(self.tri_count, pa.int32()),
+            "ids": ids_list,
+        })
+        meta = {"version": INDEX_VERSION, "columns": self.columns, "source": source or {}}
+        names_t = names_t.replace_schema_metadata({INDEX_KEY: json.dumps(meta).encode()})
+        tri_t = pa.table({
+            "trigram": pa.array(self.tri_keys.tolist(), pa.string()),
+            "names": pa.ListArray.from_arrays(pa.array(self.tri_offsets, pa.int32()), pa.array(self.tri_postings, pa.int32())),
+        })
+        # écriture atomique (lecteurs concurrents)
+        for t, name in ((tri_t, "trigrams.parquet"), (names_t, "names.parquet")):
+            tmp = d / f".{name}.tmp"
+            pq.write_table(t, tmp)
+            os.replace(tmp, d / name)
+
+    @staticmethod
+    def read_meta(directory: str | os.PathLike) -> Optional[dict]:
+        try:
+            md = pq.read_schema(Path(directory) / "names.parquet").metadata or {}
+            return json.loads(md[INDEX_KEY])
+        except Exception:
+            return None
+
+    @classmethod
+    def load(cls, directory: str | os.PathLike) -> "StreetIndex":
+        d = Path(directory)
+        names_t = pq.read_table(d / "names.parquet")
+        tri_t = pq.read_table(d / "trigrams.parquet")
+        meta = cls.read_meta(d) or {}
+        ids_col = names_t.column("ids").combine_chunks()
+        tri_col = tri_t.column("names").combine_chunks()
+        return cls(
+            np.asarray(names_t.column("name").to_pylist(), dtype=object),
+            ids_col.offsets.to_numpy(),
+            ids_col.values.to_numpy(),
+            columns=meta.get("columns", []),
+            fold=np.asarray(names_t.column("fold").to_pylist(), dtype=object),
+            norm=np.asarray(names_t.column("norm").to_pylist(), dtype=object),
+            tri_keys=np.asarray(tri_t.column("trigram").to_pylist(), dtype=str),
+            tri_offsets=tri_col.offsets.to_numpy(),
+            tri_postings=tri_col.values.to_numpy(),
+            tri_count=names_t.column("n_trigrams").to_numpy(),
+        )
+
+    # --- recherche --------------------------------------------------------
+    def _posting(self, tri: str) -> np.ndarray:
+        i = int(np.searchsorted(self.tri_keys, tri))
+        if i < len(self.tri_keys) and self.tri_keys[i] == tri:
+            return self.tri_postings[self.tri_offsets[i]:self.tri_offsets[i + 1]]
+        return self.tri_postings[:0]
+
+    def _candidates(self, folded: str) -> np.ndarray:
+        tris = sorted(_inner_trigrams(folded))
+        if not tris:
+            return np.arange(len(self.names))
+        posts = sorted((self._posting(t) for t in tris), key=len)
+        cand = posts[0]
+        for p in posts[1:]:
+            if cand.size == 0:
+                break
+            cand = np.intersect1d(cand, p, assume_unique=True)
+        return cand
+
+    def match(self, query: str) -> np.ndarray:
+        """Indices des noms contenant la requête (forme ``fold`` ou ``norm``)."""
+        q_fold, q_norm = fold_text(query), normalize_street_name(query)
+        if not q_fold:
+            return np.empty(0, dtype=np.int64)
+        hits = [int(i) for i in self._candidates(q_fold) if q_fold in self.fold[i]]
+        if q_norm and q_norm != q_fold:
+            hits += [int(i) for i in self._candidates(q_norm) if q_norm in self.norm[i]]
+        return np.unique(np.asarray(hits, dtype=np.int64))
+
+    def match_names(self, query: str) -> List[str]:
+        return self.names[self.match(query)].tolist()
+
+    def lookup(self, query: str) -> np.ndarray:
+        """Identifiants (lignes/FID) dont un nom contient la requête."""
+        m = self.match(query)
+        if m.size == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate([self.ids[self.id_offsets[i]:self.id_offsets[i + 1]] for i in m]))
+
+    def suggest(self, query: str, n: int = 5, cutoff: float = 0.5) -> List[Tuple[str, float]]:
+        """Noms les plus proches : part des trigrammes de la requête présents dans le nom
+        (``word_similarity`` de pg_trgm), départagés par la similarité de Jaccard."""
+        q = _trigrams(fold_text(query))
+        if not q or len(self.names) == 0:
+            return []
+        shared = np.bincount(np.concatenate([self._posting(t) for t in q]), minlength=len(self.names))
+        cand = np.flatnonzero(shared >= cutoff * len(q))
+        if cand.size == 0:
+            return []
+        word_sim = shared[cand] / len(q)
+        jaccard = shared[cand] / np.maximum(len(q) + self.tri_count[cand] - shared[cand], 1)
+        top = cand[np.lexsort((-jaccard, -word_sim))[:n]]
+        return [(str(self.names[i]), float(shared[i] / len(q))) for i in top]
+
+
+def _as_name(v) -> Optional[str]:
+    # OSM : listes de noms possibles
+    if isinstance(v, (list, tuple, np.ndarray)):
+        return ", ".join(map(str, v))
+    return None if v is None or (isinstance(v, float) and np.isnan(v)) else str(v)
+
+
+def index_path(source: str | os.PathLike, layer: Optional[str] = None) -> Path:
+    return Path(str(source) + (f".{layer}" if layer else "") + INDEX_SUFFIX)
+
+
+def _source_stat(source: str | os.PathLike) -> dict:
+    st = os.stat(source)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def load_street_index(
+    source: str | os.PathLike,
+    columns: Optional[Sequence[str]] = None,
+    layer: Optional[str] = None,
+    persist: bool = True,
+) -> StreetIndex:
+    """Index de ``source`` : relu depuis ``<source>.street_index`` s'il est à jour, sinon reconstruit.
+
+    Reconstruction si la taille/mtime de la source ou les colonnes demandées
+    ont changé. ``persist=False`` (ou ``RS3_STREET_INDEX=0``) : index en
+    mémoire seulement ; un dossier non inscriptible est ignoré.
+    """
+    persist = persist and os.environ.get("RS3_STREET_INDEX", "1") not in ("0", "false", "False")
+    d = index_path(source, layer)
+    stat = _source_stat(source)
+    meta = StreetIndex.read_meta(d) if persist else None
+    if (
+        meta is not None
+        and meta.get("version") == INDEX_VERSION
+        and meta.get("source") == stat
+        and (columns is None or list(columns) == meta.get("columns"))
+    ):
+        return StreetIndex.load(d)
+    idx = StreetIndex.from_source(source, columns, layer=layer)
+    if persist:
+        try:
+            idx.save(d, source=stat)
+        except OSError as e:
+            print(f"[streets] index non enregistré ({d}): {e}")
+    return idx
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Construit/interroge l'index des noms de voies d'une source")
+    ap.add_argument("source", nargs="+", help="Parquet segments ou couche vecteur (GPKG/GeoJSON)")
+    ap.add_argument("--columns", default=None, help="Colonnes de nom (séparées par des virgules ; défaut: devinées)")
+    ap.add_argument("--layer", default=None, help="Couche (GeoPackage multi-couches)")
+    ap.add_argument("--query", default=None, help="Recherche (contient) + suggestions")
+    args = ap.parse_args(argv)
+    cols = args.columns.split(",") if args.columns else None
+    for src in args.source:
+        idx = load_street_index(src, cols, layer=args.layer)
+        print(f"{src}: {len(idx)} noms, {len(idx.tri_keys)} trigrammes, colonnes={idx.columns} → {index_path(src, args.layer)}")
+        if args.query:
+            names = idx.match_names(args.query)
+            print(f"  {len(names)} noms / {len(idx.lookup(args.query))} ids: {names[:10]}")
+            print(f"  suggestions: {idx.suggest(args.query)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,36 +6,14 @@ from shapely.geometry import LineString, MultiLineString
 from shapely.ops import unary_union
 import pandas as pd
 from shapely.geometry import box
-import unicodedata
 import time
 from pyproj import Transformer, CRS
+from rs3_study_curvature.data.street_index import StreetIndex, load_street_index
 try:
     import fiona as _fiona  # optional, used to peek CRS cheaply
 except Exception:
     _fiona = None
 
-def _casefold_no_accents(s: str) -> str:
-    if s is None:
-        return ""
-    # Remove accents then casefold
-    return unicodedata.normalize("NFKD", str(s)).encode("ASCII", "ignore").decode("ASCII").casefold()
-
-# Helper: strip French voie types for fuzzy matching
-_FR_VOIE_TOKENS = {
-    "rue", "av", "ave", "avenue", "bd", "bld", "boulevard", "chemin", "chem", "che",
-    "route", "rt", "impasse", "imp", "allee", "allée", "all", "place", "pl", "quai", "qa",
-    "cours", "crs", "sentier", "sente", "voie", "square", "sq", "rocade", "roc",
-    "faubourg", "fg", "chaussée", "chaussee", "ch", "cd", "rd", "vc"
-}
-
-def _normalize_street_text(s: str) -> str:
-    s2 = _casefold_no_accents(s)
-    # remove punctuation
-    for ch in ",;:.!?()[]{}'\"-_/\\":
-        s2 = s2.replace(ch, " ")
-    toks = [t for t in s2.split() if t and t not in _FR_VOIE_TOKENS]
-    return " ".join(toks)
-
 def _normalize_name_column(gdf: gpd.GeoDataFrame, fallback: str = "") -> gpd.GeoDataFrame:
     # Try common name columns (OSM + IGN/BDTopo)
     if "name" not in gdf.columns:
@@ -289,19 +267,11 @@ def load_streets_from_osm(bbox: Tuple[float, float, float, float], street: Optio
             return str(n) if n is not None else ""
         gdf["name"] = gdf["name"].map(_norm)
 
-    # Build normalized name for fuzzy contains (strip voie type + accents)
-    if "name" in gdf.columns:
-        gdf["name_norm"] = gdf["name"].map(_normalize_street_text)
-    else:
-        gdf["name_norm"] = ""
-
+    # Filtre par nom : index des noms distincts (normalisés une seule fois), puis isin
     if street:
-        s_raw = _casefold_no_accents(street)
-        s_fuz = _normalize_street_text(street)
         before = len(gdf)
-        g1 = gdf[gdf["name"].map(lambda x: s_raw in _casefold_no_accents(x))] if "name" in gdf.columns else gdf.iloc[[]]
-        g2 = gdf[gdf["name_norm"].map(lambda x: s_fuz in x)] if "name_norm" in gdf.columns else gdf.iloc[[]]
-        gdf = pd.concat([g1, g2], ignore_index=False).drop_duplicates().reset_index(drop=True)
+        names = StreetIndex.from_frame(gdf, ["name"]).match_names(street)
+        gdf = gdf[gdf["name"].isin(names)].reset_index(drop=True)
         print(f"[streets] OSM name filter matched rows={len(gdf)} (from {before}) for query={street!r}")
 
     if os.environ.get("RS3_STREETS_KEEP_SEGMENTS", "0") in ("1", "true", "True"):
@@ -486,43 +456,32 @@ def load_streets_from_ign(bbox: Tuple[float, float, float, float], street: Optio
                 name_unavailable = True
     except Exception:
         pass
-    # Build normalized name for fuzzy contains (strip voie type + accents)
-    if "name" in gdf.columns:
-        gdf["name_norm"] = gdf["name"].map(_normalize_street_text)
-    else:
-        gdf["name_norm"] = ""
     if os.environ.get("RS3_IGN_NAME_DEBUG", "0") in ("1","true","True"):
         try:
-            sample = gdf[["name","name_norm"]].dropna().drop_duplicates().head(20)
+            sample = gdf[["name"]].dropna().drop_duplicates().head(20)
             print("[streets] IGN name samples:\n", sample.to_string(index=False))
         except Exception:
             pass
 
-    # Filtre attributaire optionnel (contains + fuzzy contains sans type de voie)
+    # Filtre attributaire optionnel (contient, sans accents/casse, avec ou sans type de voie)
+    # résolu dans l'index persistant de la couche (<RS3_IGN_PATH>.street_index)
     if street:
         if name_unavailable:
             print("[streets] IGN: no usable name column/values; skipping attribute name filter and keeping spatial selection only")
         else:
-            s_raw = _casefold_no_accents(street)
-            s_fuz = _normalize_street_text(street)
+            try:
+                index = load_street_index(path, columns=[name_col_override] if name_col_override else None, layer=layer)
+            except Exception as e:
+                print(f"[streets] IGN name index unavailable ({e}) → in-memory index over bbox rows")
+                index = StreetIndex.from_frame(gdf, ["name"])
             before = len(gdf)
-            # 1) try strict contains on raw name
-            g1 = gdf[gdf["name"].map(lambda x: s_raw in _casefold_no_accents(x))] if "name" in gdf.columns else gdf.iloc[[]]
-            # 2) try fuzzy contains on normalized name
-            g2 = gdf[gdf["name_norm"].map(lambda x: s_fuz in x)] if "name_norm" in gdf.columns else gdf.iloc[[]]
-            gdf = pd.concat([g1, g2], ignore_index=False).drop_duplicates().reset_index(drop=True)
+            gdf = gdf[gdf["name"].isin(index.match_names(street))].reset_index(drop=True)
             print(f"[streets] IGN name filter matched rows={len(gdf)} (from {before}) for query={street!r}")
-            # optional: if still zero, propose close matches
+            # optional: if still zero, propose close matches (tous les noms de la couche)
             if len(gdf) == 0 and os.environ.get("RS3_IGN_SUGGEST", "1") in ("1","true","True"):
-                try:
-                    import difflib
-                    universe = (gdf[["name","name_norm"]] if "name" in gdf.columns else pd.DataFrame({"name_norm":[]}))
-                    names = list({*(universe.get("name", pd.Series(dtype=str)).dropna().tolist()), *(universe.get("name_norm", pd.Series(dtype=str)).dropna().tolist())})
-                    sugg = difflib.get_close_matches(s_fuz, names, n=5, cutoff=0.6)
-                    if sugg:
-                        print(f"[streets] IGN suggestions (normalized): {sugg}")
-                except Exception:
-                    pass
+                sugg = index.suggest(street)
+                if sugg:
+                    print(f"[streets] IGN suggestions: {[n for n, _ in sugg]}")
 
     # Option: renvoyer les segments bruts (pas de dissolve) pour comparaison/rapidité
     if os.environ.get("RS3_STREETS_KEEP_SEGMENTS", "0") in ("1", "true", "True"):
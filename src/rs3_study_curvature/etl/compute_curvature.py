@@ -14,6 +14,8 @@ import logging
 from tqdm import tqdm
 from pyproj import Transformer
 
+from rs3_study_curvature.data.segments import DEFAULT_ROW_GROUP_SIZE, write_profile, write_segments
+
 try:
     from pyrosm import OSM
 except Exception:  # pragma: no cover
@@ -389,7 +391,7 @@ def build_from_config(cfg_path: Path) -> None:
         if maxspeed_col:
             log.info("Colonne 'maxspeed' détectée → exportée telle quelle.")
 
-        seg_rows, prof_rows = [], []
+        seg_rows, prof_rows, geom_rows = [], [], []
         log.info("Début du calcul de courbure/pente…")
         for _, r in tqdm(gdf.iterrows(), total=len(gdf), desc="curvature", unit="seg"):
             geom = r.geometry
@@ -448,6 +450,7 @@ def build_from_config(cfg_path: Path) -> None:
             prof["road_id"] = road_id
             prof["source"] = src
             prof_rows.append(prof)
+            geom_rows.append(line)
 
         # Résolution des chemins de sortie (patterns ou valeurs par défaut)
         out = y_local.get("outputs", {})
@@ -472,8 +475,14 @@ def build_from_config(cfg_path: Path) -> None:
 
         # --- Write segments ---
         seg_df = pd.DataFrame(seg_rows)
+        # Tri spatial optionnel (hilbert|zorder) : row groups localisés + bbox par row group
+        spatial_sort = out.get("spatial_sort") or None
+        row_group_size = int(out.get("row_group_size", DEFAULT_ROW_GROUP_SIZE))
         try:
-            seg_df.to_parquet(seg_path, index=False)
+            # CRS des centroïdes dans les métadonnées (lectures bbox sans heuristique)
+            order = write_segments(seg_df, seg_path, cfg.crs, spatial_sort=spatial_sort, row_group_size=row_group_size)
+            seg_df = seg_df.iloc[order].reset_index(drop=True)
+            geom_rows = [geom_rows[i] for i in order]
             log.info(f"Écrit: {seg_path} ({len(seg_df):,} lignes)")
         except Exception as e:
             log.warning(f"Échec écriture Parquet pour segments ({e}). Fallback CSV.")
@@ -481,11 +490,21 @@ def build_from_config(cfg_path: Path) -> None:
             seg_df.to_csv(seg_path_csv, index=False)
             log.info(f"Écrit: {seg_path_csv} ({len(seg_df):,} lignes)")
 
+        # --- Write geometry sidecar (row-aligned with segments, for geometry matching) ---
+        if out.get("geometry_sidecar", True) and seg_rows:
+            geom_path = seg_path.with_name(f"{seg_path.stem}_geom.parquet")
+            try:
+                gpd.GeoDataFrame({"road_id": seg_df["road_id"]}, geometry=geom_rows, crs=cfg.crs).to_parquet(geom_path, index=False)
+                log.info(f"Écrit: {geom_path} ({len(geom_rows):,} géométries)")
+            except Exception as e:
+                log.warning(f"Échec écriture du sidecar géométrique ({e}).")
+
         # --- Write profile ---
         if prof_rows:
             prof_df = pd.concat(prof_rows, ignore_index=True)
             try:
-                prof_df.to_parquet(prof_path, index=False)
+                # même ordre que les segments si tri spatial (bbox des row groups en métadonnées)
+                write_profile(prof_df, prof_path, seg_df if spatial_sort else None, crs=cfg.crs)
                 log.info(f"Écrit: {prof_path} ({len(prof_df):,} échantillons)")
             except Exception as e:
                 log.warning(f"Échec écriture Parquet pour profile ({e}). Fallback CSV.")
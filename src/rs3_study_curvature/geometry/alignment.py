@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""Segmentation du tracé en éléments droite / arc / clothoïde.
+
+Sur chaque profil κ(s) de ``roadinfo_profile``, la courbure est approchée par
+une fonction linéaire par morceaux (split-and-merge) :
+
+1. *split* : un morceau est coupé au point qui minimise la somme des erreurs
+   quadratiques des deux moitiés tant que son écart RMS dépasse ``tol_k``
+   (longueur et nombre de points minimaux respectés) ;
+2. *merge* : les voisins dont la fusion reste sous ``tol_k`` sont fusionnés
+   (le moins coûteux d'abord) ;
+3. classification : |κ| < ``k_line`` sur tout le morceau → droite (κ=0),
+   |κ1-κ0| ≤ ``tol_k`` → arc (κ constant), sinon clothoïde (κ linéaire).
+
+Chaque ajustement coûte O(1) grâce aux sommes cumulées (Σs, Σκ, Σs², Σsκ,
+Σκ²) ; la recherche du point de coupe est vectorisée. Les routes sont
+traitées par lots dans un pool de processus.
+
+Sortie : table ``road_id, s0, s1, type, k0, k1`` (Parquet, float32,
+``type``/``road_id`` dictionnaires), éléments contigus et triés par route.
+
+Usage :
+  python -m rs3_study_curvature.geometry.alignment --profile roadinfo_profile_osm.parquet --out alignment_osm.parquet
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+ELEMENT_TYPES = ["line", "arc", "clothoid"]
+KAPPA_COLUMNS = ("curvature_1perm", "kappa", "curvature")
+
+
+def _prefix(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # Sommes cumulées (n, Σx, Σy, Σx², Σxy, Σy²) avec un zéro en tête
+    cols = np.stack([np.ones_like(x), x, y, x * x, x * y, y * y])
+    return np.concatenate([np.zeros((6, 1)), np.cumsum(cols, axis=1)], axis=1)
+
+
+def _fit(P: np.ndarray, i, j) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(pente, ordonnée, SSE) de y ≈ a*x + b sur [i, j) (scalaires ou tableaux)."""
+    n, sx, sy, sxx, sxy, syy = P[:, j] - P[:, i]
+    cxx = sxx - sx * sx / n
+    cxy = sxy - sx * sy / n
+    cyy = syy - sy * sy / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a = np.where(cxx > 0, cxy / cxx, 0.0)
+    b = (sy - a * sx) / n
+    return a, b, np.maximum(cyy - a * cxy, 0.0)
+
+
+def _split(P: np.ndarray, s: np.ndarray, tol_sse_per_pt: float, min_pts: int, min_len: float) -> List[Tuple[int, int]]:
+    out: List[Tuple[int, int]] = []
+    stack = [(0, len(s))]
+    while stack:
+        i, j = stack.pop()
+        _, _, sse = _fit(P, i, j)
+        m = np.arange(i + min_pts, j - min_pts + 1)
+        m = m[(s[m - 1] - s[i] >= min_len) & (s[j - 1] - s[m] >= min_len)] if m.size else m
+        if sse <= tol_sse_per_pt * (j - i) or m.size == 0:
+            out.append((i, j))
+            continue
+        cost = _fit(P, np.full(m.size, i), m)[2] + _fit(P, m, np.full(m.size, j))[2]
+        c = int(m[np.argmin(cost)])
+        stack.append((c, j))
+        stack.append((i, c))
+    return sorted(out)
+
+
+def _merge(P: np.ndarray, parts: List[Tuple[int, int]], tol_sse_per_pt: float) -> List[Tuple[int, int]]:
+    bounds = [p[0] for p in parts] + [parts[-1][1]]
+    while len(bounds) > 2:
+        lo, hi = np.asarray(bounds[:-2]), np.asarray(bounds[2:])
+        sse = _fit(P, lo, hi)[2] / (hi - lo)
+        k = int(np.argmin(sse))
+        if sse[k] > tol_sse_per_pt:
+            break
+        del bounds[k + 1]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _segment_arrays(s: np.ndarray, k: np.ndarray, tol_k: float, k_line: float, min_len: float, min_pts: int):
+    ok = np.isfinite(s) & np.isfinite(k)
+    s, k = np.asarray(s, float)[ok], np.asarray(k, float)[ok]
+    if s.size == 0:
+        e = np.empty(0)
+        return e, e, np.empty(0, dtype=np.int8), e, e
+    x = s - s[0]
+    P = _prefix(x, k)
+    tol_sse = tol_k * tol_k
+    parts = _split(P, s, tol_sse, max(int(min_pts), 2), float(min_len))
+    parts = _merge(P, parts, tol_sse)
+
+    i = np.array([p[0] for p in parts])
+    j = np.array([p[1] for p in parts])
+    a, b, _ = _fit(P, i, j)
+    k0 = a * x[i] + b
+    k1 = a * x[j - 1] + b
+    # bornes contiguës : milieu entre dernier et premier échantillon de deux éléments voisins
+    cut = 0.5 * (s[j[:-1] - 1] + s[i[1:]])
+    s0 = np.r_[s[0], cut]
+    s1 = np.r_[cut, s[-1]]
+
+    kmax = np.maximum(np.abs(k0), np.abs(k1))
+    etype = np.where(kmax < k_line, 0, np.where(np.abs(k1 - k0) <= tol_k, 1, 2)).astype(np.int8)
+    kmean = 0.5 * (k0 + k1)
+    k0 = np.where(etype == 0, 0.0, np.where(etype == 1, kmean, k0))
+    k1 = np.where(etype == 0, 0.0, np.where(etype == 1, kmean, k1))
+
+    # droites consécutives fusionnées
+    keep = np.r_[True, ~((etype[1:] == 0) & (etype[:-1] == 0))]
+    last = np.r_[np.flatnonzero(keep)[1:] - 1, len(keep) - 1]
+    return s0[keep], s1[last], etype[keep], k0[keep], k1[last]
+
+
+def segment_road(s: np.ndarray, k: np.ndarray, tol_k: float = 2e-4, k_line: float = 1.0 / 3000.0, min_len: float = 15.0, min_pts: int = 3) -> pd.DataFrame:
+    """Éléments (s0, s1, type, k0, k1) d'un profil κ(s) trié ; valeurs non finies ignorées."""
+    s0, s1, etype, k0, k1 = _segment_arrays(s, k, tol_k, k_line, min_len, min_pts)
+    return pd.DataFrame({"s0": s0, "s1": s1, "type": np.asarray(ELEMENT_TYPES, dtype=object)[etype], "k0": k0, "k1": k1})
+
+
+def _segment_batch(args) -> pd.DataFrame:
+    road_ids, s, k, offsets, params = args
+    params = {"tol_k": 2e-4, "k_line": 1.0 / 3000.0, "min_len": 15.0, "min_pts": 3, **params}
+    cols: List[List[np.ndarray]] = [[], [], [], [], []]
+    counts = []
+    for i0, i1 in zip(offsets[:-1], offsets[1:]):
+        res = _segment_arrays(s[i0:i1], k[i0:i1], **params)
+        for c, v in zip(cols, res):
+            c.append(v)
+        counts.append(len(res[0]))
+    s0, s1, etype, k0, k1 = (np.concatenate(c) if c else np.empty(0) for c in cols)
+    return pd.DataFrame(
+        {
+            "road_id": np.repeat(np.asarray(road_ids, dtype=object), counts),
+            "s0": s0,
+            "s1": s1,
+            "type": pd.Categorical.from_codes(etype.astype(np.int8), categories=ELEMENT_TYPES),
+            "k0": k0,
+            "k1": k1,
+        }
+    )
+
+
+def segment_profiles(
+    road_ids: Sequence[str],
+    s: np.ndarray,
+    k: np.ndarray,
+    offsets: np.ndarray,
+    batch_roads: int = 2000,
+    max_workers: Optional[int] = None,
+    **params,
+) -> pd.DataFrame:
+    """Segmente des profils concaténés (``offsets`` : L+1 bornes) par lots de routes, en parallèle."""
+    offsets = np.asarray(offsets, dtype=np.int64)
+    road_ids = np.asarray(road_ids, dtype=object)
+    batches = []
+    for r0 in range(0, len(road_ids), batch_roads):
+        r1 = min(r0 + batch_roads, len(road_ids))
+        i0, i1 = offsets[r0], offsets[r1]
+        batches.append((road_ids[r0:r1], s[i0:i1], k[i0:i1], offsets[r0 : r1 + 1] - i0, params))
+    workers = max(1, min(max_workers if max_workers is not None else (os.cpu_count() or 1), len(batches)))
+    if workers == 1:
+        frames = [_segment_batch(b) for b in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            frames = list(ex.map(_segment_batch, batches))
+    if not frames:
+        frames = [_segment_batch(([], s[:0], k[:0], np.zeros(1, dtype=np.int64), params))]
+    return _compact(pd.concat(frames, ignore_index=True))
+
+
+def _compact(df: pd.DataFrame) -> pd.DataFrame:
+    out = df.astype({"s0": np.float32, "s1": np.float32, "k0": np.float32, "k1": np.float32})
+    out["road_id"] = pd.Categorical(out["road_id"].astype(str))
+    out["type"] = pd.Categorical(out["type"], categories=ELEMENT_TYPES)
+    return out
+
+
+def read_profiles(path: str | Path, kappa_col: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(road_ids, s, κ, offsets) depuis un Parquet profil, groupé par route (ordre d'apparition) et trié par s."""
+    import pyarrow.parquet as pq
+
+    names = pq.read_schema(path).names
+    kcol = kappa_col or next((c for c in KAPPA_COLUMNS if c in names), None)
+    if kcol is None:
+        raise ValueError(f"Aucune colonne de courbure ({', '.join(KAPPA_COLUMNS)}) dans {path}")
+    df = pd.read_parquet(path, columns=["road_id", "s_m", kcol])
+    codes, uniques = pd.factorize(df["road_id"].astype(str), sort=False)
+    order = np.lexsort((df["s_m"].to_numpy(), codes))
+    codes = codes[order]
+    offsets = np.searchsorted(codes, np.arange(len(uniques) + 1))
+    return np.asarray(uniques, dtype=object), df["s_m"].to_numpy(float)[order], df[kcol].to_numpy(float)[order], offsets
+
+
+def load_alignment(path: str | Path, road_ids: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Lit la table d'éléments (filtre ``road_id`` poussé au scan)."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(str(path), format="parquet")
+    expr = None
+    if road_ids is not None:
+        # ensemble typé d'après le schéma (une liste vide serait de type null)
+        t = dataset.schema.field("road_id").type
+        t = t.value_type if pa.types.is_dictionary(t) else t
+        expr = ds.field("road_id").isin(pa.array([str(r) for r in road_ids], type=t))
+    return dataset.to_table(filter=expr).to_pandas()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Segmentation droite/arc/clothoïde des profils κ(s)")
+    ap.add_argument("--profile", type=Path, required=True, help="roadinfo_profile*.parquet (road_id, s_m, curvature_1perm)")
+    ap.add_argument("--out", type=Path, required=True, help="Parquet des éléments (road_id, s0, s1, type, k0, k1)")
+    ap.add_argument("--kappa-col", default=None, help="colonne de courbure (défaut: curvature_1perm/kappa/curvature)")
+    ap.add_argument("--tol-k", type=float, default=2e-4, help="écart RMS toléré sur κ (1/m)")
+    ap.add_argument("--k-line", type=float, default=1.0 / 3000.0, help="|κ| sous lequel un élément est une droite")
+    ap.add_argument("--min-len", type=float, default=15.0, help="longueur minimale d'un élément (m)")
+    ap.add_argument("--batch-roads", type=int, default=2000)
+    ap.add_argument("--workers", type=int, default=None, help="processus (défaut: tous les cœurs)")
+    args = ap.parse_args(argv)
+
+    road_ids, s, k, offsets = read_profiles(args.profile, args.kappa_col)
+    elements = segment_profiles(road_ids, s, k, offsets, batch_roads=args.batch_roads, max_workers=args.workers, tol_k=args.tol_k, k_line=args.k_line, min_len=args.min_len)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    elements.to_parquet(args.out, index=False, row_group_size=65_536)
+    counts = elements["type"].value_counts().to_dict()
+    print(f"✅ {len(elements):,} éléments pour {len(road_ids):,} routes {counts} → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
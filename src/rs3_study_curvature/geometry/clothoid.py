@@ -1,4 +1,6 @@
 from dataclasses import dataclass
+from typing import Optional, Tuple
+
 import numpy as np
 from shapely.geometry import LineString
 
@@ -12,36 +14,72 @@ class ClothoidFit:
     s_end: float
 
 
+def _linfit_from_sums(n, sx, sy, sxx, sxy, syy) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pente, ordonnée et R² de y ≈ a*x + b à partir des sommes (vectorisé)."""
+    cxx = sxx - sx * sx / n
+    cxy = sxy - sx * sy / n
+    cyy = syy - sy * sy / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a = np.where(cxx > 0, cxy / cxx, 0.0)
+    b = (sy - a * sx) / n
+    ss_res = np.maximum(cyy - a * cxy, 0.0)
+    r2 = 1.0 - ss_res / np.maximum(cyy, 1e-12)
+    return a, b, r2
+
+
+def rolling_clothoid_fit(s: np.ndarray, k: np.ndarray, window_pts: int, offsets: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Régression k(s) ≈ a*s + b sur toutes les fenêtres glissantes, en O(n).
+
+    ``s``/``k`` : profils de plusieurs lignes concaténés ; ``offsets`` (L+1)
+    bornes de chaque ligne (défaut : une seule ligne). Fenêtre centrée de
+    ``2*(window_pts//2)+1`` points, jamais à cheval sur deux lignes.
+
+    Sommes cumulées (Σs, Σk, Σs², Σsk, Σk²) avec s relatif au début de chaque
+    ligne (limite la perte de précision). Retourne (indices centraux, a, b, R²)
+    pour toutes les fenêtres complètes, ``b`` exprimé dans l'abscisse d'origine.
+    """
+    s = np.asarray(s, dtype=float)
+    k = np.asarray(k, dtype=float)
+    n = len(s)
+    offsets = np.asarray([0, n] if offsets is None else offsets, dtype=np.int64)
+    h = max(int(window_pts), 3) // 2
+    w = 2 * h + 1
+    lengths = np.diff(offsets)
+    s0 = np.repeat(s[offsets[:-1]] if n else np.empty(0), lengths)
+    x = s - s0
+
+    # centres valides : h points disponibles de chaque côté dans la même ligne
+    starts = np.repeat(offsets[:-1], lengths)
+    ends = np.repeat(offsets[1:], lengths)
+    idx = np.arange(n)
+    centers = idx[(idx - h >= starts) & (idx + h < ends)]
+    if centers.size == 0:
+        empty = np.empty(0)
+        return centers, empty, empty, empty
+
+    def _window(v: np.ndarray) -> np.ndarray:
+        c = np.concatenate([[0.0], np.cumsum(v)])
+        return c[centers + h + 1] - c[centers - h]
+
+    a, b_loc, r2 = _linfit_from_sums(w, _window(x), _window(k), _window(x * x), _window(x * k), _window(k * k))
+    return centers, a, b_loc - a * s0[centers], r2
+
+
 def fit_local_clothoid(line_m: LineString, step_m: float = 8.0, window_m: float = 60.0) -> ClothoidFit:
     """
     Ajuste kappa(s) ~ k0 + k1*s sur une fenêtre locale le long de la ligne.
     Simplification robuste (moindres carrés avec intercept).
     Retourne paramètres et R².
     """
-    from rs3_study_curvature.geometry.curvature import compute_curvature_along_line, _arclength
-
-    xy = np.asarray(line_m.coords, dtype=float)
-    s_raw = _arclength(xy)
-    if s_raw[-1] < window_m:
-        s, kappa, _ = compute_curvature_along_line(line_m, step_m=step_m)
-        X = np.c_[np.ones_like(s), s]
-        coef, *_ = np.linalg.lstsq(X, kappa, rcond=None)
-        yhat = X @ coef
-        ss_res = float(np.sum((kappa - yhat) ** 2))
-        ss_tot = float(np.sum((kappa - kappa.mean()) ** 2) + 1e-12)
-        r2 = 1.0 - ss_res / ss_tot
-        return ClothoidFit(k0=float(coef[0]), k1=float(coef[1]), r2=r2, s_start=0.0, s_end=float(s[-1]))
-
-    # Prend la fenêtre au centre
-    s_mid = 0.5 * s_raw[-1]
-    s_a, s_b = s_mid - 0.5 * window_m, s_mid + 0.5 * window_m
+    from rs3_study_curvature.geometry.curvature import compute_curvature_along_line
+
+    # Profil calculé une seule fois ; fenêtre centrée si la ligne est assez longue
     s, kappa, _ = compute_curvature_along_line(line_m, step_m=step_m)
-    mask = (s >= max(0.0, s_a)) & (s <= min(s_b, s[-1]))
-    s_loc, k_loc = s[mask], kappa[mask]
-    X = np.c_[np.ones_like(s_loc), s_loc]
-    coef, *_ = np.linalg.lstsq(X, k_loc, rcond=None)
-    yhat = X @ coef
-    ss_res = float(np.sum((k_loc - yhat) ** 2))
-    ss_tot = float(np.sum((k_loc - k_loc.mean()) ** 2) + 1e-12)
-    r2 = 1.0 - ss_res / ss_tot
-    return ClothoidFit(k0=float(coef[0]), k1=float(coef[1]), r2=r2, s_start=float(s_loc[0]), s_end=float(s_loc[-1]))
+    length = float(line_m.length)
+    if length >= window_m:
+        s_mid = 0.5 * length
+        mask = (s >= max(0.0, s_mid - 0.5 * window_m)) & (s <= min(s_mid + 0.5 * window_m, s[-1]))
+        s, kappa = s[mask], kappa[mask]
+    x = s - s[0]
+    a, b, r2 = _linfit_from_sums(len(x), x.sum(), kappa.sum(), (x * x).sum(), (x * kappa).sum(), (kappa * kappa).sum())
+    return ClothoidFit(k0=float(b - a * s[0]), k1=float(a), r2=float(r2), s_start=float(s[0]), s_end=float(s[-1]))
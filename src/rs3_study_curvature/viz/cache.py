@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Cache adressé par contenu des figures et rapports.
+
+Deux niveaux, un seul manifeste JSON (``<cache>/manifest.json``) :
+
+- **exécution** : empreinte des entrées d'une commande (fichiers : taille +
+  mtime, ou contenu avec ``inputs: content`` ; clefs de config utiles ;
+  version du code). Si elle est identique à la précédente et que toutes les
+  sorties existent encore, la commande ne relit même pas les données ;
+- **figure** : empreinte d'un ``FigureJob`` (octets des séries, paramètres de
+  tracé hors chemins de sortie, version du code). Les PNG sont stockés sous
+  ``<cache>/objects/<clef>`` et recopiés vers le nouveau chemin de sortie :
+  seules les figures dont l'empreinte a changé sont redessinées.
+
+Configuration (facultative) ::
+
+    cache:
+      enabled: true
+      dir: out/.cache/figures     # défaut: <outputs.root>/.cache/figures
+      inputs: stat                # stat (taille+mtime) | content (hash)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+import numpy as np
+
+_CHUNK = 1 << 20
+
+
+def _digest() -> "hashlib._Hash":
+    return hashlib.blake2b(digest_size=20)
+
+
+def fingerprint(*parts: Any) -> str:
+    """Empreinte stable d'objets JSON-sérialisables (clefs triées)."""
+    h = _digest()
+    h.update(json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()
+
+
+def array_fingerprint(x: np.ndarray) -> str:
+    a = np.ascontiguousarray(x)
+    h = _digest()
+    h.update(f"{a.dtype.str}{a.shape}".encode())
+    h.update(memoryview(a).cast("B"))
+    return h.hexdigest()
+
+
+def file_fingerprint(path: str | os.PathLike, mode: str = "stat") -> Dict[str, Any]:
+    """``stat`` : taille + mtime (ns) ; ``content`` : hash du fichier. Absent → ``{"missing": path}``."""
+    p = Path(path)
+    if not p.exists():
+        return {"missing": str(p)}
+    if p.is_dir():
+        return {"dir": str(p), "files": [file_fingerprint(c, mode) for c in sorted(p.iterdir()) if c.is_file()]}
+    st = p.stat()
+    if mode == "content":
+        h = _digest()
+        with open(p, "rb") as f:
+            for chunk in iter(lambda: f.read(_CHUNK), b""):
+                h.update(chunk)
+        return {"path": str(p.resolve()), "hash": h.hexdigest()}
+    return {"path": str(p.resolve()), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def code_version(*modules: str) -> str:
+    """Version du paquet + matplotlib + contenu des modules donnés (import paresseux)."""
+    import importlib
+
+    import matplotlib
+
+    from rs3_study_curvature import __version__
+
+    h = _digest()
+    h.update(f"{__version__}|{matplotlib.__version__}".encode())
+    for name in modules:
+        mod = sys.modules.get(name) or importlib.import_module(name)
+        src = getattr(mod, "__file__", None)
+        if src and os.path.exists(src):
+            h.update(Path(src).read_bytes())
+    return h.hexdigest()
+
+
+class FigureCache:
+    """Magasin d'objets + manifeste (sorties → clef, exécutions → clef + sorties)."""
+
+    def __init__(self, root: str | os.PathLike, inputs: str = "stat"):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.inputs = inputs
+        self._manifest_path = self.root / "manifest.json"
+        try:
+            self.manifest: Dict[str, Dict[str, Any]] = json.loads(self._manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.manifest = {}
+        self.manifest.setdefault("outputs", {})
+        self.manifest.setdefault("runs", {})
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, cfg: Mapping[str, Any], enabled: bool = True) -> Optional["FigureCache"]:
+        """None si désactivé (``cache.enabled: false`` ou ``enabled=False``)."""
+        c = cfg.get("cache", {}) or {}
+        if not enabled or not c.get("enabled", True):
+            return None
+        out_root = (cfg.get("outputs", {}) or {}).get("root") or "out"
+        return cls(c.get("dir") or os.path.join(out_root, ".cache", "figures"), inputs=c.get("inputs", "stat"))
+
+    def files(self, paths: Iterable[str | os.PathLike]) -> List[Dict[str, Any]]:
+        return [file_fingerprint(p, self.inputs) for p in paths]
+
+    # --- exécutions -------------------------------------------------------
+    def run_outputs(self, name: str, key: str) -> Optional[List[str]]:
+        """Sorties de la dernière exécution ``name`` si la clef est identique et qu'elles existent toutes."""
+        run = self.manifest["runs"].get(name)
+        if not run or run.get("key") != key:
+            return None
+        outputs = run.get("outputs", [])
+        return outputs if all(os.path.exists(p) for p in outputs) else None
+
+    def record_run(self, name: str, key: str, outputs: Iterable[str]) -> None:
+        self.manifest["runs"][name] = {"key": key, "outputs": [str(p) for p in outputs]}
+
+    # --- figures ----------------------------------------------------------
+    def _object(self, key: str, slot: str, out: str) -> Path:
+        return self.objects / key[:2] / f"{key}__{slot}{Path(out).suffix}"
+
+    def fetch(self, key: str, outputs: Mapping[str, str]) -> bool:
+        """Matérialise toutes les sorties (slot → chemin) depuis le cache ; False si l'une manque."""
+        for slot, out in outputs.items():
+            if self.manifest["outputs"].get(os.path.abspath(out)) == key and os.path.exists(out):
+                continue
+            if not self._object(key, slot, out).exists():
+                self.misses += 1
+                return False
+        for slot, out in outputs.items():
+            if not (self.manifest["outputs"].get(os.path.abspath(out)) == key and os.path.exists(out)):
+                os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+                shutil.copyfile(self._object(key, slot, out), out)
+                self.manifest["outputs"][os.path.abspath(out)] = key
+        self.hits += 1
+        return True
+
+    def store(self, key: str, outputs: Mapping[str, str]) -> None:
+        for slot, out in outputs.items():
+            if not os.path.exists(out):
+                continue
+            obj = self._object(key, slot, out)
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            tmp = obj.with_suffix(obj.suffix + ".tmp")
+            shutil.copyfile(out, tmp)
+            os.replace(tmp, obj)
+            self.manifest["outputs"][os.path.abspath(out)] = key
+
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        # Les sorties supprimées depuis sortent du manifeste
+        self.manifest["outputs"] = {p: k for p, k in self.manifest["outputs"].items() if os.path.exists(p)}
+        tmp = self._manifest_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self._manifest_path)
+
+
+def write_text_if_changed(path: str | os.PathLike, text: str) -> bool:
+    """Écrit seulement si le contenu diffère (mtime stable pour mkdocs) ; True si écrit."""
+    p = Path(path)
+    try:
+        if p.read_text(encoding="utf-8") == text:
+            return False
+    except OSError:
+        pass
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text(text, encoding="utf-8")
+    return True
@@ -3,22 +3,38 @@ import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 from .helpers import theme
+from .utils import kde_fft
 
 
-def plot_distributions(out_png: str, df: pd.DataFrame, r_col: str = "radius_min", k_col: str = "kappa_max", title: str = "RS3 — Distributions"):
+def _kde_counts(ax, values: np.ndarray, bins: int) -> None:
+    # KDE (FFT) mise à l'échelle des comptes de l'histogramme
+    if len(values) < 2:
+        return
+    grid = np.linspace(values.min(), values.max(), 400)
+    width = (values.max() - values.min()) / bins
+    ax.plot(grid, kde_fft(values, grid) * len(values) * width, linewidth=1.5)
+
+
+def plot_distributions(out_png: str, df: pd.DataFrame, r_col: str = "radius_min", k_col: str = "kappa_max", title: str = "RS3 — Distributions", kde: bool = False):
     theme()
     fig, axes = plt.subplots(1, 2, figsize=(10, 4))
 
     # Rayon
     r = df[r_col].replace([np.inf, -np.inf], np.nan).dropna()
-    axes[0].hist(np.clip(r, 0, np.percentile(r, 99)), bins=40)
+    r_clip = np.clip(r, 0, np.percentile(r, 99))
+    axes[0].hist(r_clip, bins=40)
+    if kde:
+        _kde_counts(axes[0], np.asarray(r_clip, dtype=float), 40)
     axes[0].set_title("Distribution du rayon (m)")
     axes[0].set_xlabel("R (m)")
     axes[0].set_ylabel("Count")
 
     # Kappa
     k = df[k_col].replace([np.inf, -np.inf], np.nan).dropna()
-    axes[1].hist(np.clip(k, 0, np.percentile(k, 99)), bins=40)
+    k_clip = np.clip(k, 0, np.percentile(k, 99))
+    axes[1].hist(k_clip, bins=40)
+    if kde:
+        _kde_counts(axes[1], np.asarray(k_clip, dtype=float), 40)
     axes[1].set_title("Distribution de la courbure κ (1/m)")
     axes[1].set_xlabel("κ")
     axes[1].set_ylabel("Count")
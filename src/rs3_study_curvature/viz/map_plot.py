@@ -1,21 +1,160 @@
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 import matplotlib.pyplot as plt
 import geopandas as gpd
+import numpy as np
+import shapely
 from .helpers import theme
+from .raster import VALUE_RANGES, draw_density, lonlat_to_mercator, rasterize_lines, segment_metrics
+from matplotlib.collections import LineCollection
+from matplotlib.colors import LogNorm
 from matplotlib.lines import Line2D
 from matplotlib.patches import Patch
 
 
-def _try_contextily(ax, gdf):
+def _basemap_crs():
+    """3857 si un fond de carte contextily est disponible, sinon None (CRS d'origine)."""
+    try:
+        import contextily as cx
+
+        cx.providers.Stamen.TonerLite
+        return 3857
+    except Exception:
+        return None
+
+
+def _add_basemap(ax) -> bool:
+    """Ajoute le fond de carte ; False si contextily échoue (tuiles injoignables…)."""
     try:
         import contextily as cx
 
-        gdf3857 = gdf.to_crs(3857)
         cx.add_basemap(ax, source=cx.providers.Stamen.TonerLite)
-        return gdf3857
+        return True
     except Exception:
+        return False
+
+
+def _project_layers(layers: List[Optional[gpd.GeoDataFrame]], target) -> List[Optional[gpd.GeoSeries]]:
+    """Géométries de toutes les couches dans ``target`` : une reprojection par CRS source
+    (couches concaténées), au lieu d'un ``to_crs`` par couche."""
+    out: List[Optional[gpd.GeoSeries]] = [None] * len(layers)
+    groups: dict = {}
+    for i, g in enumerate(layers):
+        if g is not None and len(g):
+            groups.setdefault(g.crs, []).append(i)
+    for crs, idx in groups.items():
+        arrays = [np.asarray(layers[i].geometry.values, dtype=object) for i in idx]
+        merged = gpd.GeoSeries(np.concatenate(arrays), crs=crs)
+        if target is not None and crs is not None:
+            merged = merged.to_crs(target)
+        bounds = np.cumsum([0] + [len(a) for a in arrays])
+        for i, a, b in zip(idx, bounds[:-1], bounds[1:]):
+            out[i] = gpd.GeoSeries(merged.values[a:b], crs=merged.crs)
+    return out
+
+
+def _line_coords(geoms: gpd.GeoSeries):
+    """Coordonnées aplaties des parties linéaires (contours pour les polygones) et indice de partie."""
+    arr = shapely.get_parts(np.asarray(geoms.values, dtype=object))
+    poly = np.isin(shapely.get_type_id(arr), (3, 6))
+    if poly.any():
+        arr = np.concatenate([arr[~poly], shapely.get_parts(shapely.boundary(arr[poly]))])
+    arr = arr[np.isin(shapely.get_type_id(arr), (1, 2))]
+    return shapely.get_coordinates(arr, return_index=True)
+
+
+# Classes de couleur (log κ) du réseau coloré par courbure
+_CURVATURE_BINS = 64
+
+
+def _line_collection(geoms: gpd.GeoSeries, color=None, linewidth: float = 1.0, cmap: Optional[str] = None, zorder: float = 2):
+    """Une ``LineCollection`` pour toute la couche.
+
+    Les parties sont séparées par des NaN (coupure de tracé) : un seul chemin
+    pour une couleur unique. Avec ``cmap``, chaque segment est coloré par sa
+    courbure (1/m, échelle log ``VALUE_RANGES``, calculée sur les coordonnées
+    déjà projetées) et regroupé par classe de couleur : un chemin par classe.
+    """
+    xy, part = _line_coords(geoms)
+    if not len(xy):
         return None
+    if cmap is None:
+        cuts = np.flatnonzero(np.diff(part)) + 1
+        return LineCollection([np.insert(xy, cuts, np.nan, axis=0)], colors=color, linewidths=linewidth, zorder=zorder)
+    crs = geoms.crs
+    if crs is not None and crs.is_geographic:
+        s, _, kappa = segment_metrics(*lonlat_to_mercator(xy[:, 0], xy[:, 1]), part)
+    else:  # 3857 (fond de carte) ou CRS métrique d'origine
+        s, _, kappa = segment_metrics(xy[:, 0], xy[:, 1], part, mercator=crs is not None and crs.to_epsg() == 3857)
+    lo, hi = VALUE_RANGES["curvature"]
+    edges = np.geomspace(lo, hi, _CURVATURE_BINS + 1)
+    cls = np.clip(np.searchsorted(edges, np.nan_to_num(kappa, nan=lo), side="right") - 1, 0, _CURVATURE_BINS - 1)
+    order = np.argsort(cls, kind="stable")
+    seg = np.full((len(s), 3, 2), np.nan)
+    seg[:, 0], seg[:, 1] = xy[s], xy[s + 1]
+    counts = np.bincount(cls, minlength=_CURVATURE_BINS)
+    used = np.flatnonzero(counts)
+    paths = [p.reshape(-1, 2) for p in np.split(seg[order], np.cumsum(counts)[:-1]) if len(p)]
+    lc = LineCollection(paths, linewidths=linewidth, cmap=cmap, norm=LogNorm(vmin=lo, vmax=hi), zorder=zorder)
+    lc.set_array(np.sqrt(edges[used] * edges[used + 1]))  # centre géométrique de la classe
+    return lc
+
+
+def _style_axes(ax, geoms: gpd.GeoSeries):
+    # mêmes règles que GeoDataFrame.plot : aspect 1/cos(lat) en géographique
+    # (sinon repère orthonormé) et libellés d'axes tirés du CRS
+    crs = geoms.crs
+    if crs is not None and crs.is_geographic:
+        b = geoms.total_bounds
+        ax.set_aspect(1 / np.cos(np.mean([b[1], b[3]]) * np.pi / 180))
+    else:
+        ax.set_aspect("equal")
+    if crs is not None:
+        x_label = f"{crs.axis_info[0].name} [{crs.axis_info[0].unit_name}]"
+        y_label = f"{crs.axis_info[1].name} [{crs.axis_info[1].unit_name}]"
+        if crs.axis_info[0].direction == "north":
+            x_label, y_label = y_label, x_label
+        ax.set_xlabel(x_label, fontsize="small")
+        ax.set_ylabel(y_label, fontsize="small")
+
+
+def _draw_layers(fig, layers, edge_color, cand_color, clothoid_color, buffer_alpha, raster_above, edge_cmap):
+    """Trace les couches déjà projetées sur un nouvel axe de ``fig``."""
+    g_edges, g_cand, g_buf, g_fits, g_samples = layers
+    ax = fig.add_subplot()
+
+    # Base network in light gray for context
+    if raster_above is not None and len(g_edges) > raster_above:
+        ras = rasterize_lines(g_edges, tuple(g_edges.total_bounds), plot_crs=g_edges.crs or 4326)
+        draw_density(ax, ras, value="length", cmap="Greys", zorder=1)
+    else:
+        lc = _line_collection(g_edges, color=edge_color, linewidth=1.6, cmap=edge_cmap)
+        if lc is not None:
+            ax.add_collection(lc)
+            if edge_cmap is not None:
+                fig.colorbar(lc, ax=ax, shrink=0.6, pad=0.02, label="Courbure κ (1/m)")
+
+    # Optional: highlight candidate segments passing the R filter
+    if g_cand is not None:
+        lc = _line_collection(g_cand, color=cand_color, linewidth=2.2)
+        if lc is not None:
+            ax.add_collection(lc)
+
+    if g_buf is not None:
+        g_buf.plot(ax=ax, color=cand_color, alpha=buffer_alpha, aspect=None)
+
+    if g_fits is not None:
+        lc = _line_collection(g_fits, color=clothoid_color, linewidth=3)
+        if lc is not None:
+            ax.add_collection(lc)
+
+    if g_samples is not None:
+        pts = shapely.get_coordinates(np.asarray(g_samples.values, dtype=object))
+        ax.scatter(pts[:, 0], pts[:, 1], s=8, color="#ff7f0e")
+
+    ax.autoscale_view()
+    _style_axes(ax, g_edges)
+    return ax
 
 
 def plot_map(
@@ -31,7 +170,16 @@ def plot_map(
     cand_color: str = "#1f77b4",
     clothoid_color: str = "#d62728",
     buffer_alpha: float = 0.1,
+    raster_above: Optional[int] = 50_000,
+    edge_cmap: Optional[str] = None,
 ):
+    """Carte réseau + surcouches.
+
+    Chaque couche linéaire est tracée en une seule ``LineCollection`` à partir
+    des coordonnées aplaties, après une reprojection commune. ``edge_cmap``
+    colore le réseau segment par segment selon la courbure. Au-delà de
+    ``raster_above`` tronçons, le réseau de fond est rastérisé (densité de
+    longueur, ``viz.raster``) : tout le réseau reste visible, en temps borné."""
     theme()
     # If no edges, render a minimal map (optional buffer + title) and exit gracefully
     if edges is None or len(edges) == 0:
@@ -54,33 +202,18 @@ def plot_map(
         print(f"✅ Carte enregistrée (vide): {out_png}")
         return
 
-    fig, ax = plt.subplots(figsize=(8, 8))
-
-    gdf = edges
-    used_3857 = False
-    gdf3857 = _try_contextily(ax, gdf)
-    if gdf3857 is not None:
-        used_3857 = True
-        gdf_to_plot = gdf3857
-    else:
-        gdf_to_plot = gdf
-
-    # Base network in light gray for context
-    gdf_to_plot.plot(ax=ax, linewidth=1.6, color=edge_color)
-
-    # Optional: highlight candidate segments passing the R filter
-    if candidates is not None and len(candidates):
-        cand_to_plot = candidates.to_crs(3857) if used_3857 else candidates
-        cand_to_plot.plot(ax=ax, linewidth=2.2, color=cand_color)
-
-    if buffer is not None and len(buffer):
-        (buffer.to_crs(3857) if used_3857 else buffer).plot(ax=ax, color=cand_color, alpha=buffer_alpha)
-
-    if clothoid_fits is not None and len(clothoid_fits):
-        (clothoid_fits.to_crs(3857) if used_3857 else clothoid_fits).plot(ax=ax, color=clothoid_color, linewidth=3)
-
-    if samples is not None and len(samples):
-        (samples.to_crs(3857) if used_3857 else samples).plot(ax=ax, color="#ff7f0e", markersize=8)
+    fig = plt.figure(figsize=(8, 8))
+    layers = [edges, candidates, buffer, clothoid_fits, samples]
+    style = (edge_color, cand_color, clothoid_color, buffer_alpha, raster_above, edge_cmap)
+
+    # Une seule reprojection pour toutes les couches (3857 si fond de carte)
+    target = _basemap_crs()
+    ax = _draw_layers(fig, _project_layers(layers, target), *style)
+    if target is not None and not _add_basemap(ax):
+        # fond de carte indisponible : retour au CRS d'origine plutôt qu'une
+        # carte en mètres Web Mercator sans fond
+        fig.clf()
+        ax = _draw_layers(fig, _project_layers(layers, None), *style)
 
     # Manual legend (avoid PatchCollection warning by creating custom handles)
     legend_handles = [Line2D([0], [0], color=edge_color, lw=2, label="Réseau (toutes rues)")]
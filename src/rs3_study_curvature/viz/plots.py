@@ -9,7 +9,8 @@ import pandas as pd
 import numpy as np
 
 from rs3_study_curvature.io import load_pair, ensure_numeric_columns
-from rs3_study_curvature.viz.utils import plot_hist_kde, plot_box_violin
+from rs3_study_curvature.viz.cache import FigureCache, code_version, fingerprint
+from rs3_study_curvature.viz.render import FigureJob, render_jobs
 
 
 def dist_plots(config):  # type: ignore[unused-ignore]
@@ -101,6 +102,8 @@ def resolve_metric_series(df: pd.DataFrame, metric: str) -> pd.Series | None:
 def main():
     parser = argparse.ArgumentParser(description="OSM vs BD TOPO — Distributions globales")
     parser.add_argument("--config", required=True, help="YAML de configuration")
+    parser.add_argument("--workers", type=int, default=None, help="processus de rendu (défaut: tous les cœurs, 1 = séquentiel)")
+    parser.add_argument("--no-cache", action="store_true", help="tout redessiner (ignore le cache des figures)")
     args = parser.parse_args()
 
     # Charge la configuration
@@ -129,6 +132,20 @@ def main():
     if not metrics:
         raise SystemExit("⚠️  'metrics' est vide. Utilisez une liste de noms ou de {name,label}.")
 
+    # Entrées, config de tracé et code inchangés → sorties précédentes réutilisées
+    cache = FigureCache.from_config(cfg, enabled=not args.no_cache)
+    run_name = f"plots.distributions:{os.path.abspath(out_plots)}"
+    if cache is not None:
+        run_key = fingerprint(
+            cache.files([osm_path, bd_path]),
+            {k: cfg.get(k) for k in ("metrics", "hist", "kde", "fig")},
+            code_version(__name__, "rs3_study_curvature.viz.utils", "rs3_study_curvature.viz.render"),
+        )
+        previous = cache.run_outputs(run_name, run_key)
+        if previous:
+            print(f"✅ Distributions à jour (entrées inchangées) → {os.path.dirname(previous[0])}")
+            return
+
     try:
         osm, bd = load_pair(osm_path, bd_path)
     except Exception as e:
@@ -145,6 +162,7 @@ def main():
     out_dir_ts = os.path.join(out_plots, f"global_{ts}")
     _ensure_dir(out_dir_ts)
 
+    jobs: list[FigureJob] = []
     for m in metric_names:
         # Résout la série métrique (gère le couplage radius_m ↔ curvature)
         s_osm = resolve_metric_series(osm, m)
@@ -154,44 +172,31 @@ def main():
             print(f"[SKIP] Colonne manquante pour '{m}' côté {missing_side}. " "(Astuce: 'radius_m' est dérivé de 'curvature' et inversement si l'un des deux existe.)")
             continue
 
-        # DataFrames minimaux pour les fonctions de tracé
-        tmp_osm = pd.DataFrame({m: s_osm})
-        tmp_bd = pd.DataFrame({m: s_bd})
+        a = pd.to_numeric(s_osm, errors="coerce").to_numpy(dtype=float)
+        b = pd.to_numeric(s_bd, errors="coerce").to_numpy(dtype=float)
+        fig_kw = dict(width=width, height=height, dpi=dpi, xlabel=labels[m])
 
         # Histogrammes + KDE
-        out_hist = os.path.join(out_dir_ts, f"{m}__hist_kde.png")
-        plot_hist_kde(
-            tmp_osm,
-            tmp_bd,
-            m,
-            "OSM",
-            "BD TOPO",
-            bins=bins,
-            kde=kde,
-            width=width,
-            height=height,
-            dpi=dpi,
-            out_path=out_hist,
-            xlabel=labels[m],
-        )
+        jobs.append(FigureJob("hist_kde", m, a, b, kwargs=dict(bins=bins, kde=kde, out_path=os.path.join(out_dir_ts, f"{m}__hist_kde.png"), **fig_kw)))
 
         # Boxplot + Violin
-        out_box = os.path.join(out_dir_ts, f"{m}__box.png")
-        out_vio = os.path.join(out_dir_ts, f"{m}__violin.png")
-        plot_box_violin(
-            tmp_osm,
-            tmp_bd,
-            m,
-            "OSM",
-            "BD TOPO",
-            width=width,
-            height=height,
-            dpi=dpi,
-            out_path_box=out_box,
-            out_path_violin=out_vio,
-            xlabel=labels[m],
+        jobs.append(
+            FigureJob(
+                "box_violin",
+                m,
+                a,
+                b,
+                kwargs=dict(out_path_box=os.path.join(out_dir_ts, f"{m}__box.png"), out_path_violin=os.path.join(out_dir_ts, f"{m}__violin.png"), **fig_kw),
+            )
         )
 
+    # Rendu parallèle (Agg, séries en mémoire partagée, ordre déterministe)
+    written = render_jobs(jobs, max_workers=args.workers, cache=cache)
+    if cache is not None:
+        cache.record_run(run_name, run_key, written)
+        cache.save()
+        print(f"[cache] {cache.hits} figure(s) réutilisée(s), {cache.misses} redessinée(s)")
+
     print(f"✅ Distributions exportées → {out_dir_ts}")
 
 
@@ -10,6 +10,10 @@ import re
 import unicodedata
 from typing import Dict, Tuple
 
+from rs3_study_curvature.data.classes import ClassHarmonizer
+from rs3_study_curvature.viz.cache import FigureCache, code_version, fingerprint
+from rs3_study_curvature.viz.render import FigureJob, render_jobs
+
 # -----------------------------
 # I/O fallbacks (robust loaders)
 # -----------------------------
@@ -70,7 +74,7 @@ except Exception:
             label_bd: str,
             *,
             bins: int | str = "fd",
-            kde: bool = True,  # kept for API compat, ignored here
+            kde: bool = True,
             width: float = 9.0,
             height: float = 6.0,
             dpi: int = 140,
@@ -83,6 +87,14 @@ except Exception:
             ax = fig.gca()
             ax.hist(s1, bins=bins, alpha=0.5, density=True, label=label_osm)
             ax.hist(s2, bins=bins, alpha=0.5, density=True, label=label_bd)
+            if kde and len(s1) + len(s2):
+                from rs3_study_curvature.viz.utils import kde_fft
+
+                both = pd.concat([s1, s2])
+                grid = np.linspace(both.min(), both.max(), 400)
+                for s_, lbl in ((s1, label_osm), (s2, label_bd)):
+                    if len(s_) > 1:
+                        ax.plot(grid, kde_fft(s_.to_numpy(), grid), linewidth=1.5, label=f"KDE {lbl}")
             ax.set_xlabel(xlabel or col)
             ax.set_ylabel("Density")
             ax.legend()
@@ -110,7 +122,8 @@ except Exception:
 
             fig_box = plt.figure(figsize=(width, height), dpi=dpi)
             axb = fig_box.gca()
-            axb.boxplot([s1, s2], labels=[label_osm, label_bd], showfliers=False)
+            axb.boxplot([s1, s2], showfliers=False)
+            axb.set_xticks([1, 2], [label_osm, label_bd])
             axb.set_xlabel(xlabel or col)
             axb.set_ylabel(col)
             fig_box.tight_layout()
@@ -130,6 +143,10 @@ except Exception:
                 plt.close(fig_v)
 
 
+# Module whose plot_hist_kde/plot_box_violin the render workers import
+_PLOTTER = "rs3_study_curvature.viz.plots_by_class"
+
+
 # -----------------------
 # Utils: files & labels
 # -----------------------
@@ -146,22 +163,6 @@ def _slugify(value: str) -> str:
     return value or "NA"
 
 
-def _normalize_label(v: str) -> str:
-    s = str(v)
-    s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
-    s = s.lower()
-    s = s.replace("/", "_").replace("-", "_").replace(" ", "_")
-    s = re.sub(r"_+", "_", s).strip("_")
-    return s
-
-
-def _map_classes(series: pd.Series, mapping: Dict[str, str] | None) -> pd.Series:
-    if not mapping:
-        return series
-    # mapping keys are expected in normalized form
-    return series.map(lambda x: mapping.get(x, x))
-
-
 # -----------------------
 # Metrics resolution
 # -----------------------
@@ -208,6 +209,8 @@ def main() -> None:
     ap = argparse.ArgumentParser(description="OSM vs BD TOPO — Distributions par classe")
     ap.add_argument("--config", required=True)
     ap.add_argument("--class-col", default=None, help="nom de la colonne classe à utiliser (override)")
+    ap.add_argument("--workers", type=int, default=None, help="processus de rendu (défaut: tous les cœurs, 1 = séquentiel)")
+    ap.add_argument("--no-cache", action="store_true", help="tout redessiner (ignore le cache des figures)")
     args = ap.parse_args()
 
     cfg = yaml.safe_load(open(args.config, "r", encoding="utf-8"))
@@ -229,6 +232,24 @@ def main() -> None:
     width = float(cfg.get("fig", {}).get("width", 9.0))
     height = float(cfg.get("fig", {}).get("height", 6.0))
 
+    # --- cache: entrées, mapping, config de tracé et code inchangés → rien à refaire ---
+    outputs = cfg.get("outputs", {}) or {}
+    out_root = outputs.get("plots_dir") or outputs.get("root") or "out/plots"
+    cache = FigureCache.from_config(cfg, enabled=not args.no_cache)
+    run_name = f"plots.by_class:{os.path.abspath(out_root)}"
+    if cache is not None:
+        mapping_files = [cfg.get("class_mapping_file") or "configs/class_map.yml", cfg.get("class_groups_file") or "configs/class_groups.yml"]
+        run_key = fingerprint(
+            cache.files([cfg["inputs"]["osm"], cfg["inputs"]["bdtopo"], *mapping_files]),
+            {k: cfg.get(k) for k in ("metrics", "hist", "kde", "fig", "class_column", "class_column_candidates", "class_mapping")},
+            args.class_col,
+            code_version(__name__, "rs3_study_curvature.data.classes", "rs3_study_curvature.viz.render"),
+        )
+        previous = cache.run_outputs(run_name, run_key)
+        if previous:
+            print(f"✅ Distributions par classe à jour (entrées inchangées) → {os.path.dirname(os.path.dirname(previous[0]))}")
+            return
+
     # --- load data ---
     osm, bd = load_pair(cfg["inputs"]["osm"], cfg["inputs"]["bdtopo"])
 
@@ -257,70 +278,27 @@ def main() -> None:
     bd = ensure_numeric_columns(bd, metric_names)
 
     # --- normalization & optional mapping ---
-    # 1) Normalize raw labels
-    osm_norm = pd.Series(osm[class_col].astype(str).map(_normalize_label), index=osm.index)
-    bd_norm = pd.Series(bd[class_col].astype(str).map(_normalize_label), index=bd.index)
-
-    # 2) Load mapping from config *file* if provided, else fallback to default path
-    #    The mapping file is a flat dict: normalized_french_label -> osm_highway
-    #    (e.g. "route a 1 chaussee" -> "primary", "route empierree" -> "track", ...)
-    file_map: Dict[str, str] = {}
-    mapping_path = None
-    # Priority: explicit key, then default location
-    if isinstance(cfg.get("class_mapping_file"), str):
-        mapping_path = cfg.get("class_mapping_file")
-    elif isinstance(cfg.get("class_mapping"), str):
-        # allow legacy key pointing to a file path
-        mapping_path = cfg.get("class_mapping")
-    if mapping_path is None and os.path.exists("configs/class_map.yml"):
-        mapping_path = "configs/class_map.yml"
-
-    if mapping_path and os.path.exists(mapping_path):
-        try:
-            with open(mapping_path, "r", encoding="utf-8") as fm:
-                raw_map = yaml.safe_load(fm) or {}
-            # normalize keys & values
-            file_map = {_normalize_label(k): _normalize_label(v) for k, v in raw_map.items()}
-        except Exception as e:
-            print(f"[by-class] Impossible de lire le mapping '{mapping_path}': {e}")
-
-    # 3) Also accept inline dicts in config under class_mapping.osm / class_mapping.bdtopo
-    inline_map_osm: Dict[str, str] | None = None
-    inline_map_bd: Dict[str, str] | None = None
-    if isinstance(cfg.get("class_mapping"), dict):
-        cm = cfg.get("class_mapping")
-        if isinstance(cm.get("osm"), dict):
-            inline_map_osm = {_normalize_label(k): _normalize_label(v) for k, v in cm["osm"].items()}
-        if isinstance(cm.get("bdtopo"), dict):
-            inline_map_bd = {_normalize_label(k): _normalize_label(v) for k, v in cm["bdtopo"].items()}
-
-    # 4) Build final maps. The file map applies to both sides (handles *_link, FR labels, etc.).
-    #    Inline maps, if provided, override the file map for their respective source.
-    map_osm: Dict[str, str] = dict(file_map)
-    map_bd: Dict[str, str] = dict(file_map)
-    if inline_map_osm:
-        map_osm.update(inline_map_osm)
-    if inline_map_bd:
-        map_bd.update(inline_map_bd)
-
-    # Apply mapping (keys not present stay normalized)
-    osm_norm = _map_classes(osm_norm, map_osm)
-    bd_norm = _map_classes(bd_norm, map_bd)
-
-    classes = sorted(list(set(pd.Series(osm_norm).dropna().unique()).intersection(set(pd.Series(bd_norm).dropna().unique()))))
+    # Moteur commun (rs3_study_curvature.data.classes) : mapping fichier
+    # (class_mapping_file, défaut configs/class_map.yml) pour les deux sources,
+    # surchargé par class_mapping.osm / class_mapping.bdtopo ; libellés snake_case.
+    # Seules les valeurs distinctes sont normalisées ; résultats catégoriels.
+    hc_osm = ClassHarmonizer.from_config(cfg, "osm", sep="_").harmonize(osm[class_col])
+    hc_bd = ClassHarmonizer.from_config(cfg, "bdtopo", sep="_").harmonize(bd[class_col])
+    osm_norm, bd_norm = hc_osm.mapped, hc_bd.mapped
+
+    classes = sorted(set(osm_norm.cat.categories).intersection(bd_norm.cat.categories))
     print(f"[by-class] Classes communes après mapping: {classes[:20]} (n={len(classes)})")
 
     # --- preview CSV (to help mapping) ---
     overview = []
-    for val, cnt in pd.Series(osm_norm).value_counts().items():
-        overview.append({"class_norm": str(val), "source": "OSM", "count": int(cnt)})
-    for val, cnt in pd.Series(bd_norm).value_counts().items():
-        overview.append({"class_norm": str(val), "source": "BDTOPO", "count": int(cnt)})
-    overview_df = pd.DataFrame(overview)
+    for label, hc in (("OSM", hc_osm), ("BDTOPO", hc_bd)):
+        counts = pd.DataFrame({"class_norm": hc.mapped, "class_group": hc.group}).value_counts(dropna=False)
+        for (val, grp), cnt in counts.items():
+            if cnt and not pd.isna(val):
+                overview.append({"class_norm": str(val), "class_group": None if pd.isna(grp) else str(grp), "source": label, "count": int(cnt)})
+    overview_df = pd.DataFrame(overview).sort_values(["source", "count"], ascending=[True, False], kind="stable") if overview else pd.DataFrame(overview)
 
     ts_preview = time.strftime("%Y%m%d_%H%M%S")
-    outputs = cfg.get("outputs", {}) or {}
-    out_root = outputs.get("plots_dir") or outputs.get("root") or "out/plots"
     os.makedirs(out_root, exist_ok=True)
     preview_csv = os.path.join(out_root, f"by_class_preview_{ts_preview}.csv")
     try:
@@ -341,57 +319,54 @@ def main() -> None:
     _ensure_dir(out_dir_root)
 
     # --- per-class exports ---
+    # Partition once by category codes instead of one equality mask per class
+    osm_rows = pd.Series(np.arange(len(osm)), index=osm_norm.index).groupby(osm_norm, observed=True).indices
+    bd_rows = pd.Series(np.arange(len(bd)), index=bd_norm.index).groupby(bd_norm, observed=True).indices
+    # Each metric resolved once on the full tables, then sliced per class
+    values_osm: Dict[str, np.ndarray] = {}
+    values_bd: Dict[str, np.ndarray] = {}
+    for m in metric_names:
+        s_osm, s_bd = resolve_metric_series(osm, m), resolve_metric_series(bd, m)
+        if s_osm is not None:
+            values_osm[m] = pd.to_numeric(s_osm, errors="coerce").to_numpy(dtype=float)
+        if s_bd is not None:
+            values_bd[m] = pd.to_numeric(s_bd, errors="coerce").to_numpy(dtype=float)
+    jobs: list[FigureJob] = []
     for c in classes:
         slug = _slugify(str(c))
         out_dir = os.path.join(out_dir_root, slug)
         _ensure_dir(out_dir)
         print(f"[by-class] Classe '{c}' → dossier '{slug}'")
 
-        # filter using normalized series equality
-        mask_osm = osm_norm == c
-        mask_bd = bd_norm == c
+        # rows of the class from the precomputed categorical partition
+        rows_osm = osm_rows[c]
+        rows_bd = bd_rows[c]
 
         for m in metric_names:
-            s_osm = resolve_metric_series(osm.loc[mask_osm], m)
-            s_bd = resolve_metric_series(bd.loc[mask_bd], m)
-            if s_osm is None or s_bd is None:
+            if m not in values_osm or m not in values_bd:
                 print(f"[SKIP {c}] '{m}' absent (ou non dérivable) d’un côté.")
                 continue
-
-            tmp_osm = pd.DataFrame({m: pd.to_numeric(s_osm, errors="coerce")})
-            tmp_bd = pd.DataFrame({m: pd.to_numeric(s_bd, errors="coerce")})
-
-            out_hist = os.path.join(out_dir, f"{m}__hist_kde.png")
-            plot_hist_kde(
-                tmp_osm,
-                tmp_bd,
-                m,
-                "OSM",
-                "BD TOPO",
-                bins=bins,
-                kde=kde,
-                width=width,
-                height=height,
-                dpi=dpi,
-                out_path=out_hist,
-                xlabel=labels[m],
+            a, b = values_osm[m][rows_osm], values_bd[m][rows_bd]
+            fig_kw = dict(width=width, height=height, dpi=dpi, xlabel=labels[m])
+            jobs.append(FigureJob("hist_kde", m, a, b, kwargs=dict(bins=bins, kde=kde, out_path=os.path.join(out_dir, f"{m}__hist_kde.png"), **fig_kw), plotter=_PLOTTER))
+            jobs.append(
+                FigureJob(
+                    "box_violin",
+                    m,
+                    a,
+                    b,
+                    kwargs=dict(out_path_box=os.path.join(out_dir, f"{m}__box.png"), out_path_violin=os.path.join(out_dir, f"{m}__violin.png"), **fig_kw),
+                    plotter=_PLOTTER,
+                )
             )
 
-            out_box = os.path.join(out_dir, f"{m}__box.png")
-            out_vio = os.path.join(out_dir, f"{m}__violin.png")
-            plot_box_violin(
-                tmp_osm,
-                tmp_bd,
-                m,
-                "OSM",
-                "BD TOPO",
-                width=width,
-                height=height,
-                dpi=dpi,
-                out_path_box=out_box,
-                out_path_violin=out_vio,
-                xlabel=labels[m],
-            )
+    # Rendu parallèle (Agg, séries en mémoire partagée, ordre déterministe)
+    written = render_jobs(jobs, max_workers=args.workers, cache=cache)
+    print(f"[by-class] {len(written)} figure(s) rendue(s)")
+    if cache is not None:
+        cache.record_run(run_name, run_key, written)
+        cache.save()
+        print(f"[cache] {cache.hits} figure(s) réutilisée(s), {cache.misses} redessinée(s)")
 
     print(f"✅ Distributions par classe exportées → {out_dir_root}")
 
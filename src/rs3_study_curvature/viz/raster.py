@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""Rastérisation NumPy de réseaux linéaires (cartes régionales sans échantillonnage).
+
+Au lieu de tracer chaque géométrie (ou un sous-échantillon aléatoire), les
+lignes sont aplaties en segments ``(x0, y0) → (x1, y1)`` puis accumulées sur
+une grille de pixels :
+
+- ``length`` : longueur cumulée (m) par pixel ;
+- ``kappa_max`` : courbure maximale (1/m) par pixel, d'où ``radius_min``.
+
+Le tracé est un DDA vectorisé (mêmes pixels que Bresenham : un échantillon
+par pas de pixel sur l'axe dominant), chaque échantillon portant
+``longueur / n``. L'image est ensuite composée dans la figure matplotlib
+(``imshow``) : des millions de segments en quelques secondes, sans perte.
+
+Longueurs et courbures sont calculées en EPSG:3857 puis ramenées en mètres
+vrais (facteur ``cos φ``) ; la courbure d'un sommet est celle du cercle
+passant par ses deux voisins, après densification (``step_m``).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+import shapely
+
+try:
+    from pyproj import Transformer  # type: ignore
+
+    HAS_PYPROJ = True
+except Exception:  # pragma: no cover
+    HAS_PYPROJ = False
+
+# Échantillons traités par lot (mémoire bornée)
+_CHUNK = 1 << 22
+
+
+@dataclass
+class Segments:
+    """Segments aplatis : extrémités dans le CRS du tracé, longueur (m) et courbure (1/m)."""
+
+    x0: np.ndarray
+    y0: np.ndarray
+    x1: np.ndarray
+    y1: np.ndarray
+    length_m: np.ndarray
+    kappa: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.x0)
+
+
+@dataclass
+class DensityRaster:
+    length: np.ndarray  # (H, W) longueur cumulée (m)
+    kappa_max: np.ndarray  # (H, W) courbure max (1/m), NaN si vide
+    extent: Tuple[float, float, float, float]  # xmin, ymin, xmax, ymax
+
+    @property
+    def radius_min(self) -> np.ndarray:
+        with np.errstate(divide="ignore"):
+            return np.where(self.kappa_max > 0, 1.0 / self.kappa_max, np.nan)
+
+
+def _vertex_curvature(x: np.ndarray, y: np.ndarray, part: np.ndarray) -> np.ndarray:
+    # Menger : κ = 4·Aire / (a·b·c) sur (j-1, j, j+1) d'une même partie ; NaN aux extrémités
+    k = np.full(len(x), np.nan)
+    if len(x) < 3:
+        return k
+    j = np.flatnonzero((part[1:-1] == part[:-2]) & (part[1:-1] == part[2:])) + 1
+    ax_, ay_ = x[j - 1], y[j - 1]
+    bx, by = x[j], y[j]
+    cx, cy = x[j + 1], y[j + 1]
+    a = np.hypot(bx - ax_, by - ay_)
+    b = np.hypot(cx - bx, cy - by)
+    c = np.hypot(cx - ax_, cy - ay_)
+    area2 = np.abs((bx - ax_) * (cy - ay_) - (by - ay_) * (cx - ax_))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k[j] = np.where(a * b * c > 0, 2.0 * area2 / (a * b * c), np.nan)
+    return k
+
+
+def lonlat_to_mercator(lon: np.ndarray, lat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """WGS84 → EPSG:3857 (sphère), sans pyproj."""
+    lat = np.clip(np.asarray(lat, dtype=float), -85.06, 85.06)
+    return np.radians(lon) * 6378137.0, np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) * 6378137.0
+
+
+def segment_metrics(xm: np.ndarray, ym: np.ndarray, part: np.ndarray, mercator: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Segments ``j → j+1`` d'une même partie, coordonnées EPSG:3857 (ou CRS
+    métrique conforme si ``mercator=False``).
+
+    Retourne (indices de départ, longueur en m vrais, courbure 1/m = max des
+    deux sommets, NaN sans voisin).
+    """
+    # facteur d'échelle de Mercator : m vrais = m(3857) · cos φ
+    scale = np.cos(np.arctan(np.sinh(ym / 6378137.0))) if mercator else np.ones(len(ym))
+    kv = _vertex_curvature(xm, ym, part) / scale
+    s = np.flatnonzero(part[:-1] == part[1:]) if len(part) > 1 else np.empty(0, dtype=np.int64)
+    seg_len = np.hypot(xm[s + 1] - xm[s], ym[s + 1] - ym[s]) * 0.5 * (scale[s] + scale[s + 1])
+    kappa = np.fmax(kv[s], kv[s + 1]) if len(s) else np.empty(0)
+    return s, seg_len, kappa
+
+
+def line_segments(geoms, crs=None, plot_crs=4326, step_m: Optional[float] = 15.0) -> Segments:
+    """Aplatis des géométries linéaires (GeoSeries ou tableau + ``crs``) en segments.
+
+    Densification à ``step_m`` (m, EPSG:3857) avant le calcul de courbure ;
+    coordonnées des extrémités renvoyées dans ``plot_crs``.
+    """
+    import geopandas as gpd
+
+    gs = geoms if isinstance(geoms, gpd.GeoSeries) else gpd.GeoSeries(np.asarray(geoms, dtype=object), crs=crs)
+    if gs.crs is None:
+        gs = gs.set_crs(4326)
+    arr = shapely.get_parts(np.asarray(gs.to_crs(3857).values, dtype=object))
+    arr = arr[np.isin(shapely.get_type_id(arr), (1, 2))]  # LineString / LinearRing
+    if step_m:
+        arr = shapely.segmentize(arr, float(step_m))
+    xy, part = shapely.get_coordinates(arr, return_index=True)
+    xm, ym = xy[:, 0], xy[:, 1]
+    if str(plot_crs) in ("3857", "EPSG:3857") or not HAS_PYPROJ:
+        px, py = xm, ym
+    else:
+        px, py = Transformer.from_crs(3857, plot_crs, always_xy=True).transform(xm, ym)
+        px, py = np.asarray(px), np.asarray(py)
+    s, seg_len, kappa = segment_metrics(xm, ym, part)
+    return Segments(px[s], py[s], px[s + 1], py[s + 1], seg_len, kappa)
+
+
+def raster_shape(extent: Tuple[float, float, float, float], width: int = 1600) -> Tuple[int, int]:
+    """(H, W) pour une largeur donnée, pixels carrés dans le CRS du tracé."""
+    xmin, ymin, xmax, ymax = extent
+    h = int(round(width * (ymax - ymin) / max(xmax - xmin, 1e-12)))
+    return max(h, 1), int(width)
+
+
+def rasterize(seg: Segments, extent: Tuple[float, float, float, float], shape: Tuple[int, int]) -> DensityRaster:
+    """Accumule longueur et courbure max des segments sur une grille ``shape`` = (H, W)."""
+    H, W = shape
+    xmin, ymin, xmax, ymax = extent
+    sx = W / max(xmax - xmin, 1e-300)
+    sy = H / max(ymax - ymin, 1e-300)
+    length = np.zeros(H * W)
+    kmax = np.full(H * W, np.nan)
+    if len(seg) == 0:
+        return DensityRaster(length.reshape(H, W), kmax.reshape(H, W), extent)
+
+    # coordonnées pixel ; segments entièrement hors fenêtre écartés
+    u0, u1 = (seg.x0 - xmin) * sx, (seg.x1 - xmin) * sx
+    v0, v1 = (seg.y0 - ymin) * sy, (seg.y1 - ymin) * sy
+    keep = (np.maximum(u0, u1) >= 0) & (np.minimum(u0, u1) < W) & (np.maximum(v0, v1) >= 0) & (np.minimum(v0, v1) < H)
+    u0, u1, v0, v1 = u0[keep], u1[keep], v0[keep], v1[keep]
+    seg_len, seg_k = seg.length_m[keep], seg.kappa[keep]
+    # nombre d'échantillons : pas d'un pixel sur l'axe dominant (≈ Bresenham)
+    n = np.clip(np.ceil(np.maximum(np.abs(u1 - u0), np.abs(v1 - v0))), 1, 4 * (W + H)).astype(np.int64)
+    ends = np.cumsum(n)
+    start = 0
+    while start < len(n):
+        base = ends[start - 1] if start else 0
+        stop = int(np.searchsorted(ends, base + _CHUNK, side="right"))
+        stop = max(stop, start + 1)
+        nn = n[start:stop]
+        owner = np.repeat(np.arange(start, stop), nn)
+        # rang de l'échantillon dans son segment
+        k = np.arange(len(owner)) - np.repeat(np.cumsum(nn) - nn, nn)
+        t = (k + 0.5) / np.repeat(nn, nn)
+        iu = np.floor(u0[owner] + t * (u1[owner] - u0[owner])).astype(np.int64)
+        iv = np.floor(v0[owner] + t * (v1[owner] - v0[owner])).astype(np.int64)
+        ok = (iu >= 0) & (iu < W) & (iv >= 0) & (iv < H)
+        pix = iv[ok] * W + iu[ok]
+        own = owner[ok]
+        length += np.bincount(pix, weights=seg_len[own] / n[own], minlength=H * W)
+        kv = seg_k[own]
+        finite = np.isfinite(kv)
+        np.fmax.at(kmax, pix[finite], kv[finite])
+        start = stop
+    return DensityRaster(length.reshape(H, W), kmax.reshape(H, W), extent)
+
+
+def rasterize_lines(geoms, extent: Tuple[float, float, float, float], width: int = 1600, crs=None, plot_crs=4326, step_m: Optional[float] = 15.0) -> DensityRaster:
+    return rasterize(line_segments(geoms, crs=crs, plot_crs=plot_crs, step_m=step_m), extent, raster_shape(extent, width))
+
+
+# Bornes par défaut des échelles κ / R (R ∈ [10 m ; 10 km]) ; longueur : percentiles 1-99
+VALUE_RANGES = {"curvature": (1e-4, 1e-1), "radius": (10.0, 1e4)}
+
+
+def draw_density(ax, raster: DensityRaster, value: str = "length", cmap: str = "viridis", alpha: float = 1.0, zorder: float = 2, vmin: Optional[float] = None, vmax: Optional[float] = None):
+    """Compose la grille dans ``ax`` (pixels vides transparents). ``value`` : length | curvature | radius.
+
+    Échelle logarithmique bornée (``VALUE_RANGES``) : un pixel couvert reste
+    visible même rectiligne (κ ≈ 0 → teinte la plus claire). Retourne
+    l'``AxesImage`` (pour une barre de couleur).
+    """
+    import matplotlib
+    from matplotlib.colors import LogNorm
+
+    if value == "length":
+        img = raster.length
+    elif value == "curvature":
+        img = raster.kappa_max
+    elif value == "radius":
+        img = raster.radius_min
+    else:
+        raise ValueError(f"Valeur inconnue: {value} (length|curvature|radius)")
+    covered = raster.length > 0
+    if value in VALUE_RANGES:
+        lo, hi = VALUE_RANGES[value]
+        vmin, vmax = vmin or lo, vmax or hi
+        # sans courbure mesurable : κ minimal / R maximal
+        img = np.clip(np.where(np.isfinite(img), img, vmin if value == "curvature" else vmax), vmin, vmax)
+    elif covered.any():
+        vmin = vmin or float(np.percentile(img[covered], 1))
+        vmax = vmax or float(np.percentile(img[covered], 99))
+    img = np.ma.masked_where(~covered, img)
+    cm = matplotlib.colormaps[cmap]
+    if value == "radius":
+        cm = cm.reversed()  # petits rayons = couleur forte
+    xmin, ymin, xmax, ymax = raster.extent
+    return ax.imshow(
+        img,
+        extent=(xmin, xmax, ymin, ymax),
+        origin="lower",
+        interpolation="nearest",
+        aspect="auto",  # l'aspect des axes reste celui choisi par l'appelant
+        cmap=cm,
+        norm=LogNorm(vmin=vmin, vmax=vmax) if vmin and vmax and vmax > vmin else None,
+        alpha=alpha,
+        zorder=zorder,
+    )
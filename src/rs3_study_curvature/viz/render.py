@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Rendu parallèle des figures de distribution (hist+KDE, box, violin).
+
+Les scripts décrivent leurs figures sous forme de ``FigureJob`` (tableaux déjà
+découpés + chemins de sortie) ; ``render_jobs`` les exécute sur un pool de
+processus :
+
+- toutes les séries numériques sont copiées une fois dans un bloc de mémoire
+  partagée (``multiprocessing.shared_memory``), les workers n'en reçoivent que
+  des (offset, longueur) ;
+- chaque worker configure matplotlib localement (backend Agg, mêmes rcParams)
+  avant le premier job ; sans pool, le rendu se fait dans un
+  ``rc_context`` aux mêmes rcParams, sans toucher au backend de l'appelant ;
+- le résultat est déterministe : une figure = un job indépendant, mêmes
+  paramètres quel que soit le worker, chemins renvoyés dans l'ordre d'entrée ;
+- avec un ``FigureCache`` (``viz.cache``), les figures dont l'empreinte
+  (séries, paramètres, version du code) est connue sont recopiées au lieu
+  d'être redessinées.
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rs3_study_curvature.viz.cache import FigureCache, array_fingerprint, code_version, fingerprint
+
+# Bloc partagé attaché par chaque worker
+_SHM: Dict[str, Any] = {}
+
+
+@dataclass
+class FigureJob:
+    kind: str  # "hist_kde" | "box_violin"
+    col: str
+    a: np.ndarray
+    b: np.ndarray
+    label_a: str = "OSM"
+    label_b: str = "BD TOPO"
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    # module fournissant plot_hist_kde / plot_box_violin (importé dans le worker)
+    plotter: str = "rs3_study_curvature.viz.utils"
+
+
+def _default_rc() -> Dict[str, Any]:
+    import matplotlib
+
+    rc = {k: v for k, v in matplotlib.rcParamsDefault.items() if k != "backend"}
+    rc["svg.hashsalt"] = "rs3"  # ids SVG stables
+    return rc
+
+
+def _setup_matplotlib() -> None:
+    import matplotlib
+
+    matplotlib.use("Agg", force=True)
+    matplotlib.rcParams.update(_default_rc())
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Les workers partagent le resource_tracker du parent (enregistrement
+    # idempotent) : seul le parent appelle unlink()
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python >= 3.13
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _attach_buffer(name: str, size: int) -> None:
+    shm = _attach(name)
+    _SHM["shm"] = shm
+    _SHM["buf"] = np.ndarray((size,), dtype=np.float64, buffer=shm.buf)
+
+
+def _worker_init(name: str, size: int) -> None:
+    _setup_matplotlib()
+    _attach_buffer(name, size)
+
+
+def _render(spec: Tuple[str, str, Tuple[int, int], Tuple[int, int], str, str, Dict[str, Any], str]) -> List[str]:
+    import importlib
+
+    import pandas as pd
+
+    kind, col, (oa, na), (ob, nb), label_a, label_b, kwargs, plotter = spec
+    if kind not in ("hist_kde", "box_violin"):
+        raise ValueError(f"Type de figure inconnu: {kind}")
+    plot = getattr(importlib.import_module(plotter), f"plot_{kind}")
+    buf = _SHM["buf"]
+    df_a = pd.DataFrame({col: buf[oa : oa + na]}, copy=False)
+    df_b = pd.DataFrame({col: buf[ob : ob + nb]}, copy=False)
+    plot(df_a, df_b, col, label_a, label_b, **kwargs)
+    return [kwargs[k] for k in _OUT_KEYS[kind] if kwargs.get(k)]
+
+
+_OUT_KEYS = {"hist_kde": ("out_path",), "box_violin": ("out_path_box", "out_path_violin")}
+
+
+def job_key(job: FigureJob, versions: Dict[str, str]) -> str:
+    """Empreinte d'un job : séries + paramètres (hors chemins) + version du code de tracé."""
+    if job.plotter not in versions:
+        versions[job.plotter] = code_version(__name__, job.plotter)
+    params = {k: v for k, v in job.kwargs.items() if k not in _OUT_KEYS.get(job.kind, ())}
+    return fingerprint(job.kind, job.col, array_fingerprint(np.asarray(job.a, dtype=np.float64)), array_fingerprint(np.asarray(job.b, dtype=np.float64)), job.label_a, job.label_b, params, job.plotter, versions[job.plotter])
+
+
+def _job_outputs(job: FigureJob) -> Dict[str, str]:
+    return {k: job.kwargs[k] for k in _OUT_KEYS.get(job.kind, ()) if job.kwargs.get(k)}
+
+
+def render_jobs(jobs: List[FigureJob], max_workers: Optional[int] = None, cache: Optional[FigureCache] = None) -> List[str]:
+    """Exécute les jobs (pool de processus si >1 worker) ; renvoie les PNG écrits, dans l'ordre.
+
+    Avec ``cache``, seuls les jobs absents du cache sont rendus (puis stockés).
+    """
+    if not jobs:
+        return []
+    if cache is not None:
+        versions: Dict[str, str] = {}
+        keys = [job_key(j, versions) for j in jobs]
+        todo = [i for i, (j, k) in enumerate(zip(jobs, keys)) if not cache.fetch(k, _job_outputs(j))]
+        _render_all([jobs[i] for i in todo], max_workers)
+        for i in todo:
+            cache.store(keys[i], _job_outputs(jobs[i]))
+        cache.save()
+        return [p for j in jobs for p in _job_outputs(j).values()]
+    return _render_all(jobs, max_workers)
+
+
+def _render_all(jobs: List[FigureJob], max_workers: Optional[int]) -> List[str]:
+    if not jobs:
+        return []
+    # Une seule copie de toutes les séries, partagée par (offset, longueur)
+    arrays = [np.asarray(x, dtype=np.float64).ravel() for j in jobs for x in (j.a, j.b)]
+    offsets = np.concatenate([[0], np.cumsum([len(x) for x in arrays])]).astype(int)
+    total = int(offsets[-1])
+    specs = [(j.kind, j.col, (int(offsets[2 * i]), len(arrays[2 * i])), (int(offsets[2 * i + 1]), len(arrays[2 * i + 1])), j.label_a, j.label_b, dict(j.kwargs), j.plotter) for i, j in enumerate(jobs)]
+
+    workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+    workers = max(1, min(workers, len(jobs)))
+    shm = shared_memory.SharedMemory(create=True, size=max(total, 1) * 8)
+    try:
+        buf = np.ndarray((total,), dtype=np.float64, buffer=shm.buf)
+        for x, o in zip(arrays, offsets[:-1]):
+            buf[o : o + len(x)] = x
+        del buf
+        if workers == 1:
+            import matplotlib
+
+            # dans le processus appelant : mêmes rcParams que les workers, le
+            # temps du rendu seulement (backend et style de l'appelant conservés)
+            _attach_buffer(shm.name, total)
+            try:
+                with matplotlib.rc_context(_default_rc()):
+                    return [p for spec in specs for p in _render(spec)]
+            finally:
+                _SHM.pop("buf", None)
+                _SHM.pop("shm").close()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init, initargs=(shm.name, total)) as ex:
+            return [p for paths in ex.map(_render, specs, chunksize=1) for p in paths]
+    finally:
+        shm.close()
+        shm.unlink()
@@ -6,6 +6,7 @@ from typing import Iterable, Optional, Tuple
 import pandas as pd
 import geopandas as gpd
 import numpy as np
+import shapely
 import matplotlib.pyplot as plt
 from matplotlib.lines import Line2D
 import typer
@@ -17,9 +18,6 @@ try:
     HAS_MAKE_VALID = True
 except Exception:  # pragma: no cover
     HAS_MAKE_VALID = False
-import unicodedata
-import re
-
 try:
     import pyogrio  # type: ignore
 
@@ -34,6 +32,12 @@ try:
 except Exception:  # pragma: no cover
     HAS_PYPROJ = False
 
+from rs3_study_curvature.data.geo_sidecar import read_geom_indexed
+from rs3_study_curvature.data.segments import bbox_to_crs, read_segments_bbox, segments_crs
+from rs3_study_curvature.data.street_index import StreetIndex, guess_name_columns, load_street_index, text_columns
+from rs3_study_curvature.geometry.clothoid import rolling_clothoid_fit
+from rs3_study_curvature.viz.raster import draw_density, rasterize_lines
+
 app = typer.Typer(add_completion=False)
 
 # --- chemins par défaut (modifiables par options CLI)
@@ -56,58 +60,44 @@ SEG_COLUMNS = [
     "name",
 ]
 
-# === Helpers noms de voies & fallback spatial ===
-NAME_COL_HINTS = ("name", "nom", "voie", "libel", "topo")
-
-
-def _normalize_text(s: str) -> str:
-    if s is None:
-        return ""
-    s = unicodedata.normalize("NFKD", str(s)).encode("ascii", "ignore").decode("ascii")
-    s = s.lower()
-    # enlever ponctuation légère et termes génériques
-    s = re.sub(r"[\W_]+", " ", s, flags=re.U)
-    s = re.sub(r"\b(rue|avenue|av|bd|boulevard|chemin|route|impasse|allee|place|quai|square|cours)\b", "", s)
-    return re.sub(r"\s+", " ", s).strip()
 
+# === Helpers noms de voies & fallback spatial ===
+def _street_index(path: str, debug: bool = False) -> Optional[StreetIndex]:
+    """Index persistant des noms de la source (``<path>.street_index``), None si illisible."""
+    try:
+        return load_street_index(path)
+    except Exception as e:
+        if debug:
+            typer.echo(f"[DEBUG] index des noms indisponible pour {path}: {e}")
+        return None
 
-def _guess_name_columns(df: pd.DataFrame) -> list[str]:
-    cands: list[str] = []
-    for c in df.columns:
-        cl = c.lower()
-        if any(h in cl for h in NAME_COL_HINTS) and df[c].dtype == object:
-            cands.append(c)
-    preferred = [c for c in ["name", "nom_voie", "nom", "libelle"] if c in df.columns]
-    # dédupliquer en gardant l'ordre
-    return list(dict.fromkeys(preferred + cands))
 
+def _filter_by_street_name(gdf: gpd.GeoDataFrame, street: str, index: Optional[StreetIndex] = None) -> gpd.GeoDataFrame:
+    """Lignes dont un nom contient ``street`` (sans accents/casse/type de voie).
 
-def _filter_by_street_name(gdf: gpd.GeoDataFrame, street: str) -> gpd.GeoDataFrame:
+    La recherche se fait dans l'index (noms distincts déjà normalisés) puis
+    les noms retenus sont filtrés par ``isin`` : aucune normalisation par ligne.
+    """
     if not street or gdf.empty:
         return gdf
-    target = _normalize_text(street)
-    cols = _guess_name_columns(gdf)
+    if index is None:
+        index = StreetIndex.from_frame(gdf)
+    cols = [c for c in (index.columns or guess_name_columns(gdf.columns, text_columns(gdf))) if c in gdf.columns]
     if not cols:
         return gdf.iloc[0:0]
-    mask = False
+    names = index.match_names(street)
+    mask = np.zeros(len(gdf), dtype=bool)
     for c in cols:
-        norm = gdf[c].astype(str).map(_normalize_text)
-        mask = mask | norm.str.contains(re.escape(target))
+        mask |= gdf[c].isin(names).to_numpy()
     return gdf[mask].copy()
 
 
 def _fallback_overlap(source: gpd.GeoDataFrame, target: gpd.GeoDataFrame, buf_m: float = 50.0) -> gpd.GeoDataFrame:
-    """Si 'target' n'a pas matché par le nom, on récupère ce qui chevauche 'source' (buffer en mètres)."""
+    """Si 'target' n'a pas matché par le nom, on récupère ce qui passe à moins de ``buf_m`` de 'source'."""
     if source.empty or target.empty:
         return target.iloc[0:0]
-    src3857 = source.to_crs(3857)
     tgt3857 = target.to_crs(3857)
-    try:
-        area = src3857.buffer(buf_m).union_all()
-    except Exception:
-        # compat geopandas <0.14
-        area = src3857.buffer(buf_m).unary_union
-    hit = tgt3857[tgt3857.intersects(area)].copy()
+    hit = tgt3857[_corridor_mask(tgt3857.geometry.values, source.to_crs(3857).geometry.values, buf_m)].copy()
     return hit.to_crs(4326)
 
 
@@ -155,50 +145,27 @@ def _clean_geoms(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
     return out
 
 
-def _safe_union_buffer(streets: gpd.GeoSeries | gpd.GeoDataFrame, street_buffer_m: float, debug: bool = False):
-    """Construit de manière robuste une zone tampon autour des géométries de la rue.
-    Stratégie *buffer-then-union* (on tamponne d'abord chaque géométrie en 3857,
-    puis on dissout), ce qui évite plusieurs plantages GEOS observés lors d'union
-    préalable sur des segments cassés/multiples.
-    Retourne une unique géométrie (MultiPolygon/Polygon) en EPSG:3857.
-    """
-    # Normalise entrée → GeoSeries 4326
-    if isinstance(streets, gpd.GeoDataFrame):
-        geoms = streets.geometry
-        src_crs = streets.crs or 4326
-    else:
-        # streets peut être une Series pandas simple ; on force GeoSeries + CRS
-        src_crs = getattr(streets, "crs", 4326) or 4326
-        geoms = gpd.GeoSeries(streets, crs=src_crs)
-
-    # Nettoyage des géométries problématiques
-    gdf = gpd.GeoDataFrame(geometry=geoms, crs=src_crs)
-    gdf = _clean_geoms(gdf)
-    if len(gdf) == 0:
-        return gpd.GeoSeries([], crs=3857).unary_union
+def _corridor_mask(candidates, streets, dist_m: float) -> np.ndarray:
+    """Masque des ``candidates`` situés à moins de ``dist_m`` d'au moins une géométrie de ``streets``.
 
+    Même CRS métrique (3857) pour les deux tableaux. STRtree sur les candidats
+    puis une seule requête ``dwithin`` pour toutes les géométries de rue : ni
+    buffer ni union (les dissolutions GEOS plantaient sur des segments cassés).
+    """
+    candidates = np.asarray(candidates, dtype=object)
+    mask = np.zeros(len(candidates), dtype=bool)
+    streets = np.asarray(streets, dtype=object)
+    streets = streets[~shapely.is_missing(streets) & ~shapely.is_empty(streets)] if len(streets) else streets
+    if len(candidates) == 0 or len(streets) == 0:
+        return mask
+    tree = shapely.STRtree(candidates)
     try:
-        # 1) reprojection en 3857
-        g3857 = gdf.to_crs(3857)
-        # 2) buffer individuel (évite les unions de lignes avant tampon)
-        buf = g3857.buffer(float(street_buffer_m))
-        # 3) dissolution du buffer
-        try:
-            merged = buf.union_all()
-        except Exception:
-            merged = buf.unary_union
-        return merged
-    except Exception as e:
-        if debug:
-            try:
-                import typer
-
-                typer.echo(f"[DEBUG] _safe_union_buffer fallback (buffer-then-union failed): {e!r}")
-            except Exception:
-                pass
-        # Repli: bbox des géométries → buffer
-        xmin_b, ymin_b, xmax_b, ymax_b = gdf.to_crs(4326).total_bounds
-        return gpd.GeoSeries([box(xmin_b, ymin_b, xmax_b, ymax_b)], crs=4326).to_crs(3857).buffer(float(street_buffer_m)).unary_union
+        _, hit = tree.query(streets, predicate="dwithin", distance=float(dist_m))
+    except Exception:
+        # GEOS < 3.10 : pas de dwithin → intersection avec les buffers individuels
+        _, hit = tree.query(shapely.buffer(streets, float(dist_m)), predicate="intersects")
+    mask[hit] = True
+    return mask
 
 
 def _guess_name_column(df: pd.DataFrame) -> Optional[str]:
@@ -277,7 +244,12 @@ def _read_geom(path: str, bbox4326: Tuple[float, float, float, float]) -> gpd.Ge
     ⚠️ Avec pyogrio, la bbox doit être dans le même CRS que la donnée :
     on lit d'abord le CRS natif puis on transforme la bbox 4326 -> CRS natif.
     Ensuite, on reprojette en 4326 et on re-clippe.
+    GeoJSON/GPKG : lecture via le sidecar GeoParquet trié (``<path>.sidecar.parquet``,
+    construit au premier appel, filtre bbox poussé au scan) quand c'est possible.
     """
+    gdf = read_geom_indexed(path, bbox4326)
+    if gdf is not None:
+        return _geom_to_4326(gdf, gdf.crs, bbox4326)
     src_crs = None
     # 1) déterminer le CRS natif sans tout charger
     if HAS_PYOGRIO:
@@ -316,6 +288,10 @@ def _read_geom(path: str, bbox4326: Tuple[float, float, float, float]) -> gpd.Ge
         except Exception:
             gdf = gpd.read_file(path)
 
+    return _geom_to_4326(gdf, src_crs, bbox4326)
+
+
+def _geom_to_4326(gdf: gpd.GeoDataFrame, src_crs, bbox4326: Tuple[float, float, float, float]) -> gpd.GeoDataFrame:
     # 4) définir le CRS si manquant, reprojeter en 4326
     try:
         if gdf.crs is None:
@@ -342,58 +318,32 @@ def _read_geom(path: str, bbox4326: Tuple[float, float, float, float]) -> gpd.Ge
 def _read_segments_centroids(parquet_path: str, bbox4326: Tuple[float, float, float, float], classes: Optional[Iterable[str]] = None, street: Optional[str] = None) -> gpd.GeoDataFrame:
     """Lit le parquet 'segments' (sans géométrie) de façon économe:
     - ne charge que quelques colonnes
-    - filtre par bbox en CRS natif des centroids (deviné automatiquement)
-    - filtre optionnellement par classes
+    - CRS des centroids lu dans les métadonnées (fichier ou sidecar géométrique)
+    - filtres bbox/classes poussés au scan pyarrow (row groups hors bbox ignorés)
+    - filtre rue résolu dans l'index des noms (``<parquet>.street_index``)
     """
-    # On lit d'abord au minimum pour récupérer les colonnes et deviner le CRS
-    base = pd.read_parquet(parquet_path, columns=["x_centroid", "y_centroid"])  # lève si absent
-    use_cols = [c for c in SEG_COLUMNS if c in base.columns or c in SEG_COLUMNS]
-    for base_col in ("x_centroid", "y_centroid"):
-        if base_col not in use_cols:
-            use_cols.append(base_col)
+    crs = segments_crs(parquet_path)
+    if crs is None:
+        # fichiers sans métadonnées : heuristique sur le premier row group seulement
+        import pyarrow.parquet as pq
 
-    df = pd.read_parquet(parquet_path, columns=list(dict.fromkeys(use_cols)))
+        crs = _guess_seg_crs(pq.ParquetFile(parquet_path).read_row_group(0, columns=["x_centroid", "y_centroid"]).to_pandas())
+    bbox_native = bbox_to_crs(bbox4326, crs) if HAS_PYPROJ else None
 
-    # filtre par rue si possible (prioritaire sur classes)
+    # filtre par rue : noms correspondants lus dans l'index, puis poussés au scan
+    names = None
     if street:
-        name_col = _guess_name_column(df)
-        if name_col is not None:
-            s = df[name_col].astype(str).str.casefold()
-            df = df[s.str.contains(street.casefold(), na=False)].copy()
-
-    if not {"x_centroid", "y_centroid"}.issubset(df.columns):
-        raise ValueError(f"Colonnes x_centroid/y_centroid manquantes dans {parquet_path}")
-
-    # Devine le CRS natif des centroids
-    crs_epsg = _guess_seg_crs(df)
-
-    # Transforme la bbox 4326 -> crs_epsg pour un filtrage rapide
-    if HAS_PYPROJ and crs_epsg in (2154, 3857):
-        tx = Transformer.from_crs(4326, crs_epsg, always_xy=True)
-        xmin, ymin, xmax, ymax = bbox4326
-        x0, y0 = tx.transform(xmin, ymin)
-        x1, y1 = tx.transform(xmax, ymax)
-        xmin_n, xmax_n = (min(x0, x1), max(x0, x1))
-        ymin_n, ymax_n = (min(y0, y1), max(y0, y1))
-    else:
-        # si on ne sait pas transformer, on ne pré-filtre pas par bbox en coordonnées natives
-        xmin_n = df["x_centroid"].min()
-        xmax_n = df["x_centroid"].max()
-        ymin_n = df["y_centroid"].min()
-        ymax_n = df["y_centroid"].max()
-
-    # Filtrage grossier par bbox
-    df = df[(df["x_centroid"] >= xmin_n) & (df["x_centroid"] <= xmax_n) & (df["y_centroid"] >= ymin_n) & (df["y_centroid"] <= ymax_n)].copy()
-
-    # Filtre éventuel par classes
-    if classes is not None and "class" in df.columns:
-        df = df[df["class"].isin(classes)].copy()
+        index = _street_index(parquet_path)
+        if index is not None and "name" in index.columns:
+            names = index.match_names(street)
+    df = read_segments_bbox(parquet_path, bbox_native, columns=SEG_COLUMNS, classes=classes, names=names)
+    if street and names is None and _guess_name_column(df) is not None:
+        df = _filter_by_street(df, street)
 
     # Construction géométrie dans le CRS natif puis reprojection en WGS84
-    geom = [Point(x, y) if pd.notna(x) and pd.notna(y) else None for x, y in zip(df["x_centroid"], df["y_centroid"])]
-    gdf = gpd.GeoDataFrame(df, geometry=geom, crs=crs_epsg)
-    gdf = gdf[gdf.geometry.notna()].to_crs(4326)
-    return gdf
+    df = df[df["x_centroid"].notna() & df["y_centroid"].notna()]
+    gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df["x_centroid"], df["y_centroid"]), crs=crs)
+    return gdf.to_crs(4326)
 
 
 def _derive_radius(series_df: pd.DataFrame) -> pd.Series:
@@ -589,79 +539,56 @@ def _radii_from_lines(lines_gdf: gpd.GeoDataFrame, step_m: float = 15.0, max_poi
 # === Clothoïde: k(s) ≈ a*s + b (option légère, locale) ===
 
 
-def _curvature_profile_from_line(line, step_m: float = 12.0):
-    """
-    Depuis une LineString en EPSG:3857, renvoie (s_mid, k_mid, pts_mid) où :
-    - s_mid: abscisses curvilignes (m) au milieu des triplets
-    - k_mid: courbure locale 1/R (1/m)
-    - pts_mid: points shapely (EPSG:3857) correspondants
-    """
-    pts = _densify_line_to_points(line, step_m)
-    if len(pts) < 3:
-        return np.array([]), np.array([]), []
-    # abscisse cumulée
-    dists = [0.0]
-    for i in range(1, len(pts)):
-        dists.append(dists[-1] + float(np.hypot(pts[i][0] - pts[i - 1][0], pts[i][1] - pts[i - 1][1])))
-    dists = np.array(dists)
-    s_mid, k_mid, pts_mid = [], [], []
-    for i in range(1, len(pts) - 1):
-        p0, p1, p2 = pts[i - 1], pts[i], pts[i + 1]
-        R = _circumradius(p0, p1, p2)
-        if np.isnan(R) or R <= 0:
-            continue
-        k = 1.0 / float(R)
-        s = 0.5 * (dists[i - 1] + dists[i + 1])
-        s_mid.append(s)
-        k_mid.append(k)
-        pts_mid.append(Point(p1[0], p1[1]))
-    if len(s_mid) == 0:
-        return np.array([]), np.array([]), []
-    return np.array(s_mid), np.array(k_mid), pts_mid
-
-
-def _fit_windows_ks(s_mid: np.ndarray, k_mid: np.ndarray, window_m: float, step_m: float, r2_min: float = 0.85):
+def _curvature_profiles(parts, step_m: float = 12.0):
     """
-    Ajuste k(s) ≈ a*s + b par régression linéaire dans des fenêtres glissantes de taille ~window_m.
-    Retourne des index centraux conservés et les paramètres a,b,r2 pour ces index.
+    Profils k(s) de toutes les lignes (EPSG:3857) en une passe vectorisée :
+    points espacés d'environ step_m (extrémités incluses), courbure 1/R du
+    cercle circonscrit à chaque triplet (triplets quasi colinéaires ignorés).
+    Retourne (s_mid, k_mid, x_mid, y_mid, offsets) concaténés, ``offsets``
+    (L+1) délimitant chaque ligne.
     """
-    if len(s_mid) == 0:
-        return [], [], [], []
-    win_pts = max(int(round(window_m / step_m)), 3)
-    win_pts = int(np.clip(win_pts, 3, 999999))
-    keep_idx, a_list, b_list, r2_list = [], [], [], []
-    for i in range(win_pts // 2, len(s_mid) - win_pts // 2):
-        lo = i - win_pts // 2
-        hi = i + win_pts // 2 + 1
-        x = s_mid[lo:hi]
-        y = k_mid[lo:hi]
-        if len(x) < 3:
-            continue
-        # régression linéaire simple
-        A = np.vstack([x, np.ones_like(x)]).T
-        try:
-            coeff, *_ = np.linalg.lstsq(A, y, rcond=None)
-            a, b = float(coeff[0]), float(coeff[1])
-            y_hat = a * x + b
-            ss_res = float(np.sum((y - y_hat) ** 2))
-            ss_tot = float(np.sum((y - np.mean(y)) ** 2))
-            r2 = 1.0 - ss_res / max(ss_tot, 1e-12)
-        except Exception:
-            continue
-        if np.isfinite(r2) and r2 >= r2_min:
-            keep_idx.append(i)
-            a_list.append(a)
-            b_list.append(b)
-            r2_list.append(r2)
-    return keep_idx, a_list, b_list, r2_list
+    parts = [p for p in parts if p is not None and not p.is_empty and np.isfinite(p.length) and p.length > 0]
+    empty = np.empty(0)
+    if not parts:
+        return empty, empty, empty, empty, np.zeros(1, dtype=np.int64)
+    lengths = np.array([p.length for p in parts])
+    n_seg = np.maximum(np.ceil(lengths / float(step_m)).astype(np.int64), 1)
+    n_pts = n_seg + 1
+    line_of = np.repeat(np.arange(len(parts)), n_pts)
+    first = np.concatenate([[0], np.cumsum(n_pts)[:-1]])
+    j = np.arange(n_pts.sum()) - np.repeat(first, n_pts)
+    d = lengths[line_of] * j / n_seg[line_of]  # = np.linspace(0, length, n+1) par ligne
+    xy = shapely.get_coordinates(shapely.line_interpolate_point(np.asarray(parts, dtype=object)[line_of], d))
+
+    # abscisse cumulée entre points échantillonnés, remise à zéro à chaque ligne
+    step = np.hypot(np.diff(xy[:, 0]), np.diff(xy[:, 1]))
+    dists = np.concatenate([[0.0], np.cumsum(step)])
+    dists = dists - np.repeat(dists[first], n_pts)
+
+    # triplets (i-1, i, i+1) internes à chaque ligne
+    mid = np.flatnonzero((j > 0) & (j < np.repeat(n_pts, n_pts) - 1))
+    p0, p1, p2 = xy[mid - 1], xy[mid], xy[mid + 1]
+    a = np.hypot(p1[:, 0] - p0[:, 0], p1[:, 1] - p0[:, 1])
+    b = np.hypot(p2[:, 0] - p1[:, 0], p2[:, 1] - p1[:, 1])
+    c = np.hypot(p0[:, 0] - p2[:, 0], p0[:, 1] - p2[:, 1])
+    sp = (a + b + c) / 2.0
+    area_sq = np.maximum(sp * (sp - a) * (sp - b) * (sp - c), 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        R = (a * b * c) / (4.0 * np.sqrt(area_sq))
+    ok = (area_sq > 0) & np.isfinite(R) & (R > 0) & (R <= 1_000_000)
+    mid, R = mid[ok], R[ok]
+    s_mid = 0.5 * (dists[mid - 1] + dists[mid + 1])
+    offsets = np.searchsorted(line_of[mid], np.arange(len(parts) + 1))
+    return s_mid, 1.0 / R, xy[mid, 0], xy[mid, 1], offsets
 
 
 def _clothoid_points_from_lines(lines_gdf: gpd.GeoDataFrame, step_m: float = 12.0, window_m: float = 120.0, r2_min: float = 0.85, max_points: int = 3000) -> gpd.GeoDataFrame:
     """
     Détecte des portions localement clothoïdales sur des lignes:
     - reprojette en 3857
-    - calcule k(s) par triplets
-    - garde les centres de fenêtres où R² de la régression linéaire k(s) est élevé
+    - calcule k(s) par triplets (toutes les lignes d'un coup)
+    - régression k(s) ≈ a*s + b sur toutes les fenêtres par sommes cumulées (O(n))
+    - garde les centres de fenêtres où R² est élevé
     Retourne un GeoDataFrame de points (EPSG:4326) avec colonnes ['a','b','r2'].
     """
     if lines_gdf is None or len(lines_gdf) == 0:
@@ -673,34 +600,20 @@ def _clothoid_points_from_lines(lines_gdf: gpd.GeoDataFrame, step_m: float = 12.
         if g3857.crs is None:
             g3857 = g3857.set_crs(4326, allow_override=True)
         g3857 = g3857.to_crs(3857)
-    geoms = []
-    a_vals, b_vals, r2_vals = [], [], []
-    total = 0
+    parts = []
     for geom in g3857.geometry:
-        try:
-            parts = list(geom.geoms) if getattr(geom, "geom_type", "") == "MultiLineString" else [geom]
-        except Exception:
-            parts = [geom]
-        for part in parts:
-            s_mid, k_mid, pts_mid = _curvature_profile_from_line(part, step_m=step_m)
-            if len(s_mid) == 0:
-                continue
-            idx, a_list, b_list, r2_list = _fit_windows_ks(s_mid, k_mid, window_m=window_m, step_m=step_m, r2_min=r2_min)
-            for j in range(len(idx)):
-                geoms.append(pts_mid[idx[j]])
-                a_vals.append(a_list[j])
-                b_vals.append(b_list[j])
-                r2_vals.append(r2_list[j])
-                total += 1
-                if total >= max_points:
-                    break
-            if total >= max_points:
-                break
-        if total >= max_points:
-            break
-    if len(geoms) == 0:
+        if geom is None:
+            continue
+        parts.extend(geom.geoms if getattr(geom, "geom_type", "") == "MultiLineString" else [geom])
+    parts = [p for p in parts if getattr(p, "geom_type", "") == "LineString"]
+    s_mid, k_mid, x_mid, y_mid, offsets = _curvature_profiles(parts, step_m=step_m)
+    win_pts = max(int(round(window_m / step_m)), 3)
+    idx, a, b, r2 = rolling_clothoid_fit(s_mid, k_mid, win_pts, offsets)
+    keep = np.flatnonzero(np.isfinite(r2) & (r2 >= r2_min))[:max_points]
+    if keep.size == 0:
         return gpd.GeoDataFrame(columns=["a", "b", "r2", "geometry"], geometry="geometry", crs=4326)
-    out = gpd.GeoDataFrame({"a": a_vals, "b": b_vals, "r2": r2_vals}, geometry=gpd.GeoSeries(geoms, crs=3857))
+    idx = idx[keep]
+    out = gpd.GeoDataFrame({"a": a[keep], "b": b[keep], "r2": r2[keep]}, geometry=gpd.points_from_xy(x_mid[idx], y_mid[idx], crs=3857))
     try:
         out = out.to_crs(4326)
     except Exception:
@@ -717,7 +630,10 @@ def romilly(
     osm_seg: str = typer.Option(DEFAULT_OSM_SEG, help="Segments OSM (parquet – centroids seulement)"),
     ign_seg: str = typer.Option(DEFAULT_IGN_SEG, help="Segments IGN (parquet – centroids seulement)"),
     classes: Optional[str] = typer.Option(None, help="Filtrer par classes (séparées par des virgules), ex: 'primary,secondary'"),
-    max_plotted: Optional[int] = typer.Option(5000, help="Limiter le nombre de géométries tracées par couche pour accélérer le rendu (None pour tout tracer)"),
+    max_plotted: Optional[int] = typer.Option(5000, help="Au-delà de ce nombre de géométries, la couche est rastérisée (densité colorée par --raster-value) au lieu d'être tracée ligne à ligne (None : toujours vectoriel)"),
+    raster_value: str = typer.Option("curvature", help="Valeur des pixels en mode raster : length | curvature | radius"),
+    raster_width: int = typer.Option(1600, help="Largeur (pixels) de la grille en mode raster"),
+    raster_step_m: float = typer.Option(15.0, help="Pas de densification (m) des géométries avant rastérisation (courbure par pixel)", min=0.1),
     street: Optional[str] = typer.Option(None, help="Filtrer par nom de voie (ex: 'Rue Blingue'). Ignore --classes si fourni."),
     debug: bool = typer.Option(False, help="Logs de debug (colonnes de noms détectées, comptages, etc.)"),
     street_buffer_m: float = typer.Option(60.0, help="Rayon (m) du buffer autour de la rue pour capter/afficher géométries & segments"),
@@ -772,14 +688,20 @@ def romilly(
         typer.echo(f"[DEBUG] post-read geom → OSM_all={len(g_osm_all)} IGN_all={len(g_ign_all)}")
 
     if debug:
-        typer.echo(f"[DEBUG] OSM cols nom: {_guess_name_columns(g_osm)} ; IGN cols nom: {_guess_name_columns(g_ign)}")
+        typer.echo(f"[DEBUG] OSM cols nom: {guess_name_columns(g_osm.columns, text_columns(g_osm))} ; IGN cols nom: {guess_name_columns(g_ign.columns, text_columns(g_ign))}")
 
     classes_list = [c.strip() for c in classes.split(",")] if classes else None
     if street:
         classes_list = None  # le filtre rue l'emporte
-        # filtre par nom "intelligent"
-        g_osm_sel = _filter_by_street_name(g_osm, street)
-        g_ign_sel = _filter_by_street_name(g_ign, street)
+        # filtre par nom via les index persistants des deux couches
+        idx_osm = _street_index(osm_geom, debug)
+        idx_ign = _street_index(ign_geom, debug)
+        g_osm_sel = _filter_by_street_name(g_osm, street, idx_osm)
+        g_ign_sel = _filter_by_street_name(g_ign, street, idx_ign)
+        if g_osm_sel.empty and g_ign_sel.empty:
+            sugg = [n for idx in (idx_osm, idx_ign) if idx is not None for n, _ in idx.suggest(street)]
+            if sugg:
+                typer.echo(f"Aucune voie ne correspond à {street!r} ; noms proches : {list(dict.fromkeys(sugg))}")
         # fallback spatial si besoin (chevauchement)
         if g_osm_sel.empty and not g_ign_sel.empty:
             g_osm_sel = _fallback_overlap(g_ign_sel, g_osm)
@@ -812,12 +734,6 @@ def romilly(
         if classes_list is not None and "class" in g_ign.columns:
             g_ign = g_ign[g_ign["class"].isin(classes_list)].copy()
 
-    # downsampling optionnel pour la figure
-    if max_plotted is not None and len(g_osm) > max_plotted:
-        g_osm = g_osm.sample(max_plotted, random_state=42).copy()
-    if max_plotted is not None and len(g_ign) > max_plotted:
-        g_ign = g_ign.sample(max_plotted, random_state=42).copy()
-
     # 2) lire segments (centroids) → filtre bbox/spatial → rayon
     if street and (len(g_osm) or len(g_ign)):
         # Construit une GeoSeries 4326 des géométries sélectionnées (OSM+IGN)
@@ -834,36 +750,31 @@ def romilly(
         if streets is not None and len(streets) > 0:
             if debug:
                 try:
-                    typer.echo(f"[DEBUG] building buffer over {len(streets)} street geoms (r={street_buffer_m}m)")
+                    typer.echo(f"[DEBUG] corridor selection around {len(streets)} street geoms (r={street_buffer_m}m)")
                 except Exception:
                     pass
-            area3857 = _safe_union_buffer(streets, street_buffer_m, debug)
-            # lire par bbox (rapide) puis filtrer finement par inclusion dans le buffer
+            streets3857 = _clean_geoms(gpd.GeoDataFrame(geometry=streets, crs=4326)).to_crs(3857).geometry.values
+            # lire par bbox (rapide) puis garder les centroids à moins de street_buffer_m d'une rue
             s_osm = _read_segments_centroids(osm_seg, (xmin, ymin, xmax, ymax), None, street=None).to_crs(3857)
             s_ign = _read_segments_centroids(ign_seg, (xmin, ymin, xmax, ymax), None, street=None).to_crs(3857)
-            s_osm = s_osm[s_osm.geometry.within(area3857)].to_crs(4326).copy()
-            s_ign = s_ign[s_ign.geometry.within(area3857)].to_crs(4326).copy()
+            s_osm = s_osm[_corridor_mask(s_osm.geometry.values, streets3857, street_buffer_m)].to_crs(4326).copy()
+            s_ign = s_ign[_corridor_mask(s_ign.geometry.values, streets3857, street_buffer_m)].to_crs(4326).copy()
 
-            # IMPORTANT: pour l'affichage, on clippe les couches complètes, pas les filtres par nom
-            def _clip_to_buf(df):
+            # IMPORTANT: pour l'affichage, on sélectionne dans les couches complètes, pas les filtres par nom
+            def _corridor(df, near):
                 if df is None or len(df) == 0:
                     return df
                 df3857 = df.to_crs(3857)
-                clipped = df3857[df3857.intersects(area3857)].copy()
-                return clipped.to_crs(4326)
+                return df3857[_corridor_mask(df3857.geometry.values, near, street_buffer_m)].to_crs(4326)
 
-            g_osm_draw = _clip_to_buf(g_osm_all)
-            g_ign_draw = _clip_to_buf(g_ign_all)
-            # Fallback d'affichage: si aucune géométrie IGN (ou OSM) n'a été clippée mais que des centroids existent,
-            # on construit une zone à partir des centroids et on re-clippe la couche complète.
+            g_osm_draw = _corridor(g_osm_all, streets3857)
+            g_ign_draw = _corridor(g_ign_all, streets3857)
+            # Fallback d'affichage: si aucune géométrie IGN (ou OSM) n'a été retenue mais que des centroids existent,
+            # on sélectionne la couche complète autour des centroids.
             if (g_ign_draw is None or len(g_ign_draw) == 0) and len(s_ign) > 0:
-                area_from_pts_ign = s_ign.to_crs(3857).buffer(street_buffer_m).unary_union
-                gi3857 = _clean_geoms(g_ign_all).to_crs(3857)
-                g_ign_draw = gi3857[gi3857.intersects(area_from_pts_ign)].copy().to_crs(4326)
+                g_ign_draw = _corridor(g_ign_all, s_ign.to_crs(3857).geometry.values)
             if (g_osm_draw is None or len(g_osm_draw) == 0) and len(s_osm) > 0:
-                area_from_pts_osm = s_osm.to_crs(3857).buffer(street_buffer_m).unary_union
-                go3857 = _clean_geoms(g_osm_all).to_crs(3857)
-                g_osm_draw = go3857[go3857.intersects(area_from_pts_osm)].copy().to_crs(4326)
+                g_osm_draw = _corridor(g_osm_all, s_osm.to_crs(3857).geometry.values)
         else:
             s_osm = _read_segments_centroids(osm_seg, bbox, None, street=None)
             s_ign = _read_segments_centroids(ign_seg, bbox, None, street=None)
@@ -928,10 +839,20 @@ def romilly(
     # _ign_plot/_osm_plot déjà définis plus haut pour les calculs de rayon
     _ign_plot = _clean_geoms(_ign_plot) if (_ign_plot is not None and len(_ign_plot)) else _ign_plot
     _osm_plot = _clean_geoms(_osm_plot) if (_osm_plot is not None and len(_osm_plot)) else _osm_plot
-    if _ign_plot is not None and len(_ign_plot):
-        _ign_plot.plot(ax=ax, linewidth=1.6, alpha=0.95, color="C0", zorder=2)
-    if _osm_plot is not None and len(_osm_plot):
-        _osm_plot.plot(ax=ax, linewidth=1.2, alpha=0.85, color="C1", zorder=3)
+    # Grandes couches : grille de densité (toutes les géométries, aucun échantillonnage)
+    extent = (xmin, ymin, xmax, ymax)
+    rastered = []
+    for lyr, cmap, lw, alpha, z, label in ((_ign_plot, "Blues", 1.6, 0.95, 2, "IGN"), (_osm_plot, "Oranges", 1.2, 0.85, 3, "OSM")):
+        if lyr is None or not len(lyr):
+            continue
+        if max_plotted is not None and len(lyr) > max_plotted:
+            ras = rasterize_lines(lyr.geometry, extent, width=int(raster_width), step_m=float(raster_step_m))
+            im = draw_density(ax, ras, value=raster_value, cmap=cmap, alpha=alpha, zorder=z)
+            rastered.append((label, im))
+            if debug:
+                typer.echo(f"[DEBUG] {label} rastérisé: {len(lyr)} géométries → grille {ras.length.shape} ({raster_value})")
+        else:
+            lyr.plot(ax=ax, linewidth=lw, alpha=alpha, color="C0" if label == "IGN" else "C1", zorder=z)
 
     # Optionnel: afficher les centroids des segments
     if plot_centroids:
@@ -968,9 +889,11 @@ def romilly(
     ax.set_ylabel("Latitude")
 
     # Légende via proxys pour éviter l'avertissement PatchCollection
+    # (couches rastérisées : décrites par leur barre de couleur)
     handles = []
-    plotted_ign = _ign_plot is not None and len(_ign_plot) > 0
-    plotted_osm = _osm_plot is not None and len(_osm_plot) > 0
+    raster_labels = {label for label, _ in rastered}
+    plotted_ign = _ign_plot is not None and len(_ign_plot) > 0 and "IGN" not in raster_labels
+    plotted_osm = _osm_plot is not None and len(_osm_plot) > 0 and "OSM" not in raster_labels
     if plotted_ign:
         handles.append(Line2D([], [], color="C0", linewidth=1.6, label="IGN BD TOPO"))
     if plotted_osm:
@@ -982,6 +905,9 @@ def romilly(
         handles.append(Line2D([], [], linestyle="None", marker="+", color="C0", label="Clothoïde (IGN)"))
     if handles:
         ax.legend(handles=handles, loc="best")
+    units = {"length": "longueur (m) / pixel", "curvature": "κ max (1/m)", "radius": "R min (m)"}
+    for label, im in rastered:
+        fig.colorbar(im, ax=ax, shrink=0.6, pad=0.02, label=f"{label} — {units.get(raster_value, raster_value)}")
     ax.set_aspect("equal")
     fig.tight_layout()
 
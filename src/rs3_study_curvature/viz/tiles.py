@@ -0,0 +1,586 @@
+# -*- coding: utf-8 -*-
+"""Pyramide de tuiles vectorielles des segments de courbure (PMTiles / MBTiles).
+
+Les segments ``roadinfo_segments*.parquet`` et leur sidecar géométrique
+(``<stem>_geom.parquet``, aligné ligne à ligne) sont exportés en tuiles
+Mapbox Vector Tile (MVT, couche ``segments``), avec les attributs de rayon
+et de courbure, pour une consultation régionale dans un navigateur.
+
+Pour chaque niveau de zoom :
+
+1. géométries (projetées une seule fois en EPSG:3857) simplifiées à
+   ``tolerance_px`` pixel écran ; les entités plus petites que ``min_px``
+   pixel sont omises ;
+2. chaque entité est affectée aux tuiles que recoupe sa bbox ;
+3. les tuiles sont produites par lots (zoom, tuiles) dans un pool de
+   processus : découpe au carré de la tuile (marge ``buffer``),
+   quantification sur la grille ``extent``, encodage MVT vectorisé
+   (commandes et varints NumPy), compression gzip.
+
+Conteneur mono-fichier selon l'extension de sortie :
+
+- ``.pmtiles`` (PMTiles v3, répertoires Hilbert) : servi tel quel par
+  n'importe quel serveur statique acceptant les requêtes ``Range``
+  (MapLibre + protocole ``pmtiles://``) ;
+- ``.mbtiles`` (SQLite, schéma MBTiles 1.3, lignes TMS).
+
+Usage :
+  python -m rs3_study_curvature.viz.tiles --segments roadinfo_segments_osm.parquet --out segments_osm.pmtiles --min-zoom 8 --max-zoom 14
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import shapely
+
+LAYER_NAME = "segments"
+DEFAULT_ATTRIBUTES = ("road_id", "length_m", "radius_min_m", "radius_p85_m", "curv_mean_1perm", "is_straight", "class", "name", "source")
+EXTENT = 4096
+BUFFER = 64
+# Demi-largeur du monde Web Mercator (m)
+ORIGIN = 20037508.342789244
+# Paires (entité, tuile) par lot envoyé aux processus
+BATCH_FEATURES = 200_000
+# Dictionnaire des valeurs et clés, transmis une fois par processus
+_TILE_CTX: Dict[str, Any] = {}
+
+
+# --------------------------------------------------------------------------------------
+# Protobuf (MVT 2.1)
+# --------------------------------------------------------------------------------------
+_SMALL_VARINTS = [bytes((i,)) for i in range(128)]
+
+
+def _varint(n: int) -> bytes:
+    if n < 128:
+        return _SMALL_VARINTS[n]
+    out = bytearray()
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _varint_array(v: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Varints d'un tableau d'entiers ≥ 0 : (octets concaténés, position de départ de chaque valeur + fin)."""
+    v = np.asarray(v, dtype=np.uint64)
+    nbytes = np.ones(len(v), dtype=np.int64)
+    t = v >> np.uint64(7)
+    while t.any():
+        nbytes += t > 0
+        t >>= np.uint64(7)
+    pos = np.concatenate([[0], np.cumsum(nbytes)])
+    out = np.empty(int(pos[-1]), dtype=np.uint8)
+    for i in range(int(nbytes.max()) if len(v) else 0):
+        sel = nbytes > i
+        byte = (v[sel] >> np.uint64(7 * i)) & np.uint64(0x7F)
+        out[pos[:-1][sel] + i] = byte | (np.uint64(0x80) * (nbytes[sel] > i + 1))
+    return out, pos
+
+
+def _field(num: int, payload: bytes) -> bytes:
+    # champ « length-delimited » (wire type 2)
+    return _varint((num << 3) | 2) + _varint(len(payload)) + payload
+
+
+def _zigzag(v: np.ndarray) -> np.ndarray:
+    v = np.asarray(v, dtype=np.int64)
+    return ((v << 1) ^ (v >> 63)).astype(np.uint64)
+
+
+def _encode_value(v) -> bytes:
+    """Message ``Value`` : texte, booléen, entier ou double."""
+    if isinstance(v, (bool, np.bool_)):
+        return b"\x38" + _varint(int(v))
+    if isinstance(v, (int, np.integer)):
+        v = int(v)
+        return (b"\x28" + _varint(v)) if v >= 0 else (b"\x30" + _varint((v << 1) ^ (v >> 63)))
+    if isinstance(v, (float, np.floating)):
+        return b"\x19" + struct.pack("<d", float(v))
+    return _field(1, str(v).encode("utf-8"))
+
+
+def _round_sig(v: np.ndarray, digits: int = 4) -> np.ndarray:
+    """Arrondi à ``digits`` chiffres significatifs (dictionnaire de valeurs plus court) ; ±inf → NaN."""
+    v = np.where(np.isfinite(v), v, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mag = np.floor(np.log10(np.abs(v)))
+    scale = 10.0 ** np.where(np.isfinite(mag), digits - 1 - mag, 0)
+    return np.round(v * scale) / scale
+
+
+class AttributeTable:
+    """Attributs codés une fois pour toutes : ``codes`` (n, c), −1 si valeur absente,
+    et champ ``values`` de couche (message ``Value`` encadré) de chaque valeur
+    distincte (dictionnaire global)."""
+
+    def __init__(self, df: pd.DataFrame, columns: Sequence[str]):
+        self.keys = [c for c in columns if c in df.columns]
+        values: List[bytes] = []
+        codes = np.full((len(df), len(self.keys)), -1, dtype=np.int64)
+        self.fields: Dict[str, str] = {}
+        for j, c in enumerate(self.keys):
+            s = df[c]
+            if pd.api.types.is_float_dtype(s):
+                s = pd.Series(_round_sig(s.to_numpy(float)), index=s.index)
+            col_codes, uniques = pd.factorize(s, sort=False)
+            ok = col_codes >= 0
+            codes[ok, j] = col_codes[ok] + len(values)
+            values.extend(_field(4, _encode_value(u)) for u in uniques)
+            self.fields[c] = "Boolean" if pd.api.types.is_bool_dtype(s) else ("Number" if pd.api.types.is_numeric_dtype(s) else "String")
+        self.codes = codes
+        self.values = values
+
+
+def _geometry_commands(ix: np.ndarray, iy: np.ndarray, part: np.ndarray, feat_of_part: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Commandes MVT (MoveTo / LineTo, deltas zigzag) de toutes les parties d'une tuile.
+
+    ``ix``/``iy`` : sommets quantifiés, ``part`` : partie de chaque sommet,
+    ``feat_of_part`` : entité (rang dans la tuile) de chaque partie. Retourne
+    (entiers, entité de chaque entier, entités conservées) ; parties de moins
+    de deux sommets distincts écartées.
+    """
+    # sommets répétés consécutifs supprimés (LineTo de longueur nulle)
+    keep = np.ones(len(ix), dtype=bool)
+    keep[1:] = (part[1:] != part[:-1]) | (ix[1:] != ix[:-1]) | (iy[1:] != iy[:-1])
+    ix, iy, part = ix[keep], iy[keep], part[keep]
+    counts = np.bincount(part, minlength=len(feat_of_part))
+    ok_part = counts >= 2
+    sel = ok_part[part]
+    ix, iy, part = ix[sel], iy[sel], part[sel]
+    if not len(ix):
+        return np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    feat = feat_of_part[part]
+    # curseur : repart de (0, 0) pour chaque entité, continu entre ses parties
+    first_of_feat = np.ones(len(ix), dtype=bool)
+    first_of_feat[1:] = feat[1:] != feat[:-1]
+    dx = np.diff(ix, prepend=0)
+    dy = np.diff(iy, prepend=0)
+    dx[first_of_feat], dy[first_of_feat] = ix[first_of_feat], iy[first_of_feat]
+
+    parts, start = np.unique(part, return_index=True)
+    n = counts[parts]
+    size = 2 * n + 2  # MoveTo + (dx, dy) + LineTo + 2·(n-1)
+    base = np.concatenate([[0], np.cumsum(size)])
+    out = np.empty(int(base[-1]), dtype=np.uint64)
+    pstart = base[:-1]
+    out[pstart] = 9  # MoveTo, 1 sommet
+    out[pstart + 3] = (2 | ((n - 1) << 3)).astype(np.uint64)  # LineTo, n-1 sommets
+    rank = np.arange(len(ix)) - np.repeat(start, n)
+    slot = np.repeat(pstart, n) + np.where(rank == 0, 1, 2 * rank + 2)
+    out[slot] = _zigzag(dx)
+    out[slot + 1] = _zigzag(dy)
+    owner = np.repeat(feat_of_part[parts], size)
+    return out, owner, np.unique(feat_of_part[parts])
+
+
+def encode_tile(geoms: np.ndarray, ids: np.ndarray, codes: np.ndarray, values: Sequence[bytes], keys: Sequence[str], bounds: Tuple[float, float, float, float], layer: str = LAYER_NAME, extent: int = EXTENT, buffer: int = BUFFER) -> Optional[bytes]:
+    """Tuile MVT (non compressée) : ``geoms`` en EPSG:3857, ``ids`` identifiants d'entité
+    (> 0, communs aux tuiles voisines), ``codes``/``values`` issus d'``AttributeTable``,
+    ``bounds`` de la tuile ; None si vide."""
+    x0, y0, x1, y1 = bounds
+    res = (x1 - x0) / extent
+    pad = buffer * res
+    clipped = shapely.clip_by_rect(geoms, x0 - pad, y0 - pad, x1 + pad, y1 + pad)
+    parts, feat_of_part = shapely.get_parts(clipped, return_index=True)
+    tid = shapely.get_type_id(parts)
+    is_line = (tid == 1) | (tid == 2)
+    parts, feat_of_part = parts[is_line], feat_of_part[is_line]
+    if not len(parts):
+        return None
+    xy, part = shapely.get_coordinates(parts, return_index=True)
+    ix = np.rint((xy[:, 0] - x0) / res).astype(np.int64)
+    iy = np.rint((y1 - xy[:, 1]) / res).astype(np.int64)  # axe y des tuiles vers le bas
+    cmds, owner, feats = _geometry_commands(ix, iy, part, feat_of_part)
+    if not len(feats):
+        return None
+    gbytes, gpos = _varint_array(cmds)
+    gstart = np.searchsorted(owner, feats)
+    gend = np.searchsorted(owner, feats, side="right")
+
+    # valeurs locales à la couche : dictionnaire restreint aux entités de la tuile
+    fcodes = codes[feats]
+    used = np.unique(fcodes[fcodes >= 0])
+    ncol = fcodes.shape[1]
+    key_idx = np.broadcast_to(np.arange(ncol), fcodes.shape)
+    tags = np.stack([key_idx, np.searchsorted(used, fcodes)], axis=-1)  # (f, c, 2)
+    present = fcodes >= 0
+    tags_flat = tags[present].reshape(-1)
+    tbytes, tpos = _varint_array(tags_flat)
+    tcount = present.sum(axis=1)
+    tbound = np.concatenate([[0], np.cumsum(2 * tcount)])
+
+    chunks = [_field(1, layer.encode("utf-8"))]
+    gb, tb = gbytes.tobytes(), tbytes.tobytes()
+    for i in range(len(feats)):
+        tag = tb[tpos[tbound[i]] : tpos[tbound[i + 1]]]
+        geo = gb[gpos[gstart[i]] : gpos[gend[i]]]
+        feature = b"\x08" + _varint(int(ids[feats[i]])) + (_field(2, tag) if tag else b"") + b"\x18\x02" + _field(4, geo)  # type = LINESTRING
+        chunks.append(_field(2, feature))
+    chunks.extend(_field(3, k.encode("utf-8")) for k in keys)
+    chunks.extend(values[u] for u in used.tolist())
+    chunks.append(b"\x28" + _varint(extent))
+    chunks.append(b"\x78\x02")  # version 2
+    return _field(3, b"".join(chunks))
+
+
+# --------------------------------------------------------------------------------------
+# Pyramide
+# --------------------------------------------------------------------------------------
+def tile_size_m(z: int) -> float:
+    return 2 * ORIGIN / (1 << z)
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    s = tile_size_m(z)
+    return (-ORIGIN + x * s, ORIGIN - (y + 1) * s, -ORIGIN + (x + 1) * s, ORIGIN - y * s)
+
+
+def _tile_init(values: Sequence[bytes], keys: Sequence[str]) -> None:
+    _TILE_CTX["values"] = values
+    _TILE_CTX["keys"] = keys
+
+
+def _tile_batch(args) -> List[Tuple[int, int, int, bytes]]:
+    z, tiles, offsets, geoms, ids, codes, extent, buffer = args
+    values, keys = _TILE_CTX["values"], _TILE_CTX["keys"]
+    out = []
+    for i, (x, y) in enumerate(tiles):
+        a, b = offsets[i], offsets[i + 1]
+        mvt = encode_tile(geoms[a:b], ids[a:b], codes[a:b], values, keys, tile_bounds(z, x, y), extent=extent, buffer=buffer)
+        if mvt is not None:
+            out.append((z, int(x), int(y), gzip.compress(mvt, compresslevel=6, mtime=0)))
+    return out
+
+
+def _zoom_batches(z: int, geoms: np.ndarray, attrs: AttributeTable, tolerance_px: float, min_px: float, extent: int, buffer: int, batch_features: int) -> Iterator[tuple]:
+    """Lots (z, tuiles, bornes, géométries simplifiées, ids, codes) pour un niveau de zoom.
+
+    Le dictionnaire des valeurs et les clés ne voyagent pas avec les lots
+    (voir ``_tile_init``).
+    """
+    px = tile_size_m(z) / 256.0
+    simple = shapely.simplify(geoms, tolerance_px * px, preserve_topology=False)
+    b = shapely.bounds(simple)
+    big = np.isfinite(b).all(axis=1) & (np.maximum(b[:, 2] - b[:, 0], b[:, 3] - b[:, 1]) >= min_px * px)
+    idx = np.flatnonzero(big)
+    if not len(idx):
+        return
+    s = tile_size_m(z)
+    pad = buffer / extent
+    n = (1 << z) - 1
+    tx0 = np.clip(np.floor((b[idx, 0] + ORIGIN) / s - pad), 0, n).astype(np.int64)
+    tx1 = np.clip(np.floor((b[idx, 2] + ORIGIN) / s + pad), 0, n).astype(np.int64)
+    ty0 = np.clip(np.floor((ORIGIN - b[idx, 3]) / s - pad), 0, n).astype(np.int64)
+    ty1 = np.clip(np.floor((ORIGIN - b[idx, 1]) / s + pad), 0, n).astype(np.int64)
+    # paires (entité, tuile) : produit des plages x × y de chaque bbox
+    nx, ny = tx1 - tx0 + 1, ty1 - ty0 + 1
+    cnt = nx * ny
+    feat = np.repeat(idx, cnt)
+    k = np.arange(int(cnt.sum())) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+    tx = np.repeat(tx0, cnt) + k % np.repeat(nx, cnt)
+    ty = np.repeat(ty0, cnt) + k // np.repeat(nx, cnt)
+    order = np.lexsort((feat, ty, tx))
+    feat, tx, ty = feat[order], tx[order], ty[order]
+    key = tx * (n + 1) + ty
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+    bounds = np.r_[starts, len(key)]
+    t0 = 0
+    while t0 < len(starts):
+        # tuiles entières par lot, ~batch_features paires
+        t1 = int(np.searchsorted(bounds, bounds[t0] + batch_features, side="right")) - 1
+        t1 = min(max(t1, t0 + 1), len(starts))
+        a, c = bounds[t0], bounds[t1]
+        sel = feat[a:c]
+        tiles = np.stack([tx[starts[t0:t1]], ty[starts[t0:t1]]], axis=1)
+        yield (z, tiles, bounds[t0 : t1 + 1] - a, simple[sel], sel + 1, attrs.codes[sel], extent, buffer)
+        t0 = t1
+
+
+def generate_tiles(
+    geoms3857: np.ndarray,
+    attrs: AttributeTable,
+    min_zoom: int = 8,
+    max_zoom: int = 14,
+    tolerance_px: float = 0.5,
+    min_px: float = 0.5,
+    extent: int = EXTENT,
+    buffer: int = BUFFER,
+    batch_features: int = BATCH_FEATURES,
+    max_workers: Optional[int] = None,
+) -> Iterator[Tuple[int, int, int, bytes]]:
+    """Tuiles (z, x, y, MVT gzip) de tous les niveaux, lots (zoom, tuiles) traités en parallèle.
+
+    Les lots sont préparés un niveau à la fois (mémoire bornée par le niveau
+    le plus détaillé). Le dictionnaire des valeurs est envoyé une seule fois
+    à chaque processus par l'initialiseur du pool.
+    """
+    workers = max(1, max_workers if max_workers is not None else (os.cpu_count() or 1))
+    if workers > 1:
+        ex = ProcessPoolExecutor(max_workers=workers, initializer=_tile_init, initargs=(attrs.values, attrs.keys))
+    else:
+        ex = None
+        _tile_init(attrs.values, attrs.keys)
+    try:
+        for z in range(min_zoom, max_zoom + 1):
+            batches = _zoom_batches(z, geoms3857, attrs, tolerance_px, min_px, extent, buffer, batch_features)
+            for tiles in ex.map(_tile_batch, batches) if ex is not None else map(_tile_batch, batches):
+                yield from tiles
+    finally:
+        if ex is not None:
+            ex.shutdown()
+        else:
+            _TILE_CTX.clear()
+
+
+# --------------------------------------------------------------------------------------
+# Conteneurs
+# --------------------------------------------------------------------------------------
+def zxy_to_tileid(z: int, x: int, y: int) -> int:
+    """Identifiant PMTiles : tuiles des niveaux inférieurs + rang de Hilbert de (x, y) au niveau z."""
+    acc = ((1 << (2 * z)) - 1) // 3
+    n = 1 << z
+    d = 0
+    s = n >> 1
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x, y = n - 1 - x, n - 1 - y
+            x, y = y, x
+        s >>= 1
+    return acc + d
+
+
+def _directory(entries: Sequence[Tuple[int, int, int, int]]) -> bytes:
+    """Répertoire PMTiles (tile_id, offset, length, run_length) sérialisé puis gzip."""
+    out = [_varint(len(entries))]
+    last = 0
+    for tid, _, _, _ in entries:
+        out.append(_varint(tid - last))
+        last = tid
+    out.extend(_varint(run) for _, _, _, run in entries)
+    out.extend(_varint(length) for _, _, length, _ in entries)
+    for i, (_, off, _, _) in enumerate(entries):
+        prev = entries[i - 1] if i else None
+        out.append(_varint(0 if prev is not None and off == prev[1] + prev[2] else off + 1))
+    return gzip.compress(b"".join(out), mtime=0)
+
+
+def _directories(entries: List[Tuple[int, int, int, int]]) -> Tuple[bytes, bytes]:
+    """Racine (≤ 16 Kio avec l'en-tête) et feuilles, selon la spécification PMTiles v3."""
+    root = _directory(entries)
+    if len(root) <= 16384 - 127:
+        return root, b""
+    leaf_size = 4096
+    while True:
+        leaves, root_entries, off = [], [], 0
+        for i in range(0, len(entries), leaf_size):
+            leaf = _directory(entries[i : i + leaf_size])
+            root_entries.append((entries[i][0], off, len(leaf), 0))
+            leaves.append(leaf)
+            off += len(leaf)
+        root = _directory(root_entries)
+        if len(root) <= 16384 - 127:
+            return root, b"".join(leaves)
+        leaf_size *= 2
+
+
+def _lonlat(x: float, y: float) -> Tuple[float, float]:
+    return float(np.degrees(x / 6378137.0)), float(np.degrees(np.arctan(np.sinh(y / 6378137.0))))
+
+
+class PMTilesWriter:
+    """PMTiles v3 : tuiles écrites à la volée dans un fichier temporaire, puis
+    en-tête + répertoires + métadonnées + données assemblés à la fermeture."""
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+        self._tmp = self.path.with_name(f".{self.path.name}.data")
+        self._data = open(self._tmp, "wb")
+        self._entries: List[Tuple[int, int, int, int]] = []
+        self._offset = 0
+
+    def add(self, z: int, x: int, y: int, data: bytes) -> None:
+        self._entries.append((zxy_to_tileid(z, x, y), self._offset, len(data), 1))
+        self._data.write(data)
+        self._offset += len(data)
+
+    def close(self, metadata: dict, bounds3857: Tuple[float, float, float, float], min_zoom: int, max_zoom: int) -> None:
+        self._data.close()
+        # données réordonnées par tile_id (archive « clustered »)
+        entries = sorted(self._entries)
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        with open(self._tmp, "rb") as src, open(tmp, "wb") as dst:
+            clustered, off = [], 0
+            for tid, o, length, run in entries:
+                clustered.append((tid, off, length, run))
+                off += length
+            root, leaves = _directories(clustered)
+            meta = gzip.compress(json.dumps(metadata).encode("utf-8"), mtime=0)
+            root_off = 127
+            meta_off = root_off + len(root)
+            leaf_off = meta_off + len(meta)
+            data_off = leaf_off + len(leaves)
+            lon0, lat0 = _lonlat(bounds3857[0], bounds3857[1])
+            lon1, lat1 = _lonlat(bounds3857[2], bounds3857[3])
+            e7 = lambda v: int(round(v * 1e7))  # noqa: E731
+            header = b"PMTiles" + struct.pack(
+                "<BQQQQQQQQQQQBBBBBBiiiiBii",
+                3,
+                root_off,
+                len(root),
+                meta_off,
+                len(meta),
+                leaf_off,
+                len(leaves),
+                data_off,
+                off,
+                len(entries),
+                len(entries),
+                len(entries),
+                1,  # clustered
+                2,
+                2,
+                1,  # répertoires gzip, tuiles gzip, type MVT
+                min_zoom,
+                max_zoom,
+                e7(lon0),
+                e7(lat0),
+                e7(lon1),
+                e7(lat1),
+                max_zoom,
+                e7(0.5 * (lon0 + lon1)),
+                e7(0.5 * (lat0 + lat1)),
+            )
+            dst.write(header + root + meta + leaves)
+            for _, o, length, _ in entries:
+                src.seek(o)
+                dst.write(src.read(length))
+        os.replace(tmp, self.path)
+        self._tmp.unlink()
+
+
+class MBTilesWriter:
+    """MBTiles 1.3 (SQLite) : tuiles MVT gzip, lignes en convention TMS."""
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+        self._tmp = self.path.with_name(f".{self.path.name}.tmp")
+        self._tmp.unlink(missing_ok=True)
+        self._db = sqlite3.connect(self._tmp)
+        self._db.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+        self._db.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+
+    def add(self, z: int, x: int, y: int, data: bytes) -> None:
+        self._db.execute("INSERT INTO tiles VALUES (?, ?, ?, ?)", (z, x, (1 << z) - 1 - y, data))
+
+    def close(self, metadata: dict, bounds3857: Tuple[float, float, float, float], min_zoom: int, max_zoom: int) -> None:
+        lon0, lat0 = _lonlat(bounds3857[0], bounds3857[1])
+        lon1, lat1 = _lonlat(bounds3857[2], bounds3857[3])
+        rows = {
+            "name": metadata.get("name", LAYER_NAME),
+            "format": "pbf",
+            "type": "overlay",
+            "minzoom": str(min_zoom),
+            "maxzoom": str(max_zoom),
+            "bounds": f"{lon0},{lat0},{lon1},{lat1}",
+            "center": f"{0.5 * (lon0 + lon1)},{0.5 * (lat0 + lat1)},{max_zoom}",
+            "json": json.dumps({"vector_layers": metadata["vector_layers"]}),
+        }
+        self._db.executemany("INSERT INTO metadata VALUES (?, ?)", list(rows.items()))
+        self._db.execute("CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row)")
+        self._db.commit()
+        self._db.close()
+        os.replace(self._tmp, self.path)
+
+
+# --------------------------------------------------------------------------------------
+# Export
+# --------------------------------------------------------------------------------------
+def read_segments_geometry(segments: str | os.PathLike, geometry: Optional[str | os.PathLike] = None, columns: Sequence[str] = DEFAULT_ATTRIBUTES):
+    """Attributs des segments + géométries du sidecar (aligné ligne à ligne), en GeoDataFrame."""
+    import geopandas as gpd
+    import pyarrow.parquet as pq
+
+    segments = Path(segments)
+    geometry = Path(geometry) if geometry else segments.with_name(f"{segments.stem}_geom.parquet")
+    names = pq.read_schema(segments).names
+    df = pd.read_parquet(segments, columns=[c for c in columns if c in names])
+    geo = gpd.read_parquet(geometry)
+    if len(geo) != len(df):
+        raise ValueError(f"{geometry} ({len(geo):,} géométries) n'est pas aligné sur {segments} ({len(df):,} lignes)")
+    return gpd.GeoDataFrame(df, geometry=geo.geometry.values, crs=geo.crs)
+
+
+def export_tiles(
+    gdf,
+    out: str | os.PathLike,
+    columns: Sequence[str] = DEFAULT_ATTRIBUTES,
+    min_zoom: int = 8,
+    max_zoom: int = 14,
+    tolerance_px: float = 0.5,
+    min_px: float = 0.5,
+    max_workers: Optional[int] = None,
+    name: Optional[str] = None,
+) -> int:
+    """Écrit la pyramide de ``gdf`` dans ``out`` (.pmtiles ou .mbtiles) ; retourne le nombre de tuiles."""
+    out = Path(out)
+    suffix = out.suffix.lower()
+    if suffix not in (".pmtiles", ".mbtiles"):
+        raise ValueError(f"Conteneur inconnu: {out.suffix} (.pmtiles|.mbtiles)")
+    gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty]
+    if gdf.crs is None:
+        gdf = gdf.set_crs(4326)
+    geoms = np.asarray(gdf.to_crs(3857).geometry.values, dtype=object)
+    attrs = AttributeTable(pd.DataFrame(gdf.drop(columns=gdf.geometry.name)), columns)
+    b = shapely.total_bounds(geoms)
+    metadata = {
+        "name": name or out.stem,
+        "description": "Segments de courbure (rayon, courbure moyenne)",
+        "vector_layers": [{"id": LAYER_NAME, "fields": attrs.fields, "minzoom": min_zoom, "maxzoom": max_zoom}],
+    }
+    out.parent.mkdir(parents=True, exist_ok=True)
+    writer = PMTilesWriter(out) if suffix == ".pmtiles" else MBTilesWriter(out)
+    n = 0
+    for z, x, y, data in generate_tiles(geoms, attrs, min_zoom, max_zoom, tolerance_px, min_px, max_workers=max_workers):
+        writer.add(z, x, y, data)
+        n += 1
+    writer.close(metadata, tuple(b), min_zoom, max_zoom)
+    return n
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Pyramide de tuiles vectorielles (PMTiles/MBTiles) des segments de courbure")
+    ap.add_argument("--segments", type=Path, required=True, help="roadinfo_segments*.parquet")
+    ap.add_argument("--geometry", type=Path, default=None, help="sidecar géométrique (défaut: <stem>_geom.parquet)")
+    ap.add_argument("--out", type=Path, required=True, help="sortie .pmtiles ou .mbtiles")
+    ap.add_argument("--min-zoom", type=int, default=8)
+    ap.add_argument("--max-zoom", type=int, default=14)
+    ap.add_argument("--tolerance-px", type=float, default=0.5, help="tolérance de simplification (pixels écran)")
+    ap.add_argument("--min-px", type=float, default=0.5, help="entités plus petites omises (pixels écran)")
+    ap.add_argument("--columns", nargs="+", default=list(DEFAULT_ATTRIBUTES), help="attributs exportés")
+    ap.add_argument("--workers", type=int, default=None, help="processus (défaut: tous les cœurs)")
+    args = ap.parse_args(argv)
+
+    gdf = read_segments_geometry(args.segments, args.geometry, args.columns)
+    n = export_tiles(gdf, args.out, args.columns, args.min_zoom, args.max_zoom, args.tolerance_px, args.min_px, args.workers)
+    print(f"✅ {n:,} tuiles (z{args.min_zoom}–{args.max_zoom}, {len(gdf):,} segments) → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
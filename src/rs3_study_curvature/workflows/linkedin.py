@@ -122,6 +122,13 @@ def run_map(
             plot_kwargs["buffer_alpha"] = float(os.environ["RS3_BUFFER_ALPHA"])
         except Exception:
             pass
+    if os.environ.get("RS3_MAP_RASTER_ABOVE"):
+        try:
+            plot_kwargs["raster_above"] = int(os.environ["RS3_MAP_RASTER_ABOVE"])
+        except Exception:
+            pass
+    if os.environ.get("RS3_MAP_EDGE_CMAP"):
+        plot_kwargs["edge_cmap"] = os.environ["RS3_MAP_EDGE_CMAP"]
 
     out_png = str(od / "linkedin_map.png")
     plot_map(
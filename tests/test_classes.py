@@ -0,0 +1,11 @@
+def test_class_harmonizer_maps_unique_values_to_categoricals():
+    import pandas as pd
+    from rs3_study_curvature.data.classes import ClassHarmonizer
+
+    h = ClassHarmonizer({"Route à 2 chaussées": "trunk", "primary_link": "primary"}, {"fast": ["trunk"], "main": ["primary"]})
+    hc = h.harmonize(pd.Series(["Route a 2 CHAUSSEES", "route à 2 chaussées", None, "primary_link", "xyz"]))
+    assert isinstance(hc.mapped.dtype, pd.CategoricalDtype)
+    assert hc.raw.tolist()[:2] == ["route a 2 chaussees"] * 2
+    assert hc.mapped.astype(object).where(hc.mapped.notna(), None).tolist() == ["trunk", "trunk", None, "primary", "xyz"]
+    assert hc.group.astype(object).where(hc.group.notna(), None).tolist() == ["fast", "fast", None, "main", None]
+    assert list(hc.mapped.cat.categories) == ["trunk", "primary", "xyz"]
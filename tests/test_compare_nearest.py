@@ -0,0 +1,65 @@
+import numpy as np
+from rs3_study_curvature.analysis.compare_nearest import _build_tree, _query_nearest
+
+
+def test_query_nearest_respects_max_dist():
+    bd = np.array([[0.0, 0.0], [100.0, 0.0], [np.nan, np.nan]])
+    osm = np.array([[1.0, 0.0], [90.0, 0.0], [50.0, 50.0], [np.nan, 0.0]])
+    tree, pos = _build_tree(bd)
+    idx, dist = _query_nearest(tree, pos, osm, max_dist=10.0)
+    assert idx.tolist() == [0, 1, -1, -1]
+    assert np.allclose(dist[:2], [1.0, 10.0]) and np.isnan(dist[2:]).all()
+
+
+def test_query_nearest_by_class_skips_closer_other_class():
+    from rs3_study_curvature.analysis.compare_nearest import _build_class_trees, _query_nearest_by_class
+
+    bd = np.array([[1.0, 0.0], [5.0, 0.0], [2.0, 0.0]])
+    bd_codes = np.array([0, 1, -1])
+    osm = np.array([[0.0, 0.0], [0.0, 0.0]])
+    trees = _build_class_trees(bd, bd_codes)
+    idx, dist = _query_nearest_by_class(trees, osm, np.array([1, -1]), max_dist=10.0)
+    assert idx.tolist() == [1, -1]
+    assert dist[0] == 5.0
+
+
+def test_sweep_quantiles_matches_threshold_filter():
+    import pandas as pd
+    from rs3_study_curvature.analysis.compare_nearest import _sweep_quantiles
+
+    diffs = pd.DataFrame({"diff_length_m": [1.0, 2.0, 3.0, 4.0]})
+    dist = np.array([5.0, 10.0, 25.0, np.nan])
+    sweep = _sweep_quantiles(diffs, dist, [10.0, 30.0], [0.5])
+    assert sweep["n_matched"].tolist() == [2, 3]
+    assert sweep["value"].tolist() == [1.5, 2.0]
+
+
+def test_mutual_mask():
+    from rs3_study_curvature.analysis.compare_nearest import _mutual_mask
+
+    idx_ob = np.array([0, 0, -1])
+    idx_bo = np.array([1, -1])
+    assert _mutual_mask(idx_ob, idx_bo).tolist() == [False, True, False]
+
+
+def test_geom_match_prefers_full_overlap_over_stub():
+    import shapely
+    from rs3_study_curvature.analysis.compare_nearest import _geom_match
+
+    osm = np.array([shapely.LineString([(0, 0), (200, 0)])])
+    stub = shapely.LineString([(95, 1), (105, 1)])
+    full = shapely.LineString([(0, 6), (200, 6)])
+    res = _geom_match(osm, np.array([stub, full]), max_dist=20.0, min_overlap=0.5)
+    assert res["idx_ob"].tolist() == [1]
+    assert res["idx_bo"].tolist() == [-1, 0]
+    assert np.isclose(res["hausdorff"][0], 6.0)
+
+
+def test_connector_lines_skips_rows_with_missing_side():
+    from rs3_study_curvature.analysis.compare_nearest import _connector_lines
+
+    xy = np.array([[0.0, 1.0, 3.0, 5.0], [0.0, 1.0, np.nan, np.nan], [np.nan, 2.0, 4.0, 6.0]])
+    lines = _connector_lines(xy)
+    assert lines[1] is None and lines[2] is None
+    assert lines[0].geom_type == "LineString"
+    assert list(lines[0].coords) == [(0.0, 1.0), (3.0, 5.0)]
@@ -10,3 +10,39 @@ def test_radius_circle():
     p3 = np.array([-r, 0.0])
     R = radius3(p1, p2, p3)
     assert math.isfinite(R) and abs(R - r) < 1e-6
+
+
+def test_rolling_clothoid_fit_matches_lstsq_per_window():
+    from rs3_study_curvature.geometry.clothoid import rolling_clothoid_fit
+
+    rng = np.random.default_rng(0)
+    s = np.concatenate([np.cumsum(rng.uniform(5, 15, 40)), 1e4 + np.cumsum(rng.uniform(5, 15, 25))])
+    k = 1e-3 + 2e-6 * s + rng.normal(0, 1e-4, s.size)
+    offsets = np.array([0, 40, 65])
+    idx, a, b, r2 = rolling_clothoid_fit(s, k, 7, offsets)
+    assert len(idx) == (40 - 6) + (25 - 6) and not np.isin([2, 40, 42, 62], idx).any()
+    for i, ai, bi, ri in zip(idx, a, b, r2):
+        x, y = s[i - 3 : i + 4], k[i - 3 : i + 4]
+        (ea, eb), *_ = np.linalg.lstsq(np.c_[x, np.ones_like(x)], y, rcond=None)
+        er2 = 1 - np.sum((y - ea * x - eb) ** 2) / np.sum((y - y.mean()) ** 2)
+        assert np.isclose(ai, ea, rtol=1e-6, atol=1e-12) and np.isclose(bi, eb, rtol=1e-6, atol=1e-9) and np.isclose(ri, er2, atol=1e-6)
+
+
+def test_segment_road_recovers_line_clothoid_arc_sequence(tmp_path):
+    import pandas as pd
+    from rs3_study_curvature.geometry.alignment import load_alignment, read_profiles, segment_profiles, segment_road
+
+    rng = np.random.default_rng(0)
+    s = np.arange(0.0, 700.0, 5.0)
+    k = np.select([s < 200, s < 300, s < 400, s < 500], [0.0, (s - 200) / 100 * 0.01, 0.01, 0.01 - (s - 400) / 100 * 0.01], 0.0)
+    el = segment_road(s, k + rng.normal(0, 5e-5, s.size))
+    assert el["type"].tolist() == ["line", "clothoid", "arc", "clothoid", "line"]
+    assert np.allclose(el["s0"].to_numpy()[1:], [200, 300, 400, 500], atol=10)
+    assert np.isclose(el["k0"].iloc[2], 0.01, rtol=0.05)
+
+    pd.DataFrame({"road_id": np.repeat(["b", "a"], s.size), "s_m": np.r_[s, s[::-1]], "curvature_1perm": np.r_[k, k[::-1]]}).to_parquet(tmp_path / "prof.parquet")
+    ids, ss, kk, offsets = read_profiles(tmp_path / "prof.parquet")
+    segment_profiles(ids, ss, kk, offsets, batch_roads=1, max_workers=1).to_parquet(tmp_path / "al.parquet")
+    got = load_alignment(tmp_path / "al.parquet", ["a"])
+    assert set(got["road_id"].astype(str)) == {"a"} and len(got) == 5
+    assert len(load_alignment(tmp_path / "al.parquet", [])) == 0
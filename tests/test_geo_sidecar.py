@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def test_geom_sidecar_bbox_read_and_staleness(tmp_path):
+    import os
+
+    import geopandas as gpd
+    import shapely
+    from rs3_study_curvature.data.geo_sidecar import read_geom_indexed, sidecar_path
+
+    rng = np.random.default_rng(5)
+    xy = rng.uniform([1.0, 49.0], [1.5, 49.5], (3000, 2))
+    lines = shapely.linestrings(np.stack([xy, xy + 1e-3], axis=1))
+    src = tmp_path / "layer.geojson"
+    gpd.GeoDataFrame({"name": [f"r{i}" for i in range(len(xy))]}, geometry=lines, crs=4326).to_file(src, driver="GeoJSON")
+
+    bbox = (1.1, 49.1, 1.2, 49.2)
+    first = read_geom_indexed(src, bbox)
+    assert sidecar_path(src).exists()
+    again = read_geom_indexed(src, bbox)
+    b = shapely.bounds(lines)
+    exp = {f"r{i}" for i in np.flatnonzero((b[:, 2] >= 1.1) & (b[:, 0] <= 1.2) & (b[:, 3] >= 49.1) & (b[:, 1] <= 49.2))}
+    assert set(first["name"]) == set(again["name"]) == exp
+    assert again.crs.to_epsg() == 4326
+
+    # source modifiée → sidecar reconstruit
+    gpd.GeoDataFrame({"name": ["seul"]}, geometry=[shapely.LineString([(1.15, 49.15), (1.16, 49.16)])], crs=4326).to_file(src, driver="GeoJSON")
+    os.utime(src, ns=(0, 1))
+    assert read_geom_indexed(src, bbox)["name"].tolist() == ["seul"]
@@ -0,0 +1,20 @@
+import numpy as np
+
+
+def test_hist_cube_counts_and_quantiles(tmp_path):
+    import pandas as pd
+    from rs3_study_curvature.analysis.hist_cube import build_cube, cube_hist, cube_quantiles, merge_cubes
+
+    rng = np.random.default_rng(2)
+    x = rng.lognormal(5.0, 0.8, 20_000)
+    x[:10] = np.inf
+    df = pd.DataFrame({"radius_min_m": x, "class": np.where(np.arange(x.size) % 2, "Route principale", "chemin")})
+    df.to_parquet(tmp_path / "a.parquet")
+    cube = build_cube({"osm": tmp_path / "a.parquet"}, ["radius_min_m"], batch_size=3_000)
+    assert cube["count"].sum() == x.size
+    assert set(cube["class"]) == {"route_principale", "chemin"}
+    edges, counts = cube_hist(cube, "radius_min_m", "osm")
+    assert counts[-1] == 10
+    q = cube_quantiles(edges, counts, [0.5])[0]
+    assert abs(np.log(q) - np.log(np.median(x))) < np.log(edges[1] / edges[0])
+    assert merge_cubes([cube, cube])["count"].sum() == 2 * x.size
@@ -0,0 +1,42 @@
+import numpy as np
+
+
+def test_line_collection_batches_layer_into_few_paths(tmp_path):
+    import geopandas as gpd
+    import shapely
+
+    from rs3_study_curvature.viz.map_plot import _line_collection, plot_map
+
+    arc = shapely.Point(0.0, 0.0).buffer(100.0, quad_segs=16).exterior  # κ = 1/100
+    lines = gpd.GeoSeries([shapely.LineString([(0, 0), (500, 0)]), arc], crs=3857)
+    lc = _line_collection(lines, color="gray")
+    assert len(lc.get_paths()) == 1 and np.isnan(lc.get_paths()[0].vertices).any()  # parties coupées par NaN
+    lc = _line_collection(lines, cmap="viridis")
+    assert 1 <= len(lc.get_paths()) <= 2 and np.isclose(lc.get_array().max(), 1e-2, rtol=0.1)
+
+    edges = gpd.GeoDataFrame(geometry=lines.to_crs(4326))
+    plot_map(str(tmp_path / "m.png"), edges, candidates=edges.iloc[:1], samples=gpd.GeoDataFrame(geometry=[shapely.Point(0, 0)], crs=4326), edge_cmap="viridis")
+    assert (tmp_path / "m.png").stat().st_size > 0
+
+
+def test_plot_map_falls_back_to_source_crs_without_basemap(tmp_path, monkeypatch):
+    import geopandas as gpd
+    import shapely
+
+    from rs3_study_curvature.viz import map_plot
+
+    drawn = []
+    draw = map_plot._draw_layers
+
+    def spy(fig, layers, *style):
+        ax = draw(fig, layers, *style)
+        drawn.append((layers[0].crs.to_epsg(), ax.get_xlim()))
+        return ax
+
+    monkeypatch.setattr(map_plot, "_basemap_crs", lambda: 3857)
+    monkeypatch.setattr(map_plot, "_add_basemap", lambda ax: False)
+    monkeypatch.setattr(map_plot, "_draw_layers", spy)
+    edges = gpd.GeoDataFrame(geometry=[shapely.LineString([(2.30, 48.85), (2.35, 48.86)])], crs=4326)
+    map_plot.plot_map(str(tmp_path / "m.png"), edges)
+    assert [c for c, _ in drawn] == [3857, 4326]
+    assert 2.2 < drawn[-1][1][0] < drawn[-1][1][1] < 2.4
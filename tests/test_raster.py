@@ -0,0 +1,15 @@
+import numpy as np
+
+
+def test_rasterize_circle_preserves_length_and_radius():
+    import shapely
+
+    from rs3_study_curvature.viz.raster import line_segments, rasterize
+
+    circle = shapely.Point(0.0, 0.0).buffer(100.0, quad_segs=64).exterior  # R = 100 m, EPSG:3857 à l'équateur
+    seg = line_segments([circle], crs=3857, plot_crs=3857, step_m=5.0)
+    ras = rasterize(seg, (-150.0, -150.0, 150.0, 150.0), (60, 60))
+    assert np.isclose(ras.length.sum(), 2 * np.pi * 100.0, rtol=1e-3)
+    covered = ras.length > 0
+    assert abs(np.nanmedian(ras.radius_min[covered]) - 100.0) < 2.0
+    assert np.isnan(ras.kappa_max[~covered]).all()
@@ -0,0 +1,29 @@
+import numpy as np
+
+from rs3_study_curvature.viz.render import FigureJob, render_jobs
+
+
+def test_render_jobs_same_bytes_and_caller_matplotlib_untouched(tmp_path):
+    import matplotlib
+
+    rng = np.random.default_rng(0)
+    a, b = rng.normal(size=500), rng.normal(0.5, 1.0, size=400)
+
+    def jobs(sub):
+        (tmp_path / sub).mkdir()
+        return [
+            FigureJob("hist_kde", "x", a, b, kwargs=dict(bins=30, out_path=str(tmp_path / sub / "h.png"))),
+            FigureJob("box_violin", "x", a, b, kwargs=dict(out_path_box=str(tmp_path / sub / "b.png"), out_path_violin=str(tmp_path / sub / "v.png"))),
+        ]
+
+    backend = matplotlib.get_backend()
+    with matplotlib.rc_context({"axes.grid": True, "font.size": 13.0}):
+        before = dict(matplotlib.rcParams)
+        one = render_jobs(jobs("w1"), max_workers=1)
+        assert matplotlib.get_backend() == backend
+        assert dict(matplotlib.rcParams) == before
+    two = render_jobs(jobs("w2"), max_workers=2)
+
+    assert [p.replace("w1", "w2") for p in one] == two
+    for p1, p2 in zip(one, two):
+        assert open(p1, "rb").read() == open(p2, "rb").read()
@@ -0,0 +1,14 @@
+import numpy as np
+
+
+def test_corridor_mask_matches_buffer_union():
+    import shapely
+    from rs3_study_curvature.viz.romilly import _corridor_mask
+
+    rng = np.random.default_rng(3)
+    pts = shapely.points(rng.uniform(0, 1000, (2000, 2)))
+    streets = np.array([shapely.LineString([(100, 100), (900, 400)]), shapely.LineString([(500, 0), (500, 1000)])])
+    got = _corridor_mask(pts, streets, 50.0)
+    exp = shapely.distance(pts[:, None], streets[None, :]).min(axis=1) <= 50.0
+    assert (got == exp).all() and 0 < got.sum() < len(pts)
+    assert not _corridor_mask(pts, streets[:0], 50.0).any()
@@ -0,0 +1,40 @@
+import numpy as np
+
+
+def test_read_segments_bbox_pushdown_and_crs_metadata(tmp_path):
+    import pandas as pd
+    import pyarrow.parquet as pq
+    from rs3_study_curvature.data.segments import read_segments_bbox, segments_crs, write_segments
+
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"x_centroid": np.sort(rng.uniform(0, 1000, 5000)), "y_centroid": rng.uniform(0, 1000, 5000), "class": rng.choice(["a", "b"], 5000)})
+    path = tmp_path / "seg.parquet"
+    write_segments(df, path, "EPSG:2154")
+    assert segments_crs(path) == "EPSG:2154"
+    pq.write_table(pq.read_table(path), path, row_group_size=500)  # plusieurs row groups, métadonnées conservées
+    got = read_segments_bbox(path, (100, 200, 300, 400), columns=["class"], classes=["a"])
+    exp = df[df.x_centroid.between(100, 300) & df.y_centroid.between(200, 400) & (df["class"] == "a")]
+    assert len(got) == len(exp) and set(got.columns) == {"class", "x_centroid", "y_centroid"}
+
+
+def test_spatially_sorted_segments_and_profile_row_groups(tmp_path):
+    import pandas as pd
+    import pyarrow.parquet as pq
+    from rs3_study_curvature.data.segments import read_profile_bbox, read_segments_bbox, row_groups_in_bbox, write_profile, write_segments
+
+    rng = np.random.default_rng(1)
+    n = 4000
+    seg = pd.DataFrame({"road_id": [f"r{i}" for i in range(n)], "x_centroid": rng.uniform(0, 1e4, n), "y_centroid": rng.uniform(0, 1e4, n)})
+    prof = pd.DataFrame({"road_id": np.repeat(seg["road_id"].to_numpy(), 3), "s_m": np.tile([0.0, 1.0, 2.0], n)})
+    order = write_segments(seg, tmp_path / "seg.parquet", "EPSG:2154", spatial_sort="hilbert", row_group_size=250)
+    seg_sorted = seg.iloc[order].reset_index(drop=True)
+    write_profile(prof, tmp_path / "prof.parquet", seg_sorted, row_group_size=600)
+
+    bbox = (1000.0, 1000.0, 2000.0, 2000.0)
+    groups = row_groups_in_bbox(tmp_path / "seg.parquet", bbox)
+    assert pq.ParquetFile(tmp_path / "seg.parquet").metadata.num_row_groups == 16 and len(groups) <= 4
+    got = read_segments_bbox(tmp_path / "seg.parquet", bbox)
+    inside = seg[seg.x_centroid.between(1000, 2000) & seg.y_centroid.between(1000, 2000)]
+    assert set(got.road_id) == set(inside.road_id)
+    p = read_profile_bbox(tmp_path / "prof.parquet", bbox, road_ids=got.road_id)
+    assert len(p) == 3 * len(inside) and all(v == [0.0, 1.0, 2.0] for v in p.groupby("road_id")["s_m"].apply(list))
@@ -0,0 +1,17 @@
+import numpy as np
+
+
+def test_quantile_sketch_merge_bounded_rank_error():
+    from rs3_study_curvature.analysis.sketch import QuantileSketch
+
+    rng = np.random.default_rng(1)
+    x = rng.lognormal(3.0, 1.0, 200_000)
+    merged = QuantileSketch(seed=0)
+    for i, chunk in enumerate(np.array_split(x, 40)):
+        merged.merge(QuantileSketch(seed=i).update(chunk))
+    assert merged.n == x.size
+    qs = np.array([0.1, 0.5, 0.9])
+    ranks = np.searchsorted(np.sort(x), merged.quantile(qs)) / x.size
+    assert np.max(np.abs(ranks - qs)) < 0.02
+    assert QuantileSketch.from_dict(merged.to_dict()).quantile(0.5) == merged.quantile(0.5)
+    assert QuantileSketch().update([3, 1, 2]).quantile(0.5) == 2
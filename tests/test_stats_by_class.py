@@ -0,0 +1,13 @@
+import numpy as np
+
+
+def test_prepare_groups_partitions_once_and_keeps_string_classes():
+    import pandas as pd
+    from rs3_study_curvature.analysis.stats_by_class import prepare_groups
+
+    osm = pd.DataFrame({"class": ["a", "b", "a", "c"], "length_m": [1.0, 2.0, 3.0, np.nan]})
+    bd = pd.DataFrame({"class": ["b", "a", "b"], "length_m": [5.0, 6.0, 7.0]})
+    groups = prepare_groups(osm, bd, osm["class"].astype("category"), bd["class"].astype("category"), ["length_m"])
+    assert list(groups) == ["a", "b"]
+    assert groups["a"]["length_m"][0].tolist() == [1.0, 3.0] and groups["a"]["length_m"][1].tolist() == [6.0]
+    assert groups["b"]["length_m"][1].tolist() == [5.0, 7.0]
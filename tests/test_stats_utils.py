@@ -0,0 +1,36 @@
+import numpy as np
+from scipy import stats
+from rs3_study_curvature.analysis.utils import summarize_metric
+
+
+def test_summarize_metric_matches_scipy_with_ties():
+    rng = np.random.default_rng(0)
+    a = rng.integers(0, 20, 500).astype(float)
+    b = rng.integers(0, 22, 300).astype(float)
+    r = summarize_metric("m", a, b)
+    ks = stats.ks_2samp(a, b, method="asymp")
+    mw = stats.mannwhitneyu(a, b, alternative="two-sided", method="asymptotic")
+    assert np.isclose(r.ks_stat, ks.statistic) and np.isclose(r.p_ks, ks.pvalue)
+    assert np.isclose(r.mw_stat, mw.statistic) and np.isclose(r.p_mw, mw.pvalue)
+    assert np.isclose(r.cliffs_delta, np.sign(a[:, None] - b[None, :]).mean())
+    assert np.isclose(r.diff_median, np.median(a) - np.median(b))
+
+
+def test_bootstrap_chunk_matches_explicit_resamples():
+    from rs3_study_curvature.analysis import utils as U
+
+    rng = np.random.default_rng(2)
+    xs = np.sort(rng.integers(0, 30, 120).astype(float))
+    ys = np.sort(rng.integers(0, 32, 90).astype(float))
+    U._boot_init(xs, ys, [np.arange(120)], [np.arange(90)])
+    seed = np.random.SeedSequence(5)
+    out = U._boot_chunk(seed, 3)
+    r = np.random.default_rng(seed)
+    ix, iy = r.integers(0, 120, (3, 120)), r.integers(0, 90, (3, 90))
+    for k in range(3):
+        x, y = xs[ix[k]], ys[iy[k]]
+        ref = [x.mean() - y.mean(), np.median(x) - np.median(y), U._cohens_d(x, y), np.sign(x[:, None] - y[None, :]).mean()]
+        assert np.allclose(out[k], ref)
+    ci = U.bootstrap_ci(xs, ys, n_boot=200, seed=1, max_workers=1)
+    assert ci == U.bootstrap_ci(xs, ys, n_boot=200, seed=1, max_workers=1)
+    assert ci["diff_mean"][0] <= xs.mean() - ys.mean() <= ci["diff_mean"][1]
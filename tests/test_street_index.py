@@ -0,0 +1,62 @@
+import numpy as np
+
+
+def test_street_index_persisted_lookup_and_suggestions(tmp_path):
+    import os
+
+    import pandas as pd
+    from rs3_study_curvature.data.segments import read_segments_bbox, write_segments
+    from rs3_study_curvature.data.street_index import index_path, load_street_index
+
+    names = ["Rue Blingue", "Rue de l'Église", "Avenue Foch", None, "rue blingue", "Chemin du Vert"]
+    df = pd.DataFrame({"x_centroid": np.arange(6.0), "y_centroid": np.arange(6.0), "name": names})
+    path = tmp_path / "seg.parquet"
+    write_segments(df, path, "EPSG:2154")
+
+    idx = load_street_index(path)
+    assert index_path(path).is_dir()
+    assert idx.lookup("blingue").tolist() == [0, 4]
+    assert idx.lookup("eglise").tolist() == [1]  # accents/casse/type de voie ignorés
+    assert idx.lookup("du vert").tolist() == [5]
+    assert idx.suggest("Foche")[0][0] == "Avenue Foch"
+
+    # relu depuis le disque tant que la source n'a pas changé
+    again = load_street_index(path)
+    assert again.lookup("blingue").tolist() == [0, 4]
+    out = read_segments_bbox(path, names=again.match_names("blingue"))
+    assert sorted(out["name"]) == ["Rue Blingue", "rue blingue"]
+
+    df.loc[2, "name"] = "Rue Blingue prolongée"
+    write_segments(df, path, "EPSG:2154")
+    os.utime(path, ns=(0, 1))
+    assert load_street_index(path).lookup("blingue").tolist() == [0, 2, 4]
+
+
+def test_unmatched_street_gives_empty_selection(tmp_path):
+    import pandas as pd
+    from rs3_study_curvature.data.segments import read_segments_bbox, write_segments
+    from rs3_study_curvature.data.street_index import load_street_index
+    from rs3_study_curvature.viz.romilly import _read_segments_centroids
+
+    df = pd.DataFrame({"x_centroid": [650000.0, 650100.0], "y_centroid": [6860000.0, 6860100.0], "name": ["Rue Blingue", "Avenue Foch"], "class": ["a", "b"]})
+    path = tmp_path / "seg.parquet"
+    write_segments(df, path, "EPSG:2154")
+
+    assert load_street_index(path).match_names("Blinge") == []
+    empty = read_segments_bbox(path, columns=["name"], names=[])
+    assert len(empty) == 0 and list(empty.columns) == ["name", "x_centroid", "y_centroid"]
+    assert len(read_segments_bbox(path, classes=[])) == 0
+    assert read_segments_bbox(path, names=["Avenue Foch"], classes=["b"])["name"].tolist() == ["Avenue Foch"]
+    assert len(_read_segments_centroids(str(path), (-5.0, 41.0, 10.0, 51.0), street="Blinge")) == 0
+
+
+def test_name_columns_skip_numeric_fields(tmp_path):
+    import geopandas as gpd
+    import shapely
+    from rs3_study_curvature.data.street_index import StreetIndex
+
+    gdf = gpd.GeoDataFrame({"nom_1_gauche": ["Rue Blingue", None], "nombre_de_voies": [2, 1]}, geometry=[shapely.Point(0, 0), shapely.Point(1, 1)], crs=2154)
+    gdf.drop(columns="geometry").to_parquet(tmp_path / "t.parquet")
+    gdf.to_file(tmp_path / "t.gpkg")
+    for idx in (StreetIndex.from_frame(gdf), StreetIndex.from_source(tmp_path / "t.parquet"), StreetIndex.from_source(tmp_path / "t.gpkg")):
+        assert idx.columns == ["nom_1_gauche"] and idx.names.tolist() == ["Rue Blingue"]
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+
+def test_tile_pyramid_pmtiles_and_mbtiles(tmp_path):
+    import sqlite3
+    import struct
+
+    import geopandas as gpd
+    import pandas as pd
+    import shapely
+
+    from rs3_study_curvature.viz.tiles import export_tiles, zxy_to_tileid
+
+    assert [zxy_to_tileid(0, 0, 0), zxy_to_tileid(1, 0, 0), zxy_to_tileid(1, 0, 1), zxy_to_tileid(1, 1, 1), zxy_to_tileid(1, 1, 0)] == [0, 1, 2, 3, 4]
+
+    lines = [shapely.LineString([(650000 + 300 * i, 6860000), (650000 + 300 * i + 200, 6860150)]) for i in range(20)]
+    gdf = gpd.GeoDataFrame({"road_id": [f"r{i}" for i in range(20)], "radius_min_m": [50.0 + i for i in range(20)], "class": ["a", None] * 10}, geometry=lines, crs=2154)
+    n = export_tiles(gdf, tmp_path / "s.pmtiles", min_zoom=10, max_zoom=14, max_workers=1)
+    assert n == export_tiles(gdf, tmp_path / "s.mbtiles", min_zoom=10, max_zoom=14, max_workers=2) > 0
+
+    head = (tmp_path / "s.pmtiles").read_bytes()[:127]
+    assert head[:7] == b"PMTiles" and head[7] == 3
+    assert struct.unpack("<Q", head[72:80])[0] == n and (head[100], head[101]) == (10, 14)
+    with sqlite3.connect(tmp_path / "s.mbtiles") as db:
+        assert db.execute("SELECT COUNT(*) FROM tiles").fetchone()[0] == n
+        assert dict(db.execute("SELECT name, value FROM metadata"))["format"] == "pbf"
+
+    pyogrio = pytest.importorskip("pyogrio")
+    if "PMTiles" not in pyogrio.list_drivers():
+        pytest.skip("pilote GDAL PMTiles absent")
+    back = gpd.read_file(tmp_path / "s.pmtiles", layer="segments", CLIP="NO")
+    assert set(back["road_id"]) == set(gdf["road_id"])
+    merged = pd.merge(back.drop_duplicates("road_id"), gdf, on="road_id")
+    assert np.allclose(merged["radius_min_m_x"], merged["radius_min_m_y"])
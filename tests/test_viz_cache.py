@@ -0,0 +1,29 @@
+import numpy as np
+
+from rs3_study_curvature.viz.cache import FigureCache, fingerprint, write_text_if_changed
+from rs3_study_curvature.viz.render import FigureJob, job_key
+
+
+def test_figure_cache_reuses_rendered_outputs(tmp_path):
+    cache = FigureCache(tmp_path / "cache")
+    a, b = np.arange(10.0), np.arange(5.0)
+    job = FigureJob("hist_kde", "m", a, b, kwargs=dict(bins=20, out_path=str(tmp_path / "v1" / "m.png")))
+    moved = FigureJob("hist_kde", "m", a.copy(), b, kwargs=dict(bins=20, out_path=str(tmp_path / "v2" / "m.png")))
+    versions: dict = {}
+    key = job_key(job, versions)
+    assert key == job_key(moved, versions)  # le chemin de sortie n'entre pas dans l'empreinte
+    assert key != job_key(FigureJob("hist_kde", "m", a + 1, b, kwargs=job.kwargs), versions)
+
+    assert not cache.fetch(key, {"out_path": job.kwargs["out_path"]})
+    (tmp_path / "v1").mkdir()
+    (tmp_path / "v1" / "m.png").write_bytes(b"png")
+    cache.store(key, {"out_path": job.kwargs["out_path"]})
+    cache.record_run("r", fingerprint("inputs"), [job.kwargs["out_path"]])
+    cache.save()
+
+    reloaded = FigureCache(tmp_path / "cache")
+    assert reloaded.fetch(key, {"out_path": moved.kwargs["out_path"]})
+    assert (tmp_path / "v2" / "m.png").read_bytes() == b"png"
+    assert reloaded.run_outputs("r", fingerprint("inputs")) == [job.kwargs["out_path"]]
+    assert reloaded.run_outputs("r", fingerprint("other")) is None
+    assert write_text_if_changed(tmp_path / "r.md", "x") and not write_text_if_changed(tmp_path / "r.md", "x")
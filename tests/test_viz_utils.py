@@ -0,0 +1,12 @@
+import numpy as np
+from scipy import stats
+
+
+def test_kde_fft_close_to_gaussian_kde():
+    from rs3_study_curvature.viz.utils import kde_fft
+
+    rng = np.random.default_rng(3)
+    x = np.r_[rng.normal(0.0, 1.0, 4000), rng.normal(6.0, 0.5, 2000)]
+    grid = np.linspace(x.min(), x.max(), 400)
+    ref = stats.gaussian_kde(x)(grid)
+    assert np.max(np.abs(kde_fft(x, grid) - ref)) < 1e-3 * ref.max()